@@ -7,6 +7,7 @@
 """Console script for glean_parser."""
 
 import datetime
+import gc
 import io
 from pathlib import Path
 import sys
@@ -20,6 +21,7 @@ import glean_parser
 
 from . import data_review as mod_data_review
 from . import lint
+from . import manifest as mod_manifest
 from . import translate as mod_translate
 from . import validate_ping
 from . import translation_options
@@ -28,12 +30,58 @@ from . import translation_options
 CONTEXT_SETTINGS = dict(help_option_names=["-h", "--help"])
 
 
+class InputPath(click.Path):
+    """
+    A `click.Path` for input files, which also accepts `@manifest` arguments
+    naming a manifest of input files, see `glean_parser.manifest`.
+    """
+
+    def convert(self, value, param, ctx):
+        if isinstance(value, str) and value.startswith(mod_manifest.MANIFEST_PREFIX):
+            manifest = click.Path(exists=True, dir_okay=False).convert(
+                value[len(mod_manifest.MANIFEST_PREFIX) :], param, ctx
+            )
+            return mod_manifest.MANIFEST_PREFIX + str(manifest)
+        return super().convert(value, param, ctx)
+
+
+def manifest_option(func):
+    return click.option(
+        "--manifest",
+        type=click.Path(exists=True, dir_okay=False, file_okay=True, readable=True),
+        multiple=True,
+        help=(
+            "A file listing input files and glob patterns, one per line. "
+            "Same as passing it as @MANIFEST."
+        ),
+    )(func)
+
+
+def input_filepaths_from(input, manifest, parser_config):
+    """
+    The input files from the command line, with the manifests expanded.
+
+    Only the manifests given on the command line are checked by `InputPath`,
+    so the manifests they include may still be missing or include themselves.
+    """
+    try:
+        return mod_manifest.resolve_inputs(
+            list(input) + [mod_manifest.MANIFEST_PREFIX + x for x in manifest],
+            parser_config,
+        )
+    except OSError as e:
+        raise click.BadParameter(f"Can't read manifest '{e.filename}': {e.strerror}")
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+
 @click.command(context_settings=CONTEXT_SETTINGS)
 @click.argument(
     "input",
-    type=click.Path(exists=False, dir_okay=False, file_okay=True, readable=True),
+    type=InputPath(exists=False, dir_okay=False, file_okay=True, readable=True),
     nargs=-1,
 )
+@manifest_option
 @click.option(
     "--output",
     "-o",
@@ -82,8 +130,35 @@ CONTEXT_SETTINGS = dict(help_option_names=["-h", "--help"])
     type=click.INT,
     required=False,
 )
+@click.option(
+    "--cache/--no-cache",
+    default=False,
+    help=(
+        "Cache the parsed and validated input files on disk, so unchanged "
+        "files are not parsed again on the next run. Off by default."
+    ),
+)
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.INT,
+    default=1,
+    help=(
+        "Number of worker processes to load and lint input files in. "
+        "A negative number uses one process per CPU."
+    ),
+)
+@click.option(
+    "--watch",
+    is_flag=True,
+    help=(
+        "Keep running, and run again whenever any of the input files change. "
+        "Only the changed files are parsed again."
+    ),
+)
 def translate(
     input,
+    manifest,
     format,
     output,
     option,
@@ -91,6 +166,9 @@ def translate(
     allow_missing_files,
     require_tags,
     expire_by_version,
+    cache,
+    jobs,
+    watch,
 ):
     """
     Translate metrics.yaml and pings.yaml files to other formats.
@@ -100,18 +178,42 @@ def translate(
         key, val = opt.split("=", 1)
         option_dict[key] = val
 
+    parser_config = {
+        "allow_reserved": allow_reserved,
+        "allow_missing_files": allow_missing_files,
+        "require_tags": require_tags,
+        "expire_by_version": expire_by_version,
+        "cache": cache,
+        "jobs": jobs,
+    }
+    input_filepaths = input_filepaths_from(input, manifest, parser_config)
+
+    if watch:
+        # Only needed for --watch, and it pulls in ctypes.
+        from . import watch as mod_watch
+
+        sys.exit(
+            mod_watch.watch(
+                input_filepaths,
+                lambda session: mod_translate.translate(
+                    input_filepaths,
+                    format,
+                    Path(output),
+                    option_dict,
+                    parser_config,
+                    session=session,
+                ),
+                parser_config,
+            )
+        )
+
     sys.exit(
         mod_translate.translate(
-            [Path(x) for x in input],
+            input_filepaths,
             format,
             Path(output),
             option_dict,
-            {
-                "allow_reserved": allow_reserved,
-                "allow_missing_files": allow_missing_files,
-                "require_tags": require_tags,
-                "expire_by_version": expire_by_version,
-            },
+            parser_config,
         )
     )
 
@@ -144,9 +246,10 @@ def check(schema):
 @click.command()
 @click.argument(
     "input",
-    type=click.Path(exists=True, dir_okay=False, file_okay=True, readable=True),
+    type=InputPath(exists=True, dir_okay=False, file_okay=True, readable=True),
     nargs=-1,
 )
+@manifest_option
 @click.option(
     "--allow-reserved",
     is_flag=True,
@@ -171,31 +274,101 @@ def check(schema):
     type=click.INT,
     required=False,
 )
+@click.option(
+    "--cache/--no-cache",
+    default=False,
+    help=(
+        "Cache the parsed and validated input files on disk, so unchanged "
+        "files are not parsed again on the next run. Off by default."
+    ),
+)
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.INT,
+    default=1,
+    help=(
+        "Number of worker processes to load and lint input files in. "
+        "A negative number uses one process per CPU."
+    ),
+)
+@click.option(
+    "--similar-name-distance",
+    type=click.INT,
+    default=0,
+    help=(
+        "Also report metrics whose identifiers are within this many edits of "
+        "each other as NAME_TOO_SIMILAR."
+    ),
+)
+@click.option(
+    "--similar-name-permutations",
+    is_flag=True,
+    help=(
+        "Also report metrics whose identifiers have the same words in a "
+        "different order as NAME_TOO_SIMILAR."
+    ),
+)
+@click.option(
+    "--watch",
+    is_flag=True,
+    help=(
+        "Keep running, and run again whenever any of the input files change. "
+        "Only the changed files are parsed again."
+    ),
+)
 def glinter(
-    input, allow_reserved, allow_missing_files, require_tags, expire_by_version
+    input,
+    manifest,
+    allow_reserved,
+    allow_missing_files,
+    require_tags,
+    expire_by_version,
+    cache,
+    jobs,
+    similar_name_distance,
+    similar_name_permutations,
+    watch,
 ):
     """
     Runs a linter over the metrics.
     """
-    sys.exit(
-        lint.glinter(
-            [Path(x) for x in input],
-            {
-                "allow_reserved": allow_reserved,
-                "allow_missing_files": allow_missing_files,
-                "require_tags": require_tags,
-                "expire_by_version": expire_by_version,
-            },
+    parser_config = {
+        "allow_reserved": allow_reserved,
+        "allow_missing_files": allow_missing_files,
+        "require_tags": require_tags,
+        "expire_by_version": expire_by_version,
+        "cache": cache,
+        "jobs": jobs,
+        "similar_name_distance": similar_name_distance,
+        "similar_name_permutations": similar_name_permutations,
+    }
+    input_filepaths = input_filepaths_from(input, manifest, parser_config)
+
+    if watch:
+        # Only needed for --watch, and it pulls in ctypes.
+        from . import watch as mod_watch
+
+        sys.exit(
+            mod_watch.watch(
+                input_filepaths,
+                lambda session: lint.glinter(
+                    input_filepaths, parser_config, session=session
+                ),
+                parser_config,
+            )
         )
-    )
+
+    sys.exit(lint.glinter(input_filepaths, parser_config))
 
 
 @click.command()
 @click.argument(
     "input",
-    type=click.Path(exists=True, dir_okay=False, file_okay=True, readable=True),
+    type=InputPath(exists=True, dir_okay=False, file_okay=True, readable=True),
     nargs=-1,
 )
+@manifest_option
 @click.option(
     "--allow-reserved",
     is_flag=True,
@@ -214,18 +387,40 @@ def glinter(
     is_flag=True,
     help=("Require tags to be specified for metrics and pings."),
 )
-def dump(input, allow_reserved, allow_missing_files, require_tags):
+@click.option(
+    "--cache/--no-cache",
+    default=False,
+    help=(
+        "Cache the parsed and validated input files on disk, so unchanged "
+        "files are not parsed again on the next run. Off by default."
+    ),
+)
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.INT,
+    default=1,
+    help=(
+        "Number of worker processes to load input files in. "
+        "A negative number uses one process per CPU."
+    ),
+)
+def dump(
+    input, manifest, allow_reserved, allow_missing_files, require_tags, cache, jobs
+):
     """
     Dump the list of metrics/pings as JSON to stdout.
     """
 
+    parser_config = {
+        "allow_reserved": allow_reserved,
+        "allow_missing_files": allow_missing_files,
+        "require_tags": require_tags,
+        "cache": cache,
+        "jobs": jobs,
+    }
     results = glean_parser.parser.parse_objects(
-        [Path(x) for x in input],
-        {
-            "allow_reserved": allow_reserved,
-            "allow_missing_files": allow_missing_files,
-            "require_tags": require_tags,
-        },
+        input_filepaths_from(input, manifest, parser_config), parser_config
     )
     errs = list(results)
     assert len(errs) == 0
@@ -251,6 +446,106 @@ def dump(input, allow_reserved, allow_missing_files, require_tags):
     )
 
 
+@click.command()
+@click.argument(
+    "input",
+    type=InputPath(exists=False, dir_okay=False, file_okay=True, readable=True),
+    nargs=-1,
+)
+@manifest_option
+@click.option(
+    "--output",
+    "-o",
+    type=click.Path(dir_okay=False, file_okay=True, writable=True),
+    nargs=1,
+    required=True,
+    help="The snapshot file to write. Its name must end in `.glean`.",
+)
+@click.option(
+    "--allow-reserved",
+    is_flag=True,
+    help=(
+        "If provided, allow the use of reserved fields. "
+        "Should only be set when building the Glean library itself."
+    ),
+)
+@click.option(
+    "--allow-missing-files",
+    is_flag=True,
+    help=("Do not treat missing input files as an error."),
+)
+@click.option(
+    "--require-tags",
+    is_flag=True,
+    help=("Require tags to be specified for metrics and pings."),
+)
+@click.option(
+    "--expire-by-version",
+    help="Expire metrics by version, with the provided major version.",
+    type=click.INT,
+    required=False,
+)
+@click.option(
+    "--cache/--no-cache",
+    default=False,
+    help=(
+        "Cache the parsed and validated input files on disk, so unchanged "
+        "files are not parsed again on the next run. Off by default."
+    ),
+)
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.INT,
+    default=1,
+    help=(
+        "Number of worker processes to load input files in. "
+        "A negative number uses one process per CPU."
+    ),
+)
+def compile_snapshot(
+    input,
+    manifest,
+    output,
+    allow_reserved,
+    allow_missing_files,
+    require_tags,
+    expire_by_version,
+    cache,
+    jobs,
+):
+    """
+    Parse and validate metrics.yaml, pings.yaml and tags.yaml files once, and
+    write the result to a snapshot file.
+
+    The snapshot can then be passed to `translate`, `glinter`, `dump` and
+    `data-review` instead of the input files, to skip parsing them again.
+    """
+    from . import snapshot
+
+    output = Path(output)
+    if output.suffix != snapshot.SNAPSHOT_SUFFIX:
+        raise click.BadParameter(
+            f"must end in `{snapshot.SNAPSHOT_SUFFIX}`", param_hint="--output"
+        )
+
+    parser_config = {
+        "allow_reserved": allow_reserved,
+        "allow_missing_files": allow_missing_files,
+        "require_tags": require_tags,
+        "expire_by_version": expire_by_version,
+        "cache": cache,
+        "jobs": jobs,
+    }
+    sys.exit(
+        snapshot.compile_snapshot(
+            input_filepaths_from(input, manifest, parser_config),
+            output,
+            parser_config,
+        )
+    )
+
+
 @click.command()
 @click.argument("bug", type=str)
 @click.argument(
@@ -285,6 +580,16 @@ main.add_command(check)
 main.add_command(glinter)
 main.add_command(dump)
 main.add_command(data_review_request, "data-review")
+main.add_command(compile_snapshot, "compile")
+
+
+# The garbage collector thresholds of the command line process.  Loading large
+# YAML files creates millions of short-lived objects, which with the default
+# thresholds trigger full collections over and over.  `util.yaml_load` leaves
+# the collector alone, since its settings are process-wide, so the command line,
+# which owns its process, raises the thresholds instead.  Library users can do
+# the same.
+GC_THRESHOLDS = (50000, 20, 10)
 
 
 def main_wrapper(args=None):
@@ -292,6 +597,7 @@ def main_wrapper(args=None):
     A simple wrapper around click's `main` to display the glean_parser version
     when there is an error.
     """
+    gc.set_threshold(*GC_THRESHOLDS)
     try:
         main(args=args)
     except SystemExit as e:
@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+A persistent on-disk cache for the loaded and validated content of input files.
+
+Loading a metrics.yaml, pings.yaml or tags.yaml file means parsing the YAML and
+validating it against the JSON schema, which is by far the most expensive part
+of parsing.  The result of that only depends on the bytes of the file, the
+schemas and the version of glean_parser, so it can be reused across runs for
+files that haven't changed.
+
+The results of the per-metric lint checks are kept in the same cache, see
+`lint.lint_metrics`.
+"""
+
+import functools
+import hashlib
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+
+from . import util
+from .util import DictWrapper
+
+
+# Bump this whenever the encoding of cached values changes.
+CACHE_FORMAT_VERSION = 1
+
+
+# The default maximum size of the cache, in bytes.  When it is exceeded, the
+# least-recently used entries are evicted.
+DEFAULT_SIZE_LIMIT = 64 * 1024 * 1024
+
+
+SCHEMAS_DIR = Path(__file__).parent / "schemas"
+
+
+def file_digest(filepath: Path) -> str:
+    """
+    Compute the SHA-256 hex digest of the contents of the given file.
+    """
+    with filepath.open("rb") as fd:
+        return hashlib.sha256(fd.read()).hexdigest()
+
+
+def file_stamp(filepath: Path) -> Optional[Tuple[int, int]]:
+    """
+    A cheap stamp of the state of a file on disk, made of its modification
+    time and size, used to detect whether it might have changed.
+
+    Returns `None` if `filepath` is not a path to an existing file.
+    """
+    if not isinstance(filepath, Path):
+        return None
+    try:
+        stat = filepath.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+@functools.lru_cache(maxsize=1)
+def _schemas_digest() -> str:
+    """
+    A digest of all of the schemas that ship with glean_parser, so that any
+    change to them invalidates the cached validation results.
+    """
+    digest = hashlib.sha256()
+    for schema_path in sorted(SCHEMAS_DIR.glob("*.yaml")):
+        digest.update(schema_path.name.encode("utf-8"))
+        digest.update(schema_path.read_bytes())
+    return digest.hexdigest()
+
+
+def _parser_version() -> Optional[str]:
+    import glean_parser
+
+    return getattr(glean_parser, "__version__", None)
+
+
+def _encode(value: Any) -> Any:
+    """
+    Encode loaded content as JSON, keeping the extra attributes (`defined_in`
+    and `duplicate`) that `util.yaml_load` sets on `DictWrapper` instances.
+
+    Every dictionary is turned into a JSON object of the form
+    `{"w": is_wrapper, "i": [[key, value], ...], "a": attributes}`, so there's
+    no ambiguity with the content itself when decoding.
+    """
+    if isinstance(value, dict):
+        return {
+            "w": isinstance(value, DictWrapper),
+            "i": [[k, _encode(v)] for k, v in value.items()],
+            "a": getattr(value, "__dict__", {}),
+        }
+    elif isinstance(value, list):
+        return [_encode(x) for x in value]
+    elif value is None or isinstance(value, (str, int, float)):
+        return value
+    raise TypeError(f"Can not cache values of type {type(value).__name__}")
+
+
+def _decode(value: Any) -> Any:
+    """
+    The inverse of `_encode`.
+    """
+    if isinstance(value, dict):
+        mapping: Dict[Any, Any] = DictWrapper() if value["w"] else {}
+        for k, v in value["i"]:
+            mapping[k] = _decode(v)
+        if value["a"]:
+            mapping.__dict__.update(value["a"])
+        return mapping
+    elif isinstance(value, list):
+        return [_decode(x) for x in value]
+    return value
+
+
+class LoadCache:
+    """
+    A size-bounded on-disk cache mapping the contents of an input file to its
+    loaded and validated content.
+
+    Entries are keyed by the SHA-256 of the file contents, the file extension,
+    the bundled schemas and the version of glean_parser.  The result of loading
+    a file doesn't depend on any other `parser_config` key, so those are not
+    part of the key.
+
+    If `digests` maps files to their `file_stamp` and `file_digest`, such as
+    computed by `manifest.hash_inputs`, the digests of the files whose stamp
+    hasn't changed since are reused instead of hashing the files again.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[Union[str, Path]] = None,
+        size_limit: int = DEFAULT_SIZE_LIMIT,
+        digests: Optional[Dict[Path, Tuple[Tuple[int, int], str]]] = None,
+    ):
+        import diskcache  # type: ignore
+
+        if directory is None:
+            import platformdirs  # type: ignore
+
+            directory = (
+                Path(platformdirs.user_cache_dir("glean_parser", "mozilla")) / "parse"
+            )
+
+        self._cache = diskcache.Cache(
+            str(directory),
+            disk=diskcache.JSONDisk,
+            size_limit=size_limit,
+            eviction_policy="least-recently-used",
+        )
+        self._digests = digests or {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        self._cache.close()
+
+    def digest(self, filepath: Path) -> str:
+        """
+        The digest of the contents of the file at `filepath`.
+        """
+        known = self._digests.get(filepath)
+        if known is not None and known[0] == file_stamp(filepath):
+            return known[1]
+        return file_digest(filepath)
+
+    @staticmethod
+    def _key(filepath: Path, digest: str) -> str:
+        return "|".join(
+            [
+                str(CACHE_FORMAT_VERSION),
+                str(_parser_version()),
+                _schemas_digest(),
+                filepath.suffix,
+                digest,
+            ]
+        )
+
+    def get(
+        self, filepath: Path, digest: str
+    ) -> Optional[Tuple[Dict[str, util.JSONType], Optional[str]]]:
+        """
+        Get the cached content and filetype for the file at `filepath` whose
+        contents hash to `digest`, or `None` if it isn't cached.
+        """
+        entry = self._cache.get(self._key(filepath, digest))
+        if entry is None:
+            return None
+        return _decode(entry["content"]), entry["filetype"]
+
+    def set(
+        self,
+        filepath: Path,
+        digest: str,
+        content: Dict[str, util.JSONType],
+        filetype: Optional[str],
+    ) -> None:
+        """
+        Store the validated content and filetype for the file at `filepath`.
+
+        Content that can't be represented in the cache is silently skipped.
+        """
+        try:
+            entry = {"content": _encode(content), "filetype": filetype}
+        except TypeError:
+            return
+        self._cache.set(self._key(filepath, digest), entry)
+
+    @staticmethod
+    def _lint_key(filepath: str, context: str) -> str:
+        return "|".join(
+            [
+                "lint",
+                str(CACHE_FORMAT_VERSION),
+                str(_parser_version()),
+                context,
+                filepath,
+            ]
+        )
+
+    def get_lint_results(self, filepath: str, context: str) -> Dict[str, Any]:
+        """
+        Get the lint results stored by `set_lint_results` for the metrics
+        defined in `filepath`, or an empty dictionary.
+        """
+        return self._cache.get(self._lint_key(filepath, context)) or {}
+
+    def set_lint_results(
+        self, filepath: str, context: str, results: Dict[str, Any]
+    ) -> None:
+        """
+        Store the lint results for the metrics defined in `filepath`, keyed by
+        a digest of each metric, replacing the previous ones.
+
+        They are kept together in a single entry, since looking up every
+        metric on its own costs about as much as linting it.
+        """
+        self._cache.set(self._lint_key(filepath, context), results)
+
+
+def open_cache(parser_config: Dict[str, Any]) -> Optional[LoadCache]:
+    """
+    Open the load cache as configured in `parser_config`.
+
+    Returns `None` if caching is disabled, or if the version of glean_parser is
+    unknown (e.g. when running from a source checkout that isn't installed).
+    """
+    if not parser_config.get("cache", False) or _parser_version() is None:
+        return None
+
+    return LoadCache(
+        parser_config.get("cache_dir"),
+        parser_config.get("cache_size_limit", DEFAULT_SIZE_LIMIT),
+        parser_config.get("input_digests"),
+    )
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+An opt-in compact representation of the parsed object tree, for keeping many
+trees in memory at once.
+
+Compacting an object replaces it with an instance of a subclass of its class
+that stores its attributes in `__slots__` rather than in a `__dict__`.  The
+subclass keeps the name of the original class, so `isinstance` checks,
+`serialize()` and templates keep working.
+
+Short lists and dictionaries are replaced by shared read-only copies, and
+strings that are repeated across many objects (such as categories and ping
+names) are interned.
+"""
+
+import functools
+import sys
+from typing import Any, Dict, Tuple
+import weakref
+
+
+from .metrics import ObjectTree
+
+
+# Attributes with string values that are repeated across many objects.
+_INTERNED_ATTRIBUTES = {
+    "category",
+    "type",
+    "expires",
+    "unit",
+    "gecko_datapoint",
+    "denominator_metric",
+}
+
+
+def _read_only(self, *args, **kwargs):
+    raise TypeError(
+        "Compact objects are read-only. Assign a new value to the attribute instead."
+    )
+
+
+class FrozenList(list):
+    """
+    A read-only list, shared between all of the compact objects that have an
+    equal value.
+    """
+
+    __slots__ = ("__weakref__",)
+
+    append = extend = insert = pop = remove = clear = _read_only
+    sort = reverse = _read_only
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+
+    def __reduce__(self):
+        return (FrozenList, (list(self),))
+
+
+class FrozenDict(dict):
+    """
+    A read-only dictionary, shared between all of the compact objects that have
+    an equal value.
+    """
+
+    __slots__ = ("__weakref__",)
+
+    pop = popitem = clear = update = setdefault = _read_only
+    __setitem__ = __delitem__ = __ior__ = _read_only
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+
+# The shared values, which are dropped once no compact object uses them.
+_shared_lists: "weakref.WeakValueDictionary[Tuple, FrozenList]" = (
+    weakref.WeakValueDictionary()
+)
+_shared_dicts: "weakref.WeakValueDictionary[Tuple, FrozenDict]" = (
+    weakref.WeakValueDictionary()
+)
+
+
+def _intern(value: Any) -> Any:
+    if type(value) is str:
+        return sys.intern(value)
+    return value
+
+
+def _share(value: Any) -> Any:
+    """
+    Return a shared read-only copy of `value` if it is a list or dictionary of
+    hashable values, or `value` itself otherwise.
+    """
+    # The types are part of the key, since e.g. `True == 1`.
+    if type(value) is list:
+        items: Any = [_intern(x) for x in value]
+        key: Tuple[Any, ...] = tuple((type(x), x) for x in items)
+        table: Any = _shared_lists
+        factory: Any = FrozenList
+    elif type(value) is dict:
+        items = [(_intern(k), _intern(v)) for k, v in value.items()]
+        key = tuple((type(k), k, type(v), v) for k, v in items)
+        table = _shared_dicts
+        factory = FrozenDict
+    else:
+        return value
+
+    try:
+        shared = table.get(key)
+    except TypeError:
+        # Not hashable, so it can't be shared.
+        return value
+    if shared is None:
+        shared = factory(items)
+        table[key] = shared
+    return shared
+
+
+def _compact_attributes(self) -> Dict[str, Any]:
+    """
+    The instance attributes, in the order they were originally set, with
+    mutable copies of the shared values.
+    """
+    d = {}
+    for name in type(self)._compact_fields:
+        try:
+            value = getattr(self, name)
+        except AttributeError:
+            continue
+        if type(value) is FrozenList:
+            value = list(value)
+        elif type(value) is FrozenDict:
+            value = dict(value)
+        d[name] = value
+    # Anything that was set after compacting is in the instance dictionary.
+    d.update(getattr(self, "__dict__", {}))
+    return d
+
+
+def _restore(cls: type, attributes: Dict[str, Any]) -> Any:
+    obj: Any = object.__new__(cls)
+    obj.__dict__.update(attributes)
+    return compact(obj)
+
+
+def _reduce(self):
+    return (_restore, (type(self)._compact_original, self._attributes()))
+
+
+def _make_class(cls: type, bases: Tuple[type, ...], slots: Tuple[str, ...], fields):
+    return type(
+        cls.__name__,
+        bases,
+        {
+            "__slots__": slots,
+            "__module__": cls.__module__,
+            "__qualname__": cls.__qualname__,
+            "_compact_fields": fields,
+            "_compact_original": cls,
+            "_attributes": _compact_attributes,
+            "__reduce__": _reduce,
+        },
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def compact_class(cls: Any, fields: Tuple[str, ...]) -> type:
+    """
+    Get the compact version of `cls` for instances with the given attributes.
+    """
+    cls = cls.__dict__.get("_compact_original", cls)
+    return _make_class(cls, (cls,), fields, fields)
+
+
+@functools.lru_cache(maxsize=None)
+def _converted_class(compact_cls: Any, cls: Any) -> type:
+    # Python only allows changing the class of an object between classes with
+    # the same layout, so this derives from the current compact class rather
+    # than from a new compact version of `cls`.
+    return _make_class(cls, (compact_cls, cls), (), compact_cls._compact_fields)
+
+
+def is_compact(obj: Any) -> bool:
+    """
+    Whether `obj` is a compact object.
+    """
+    return "_compact_fields" in type(obj).__dict__
+
+
+def compact(obj: Any) -> Any:
+    """
+    Return a compact copy of the given metric, ping or tag.
+    """
+    if is_compact(obj):
+        return obj
+
+    attributes = vars(obj)
+    cls = compact_class(obj.__class__, tuple(attributes))
+    compacted: Any = object.__new__(cls)
+    for name, value in attributes.items():
+        if name in _INTERNED_ATTRIBUTES:
+            value = _intern(value)
+        setattr(compacted, name, _share(value))
+    return compacted
+
+
+def compact_tree(objects: ObjectTree) -> ObjectTree:
+    """
+    Compact all of the objects in the given tree, in place.
+
+    :return: The same tree.
+    """
+    for category_val in objects.values():
+        for key, value in category_val.items():
+            category_val[key] = compact(value)
+    return objects
+
+
+def class_for(obj: Any, cls: type) -> type:
+    """
+    The class to assign to `obj.__class__` to turn it into an instance of
+    `cls`, which for compact objects is a compact version of `cls`.
+    """
+    if not is_compact(obj):
+        return cls
+    for base in type(obj).__mro__:
+        if base.__dict__.get("_compact_original") is cls:
+            return base
+    return _converted_class(obj.__class__, cls)
@@ -0,0 +1,439 @@
+# -*- coding: utf-8 -*-
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Compile JSON schemas into specialized Python functions that quickly check
+whether a document is valid.
+
+The compiled functions only answer "is this valid?".  They are used as a fast
+path in front of `jsonschema`: if a document is valid, there is nothing else to
+do, and if it isn't, `jsonschema` is run to produce the detailed error
+messages.  This means the compiled functions must never accept a document that
+`jsonschema` rejects, but they may reject some documents that `jsonschema`
+accepts (which merely makes those slower).
+
+Only the subset of JSON schema draft 7 used by the schemas that ship with
+glean_parser is supported.  Schemas using anything else are not compiled.
+"""
+
+import hashlib
+import json
+import marshal
+import re
+import sys
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+# Bump this whenever the generated code changes.
+COMPILER_VERSION = 1
+
+
+# Keywords that don't affect validation.
+_ANNOTATIONS = {
+    "$id",
+    "$schema",
+    "$comment",
+    "title",
+    "description",
+    "default",
+    "examples",
+    "definitions",
+    # Formats are not checked, since we don't pass a `format_checker` to
+    # `jsonschema` either.
+    "format",
+}
+
+
+_TYPE_CHECKS = {
+    "object": "isinstance(x, dict)",
+    "array": "isinstance(x, list)",
+    "string": "isinstance(x, str)",
+    "boolean": "isinstance(x, bool)",
+    "null": "x is None",
+    "number": "(isinstance(x, (int, float)) and not isinstance(x, bool))",
+    "integer": "_is_integer(x)",
+}
+
+
+class UnsupportedSchema(Exception):
+    """
+    Raised when a schema uses a feature the compiler doesn't support.
+    """
+
+
+def _is_integer(x: Any) -> bool:
+    if isinstance(x, bool):
+        return False
+    return isinstance(x, int) or (isinstance(x, float) and x.is_integer())
+
+
+def _equal(one: Any, two: Any) -> bool:
+    """
+    JSON equality, where booleans are never equal to numbers.
+    """
+    if isinstance(one, bool) or isinstance(two, bool):
+        return type(one) is type(two) and one == two
+    if isinstance(one, dict) and isinstance(two, dict):
+        return one.keys() == two.keys() and all(_equal(one[k], two[k]) for k in one)
+    if isinstance(one, list) and isinstance(two, list):
+        return len(one) == len(two) and all(_equal(a, b) for a, b in zip(one, two))
+    if isinstance(one, (dict, list)) or isinstance(two, (dict, list)):
+        return False
+    return one == two
+
+
+def _unique(x: List[Any]) -> bool:
+    """
+    Whether all of the items are unique.  Only lists of strings are checked,
+    anything else is conservatively reported as not unique.
+    """
+    if not all(isinstance(i, str) for i in x):
+        return False
+    return len(set(x)) == len(x)
+
+
+_NAMESPACE = {
+    "re": re,
+    "_is_integer": _is_integer,
+    "_equal": _equal,
+    "_unique": _unique,
+}
+
+
+class _Compiler:
+    def __init__(self, root: Any):
+        self.root = root
+        self.functions: Dict[int, str] = {}
+        self.pending: List[Tuple[str, Any]] = []
+        self.constants: List[str] = []
+        self.output: List[str] = []
+
+    def constant(self, expr: str) -> str:
+        name = f"_c{len(self.constants)}"
+        self.constants.append(f"{name} = {expr}")
+        return name
+
+    def function_for(self, schema: Any) -> str:
+        key = id(schema)
+        if key not in self.functions:
+            name = f"_v{len(self.functions)}"
+            self.functions[key] = name
+            self.pending.append((name, schema))
+        return self.functions[key]
+
+    def resolve(self, ref: str) -> Any:
+        if not ref.startswith("#"):
+            raise UnsupportedSchema(f"Remote $ref {ref}")
+        schema = self.root
+        for part in ref[1:].split("/"):
+            if not part:
+                continue
+            part = part.replace("~1", "/").replace("~0", "~")
+            if isinstance(schema, list):
+                schema = schema[int(part)]
+            elif isinstance(schema, dict) and part in schema:
+                schema = schema[part]
+            else:
+                raise UnsupportedSchema(f"Unresolvable $ref {ref}")
+        return schema
+
+    def compile(self) -> str:
+        entry = self.function_for(self.root)
+        while self.pending:
+            name, schema = self.pending.pop(0)
+            self.output.append(f"def {name}(x):")
+            self.output.extend(self.body(schema, "    "))
+            self.output.append("    return True")
+            self.output.append("")
+        return "\n".join(
+            self.constants + [""] + self.output + [f"validate = {entry}", ""]
+        )
+
+    def body(self, schema: Any, indent: str) -> List[str]:
+        if schema is True:
+            return []
+        if schema is False:
+            return [f"{indent}return False"]
+        if not isinstance(schema, dict):
+            raise UnsupportedSchema(f"Invalid schema {schema!r}")
+
+        if "$ref" in schema:
+            # In draft 7, all other keywords next to `$ref` are ignored.
+            target = self.function_for(self.resolve(schema["$ref"]))
+            return [f"{indent}if not {target}(x):", f"{indent}    return False"]
+
+        handled = {
+            "type",
+            "enum",
+            "const",
+            "allOf",
+            "anyOf",
+            "oneOf",
+            "not",
+            "if",
+            "then",
+            "else",
+        }
+        handled |= _STRING_KEYWORDS | _NUMBER_KEYWORDS | _ARRAY_KEYWORDS
+        handled |= _OBJECT_KEYWORDS
+        for keyword in schema:
+            if keyword not in handled and keyword not in _ANNOTATIONS:
+                raise UnsupportedSchema(f"Unsupported keyword {keyword}")
+
+        lines: List[str] = []
+
+        def fail_if(condition: str, prefix: str = indent) -> None:
+            lines.append(f"{prefix}if {condition}:")
+            lines.append(f"{prefix}    return False")
+
+        if "type" in schema:
+            types = schema["type"]
+            if isinstance(types, str):
+                types = [types]
+            if any(t not in _TYPE_CHECKS for t in types):
+                raise UnsupportedSchema(f"Unsupported type {types}")
+            fail_if(f"not ({' or '.join(_TYPE_CHECKS[t] for t in types)})")
+
+        if "enum" in schema:
+            values = schema["enum"]
+            if all(isinstance(v, str) for v in values):
+                name = self.constant(f"frozenset({sorted(values)!r})")
+                fail_if(f"not (isinstance(x, str) and x in {name})")
+            else:
+                name = self.constant(repr(values))
+                fail_if(f"not any(_equal(x, v) for v in {name})")
+
+        if "const" in schema:
+            name = self.constant(repr(schema["const"]))
+            fail_if(f"not _equal(x, {name})")
+
+        lines.extend(self.string_body(schema, indent))
+        lines.extend(self.number_body(schema, indent))
+        lines.extend(self.array_body(schema, indent))
+        lines.extend(self.object_body(schema, indent))
+
+        for subschema in schema.get("allOf", []):
+            fail_if(f"not {self.function_for(subschema)}(x)")
+
+        if "anyOf" in schema:
+            calls = [f"{self.function_for(s)}(x)" for s in schema["anyOf"]]
+            fail_if(f"not ({' or '.join(calls)})")
+
+        if "oneOf" in schema:
+            calls = [f"{self.function_for(s)}(x)" for s in schema["oneOf"]]
+            fail_if(f"[{', '.join(calls)}].count(True) != 1")
+
+        if "not" in schema:
+            fail_if(f"{self.function_for(schema['not'])}(x)")
+
+        if "if" in schema and ("then" in schema or "else" in schema):
+            lines.append(f"{indent}if {self.function_for(schema['if'])}(x):")
+            if "then" in schema:
+                fail_if(f"not {self.function_for(schema['then'])}(x)", indent + "    ")
+            else:
+                lines.append(f"{indent}    pass")
+            if "else" in schema:
+                lines.append(f"{indent}else:")
+                fail_if(f"not {self.function_for(schema['else'])}(x)", indent + "    ")
+
+        return lines
+
+    def string_body(self, schema: Dict[str, Any], indent: str) -> List[str]:
+        checks = []
+        if "pattern" in schema:
+            name = self.constant(f"re.compile({schema['pattern']!r})")
+            checks.append(f"{name}.search(x) is None")
+        if "minLength" in schema:
+            checks.append(f"len(x) < {int(schema['minLength'])}")
+        if "maxLength" in schema:
+            checks.append(f"len(x) > {int(schema['maxLength'])}")
+        return self.guarded("isinstance(x, str)", checks, indent)
+
+    def number_body(self, schema: Dict[str, Any], indent: str) -> List[str]:
+        checks = []
+        for keyword, op in (
+            ("minimum", "<"),
+            ("maximum", ">"),
+            ("exclusiveMinimum", "<="),
+            ("exclusiveMaximum", ">="),
+        ):
+            if keyword in schema:
+                bound = schema[keyword]
+                if isinstance(bound, bool) or not isinstance(bound, (int, float)):
+                    raise UnsupportedSchema(f"Invalid {keyword}")
+                checks.append(f"x {op} {bound!r}")
+        return self.guarded(_TYPE_CHECKS["number"], checks, indent)
+
+    def array_body(self, schema: Dict[str, Any], indent: str) -> List[str]:
+        checks = []
+        if "minItems" in schema:
+            checks.append(f"len(x) < {int(schema['minItems'])}")
+        if "maxItems" in schema:
+            checks.append(f"len(x) > {int(schema['maxItems'])}")
+        if schema.get("uniqueItems"):
+            checks.append("not _unique(x)")
+        if "items" in schema:
+            items = schema["items"]
+            if isinstance(items, list):
+                if "additionalItems" in schema:
+                    raise UnsupportedSchema("Unsupported keyword additionalItems")
+                for i, item in enumerate(items):
+                    checks.append(
+                        f"len(x) > {i} and not {self.function_for(item)}(x[{i}])"
+                    )
+            else:
+                checks.append(f"not all(map({self.function_for(items)}, x))")
+        if "contains" in schema:
+            checks.append(f"not any(map({self.function_for(schema['contains'])}, x))")
+        return self.guarded("isinstance(x, list)", checks, indent)
+
+    def object_body(self, schema: Dict[str, Any], indent: str) -> List[str]:
+        checks = []
+        if "minProperties" in schema:
+            checks.append(f"len(x) < {int(schema['minProperties'])}")
+        if "maxProperties" in schema:
+            checks.append(f"len(x) > {int(schema['maxProperties'])}")
+        if "required" in schema:
+            name = self.constant(repr(list(schema["required"])))
+            checks.append(f"not all(k in x for k in {name})")
+
+        properties = schema.get("properties", {})
+        for key, subschema in properties.items():
+            checks.append(
+                f"{key!r} in x and not {self.function_for(subschema)}(x[{key!r}])"
+            )
+
+        if "propertyNames" in schema:
+            function = self.function_for(schema["propertyNames"])
+            checks.append(f"not all(map({function}, x))")
+
+        additional = schema.get("additionalProperties", True)
+        if additional is not True:
+            known = self.constant(f"frozenset({sorted(properties)!r})")
+            if additional is False:
+                checks.append(f"not {known}.issuperset(x)")
+            else:
+                function = self.function_for(additional)
+                checks.append(
+                    f"not all({function}(v) for k, v in x.items() if k not in {known})"
+                )
+
+        return self.guarded("isinstance(x, dict)", checks, indent)
+
+    @staticmethod
+    def guarded(guard: str, checks: List[str], indent: str) -> List[str]:
+        if not checks:
+            return []
+        lines = [f"{indent}if {guard}:"]
+        for check in checks:
+            lines.append(f"{indent}    if {check}:")
+            lines.append(f"{indent}        return False")
+        return lines
+
+
+_STRING_KEYWORDS = {"pattern", "minLength", "maxLength"}
+_NUMBER_KEYWORDS = {"minimum", "maximum", "exclusiveMinimum", "exclusiveMaximum"}
+_ARRAY_KEYWORDS = {"items", "minItems", "maxItems", "uniqueItems", "contains"}
+_OBJECT_KEYWORDS = {
+    "properties",
+    "required",
+    "additionalProperties",
+    "propertyNames",
+    "minProperties",
+    "maxProperties",
+}
+
+
+def compile_schema(schema: Any) -> str:
+    """
+    Generate the Python source code of a module with a `validate(instance)`
+    function that returns whether `instance` is valid against `schema`.
+
+    :raises UnsupportedSchema: if the schema uses features that are not
+        supported by the compiler.
+    """
+    return _Compiler(schema).compile()
+
+
+def _schema_digest(schema: Any) -> str:
+    digest = hashlib.sha256(json.dumps(schema, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _cache_dir() -> Path:
+    import platformdirs  # type: ignore
+
+    return Path(platformdirs.user_cache_dir("glean_parser", "mozilla")) / "validators"
+
+
+def _load_code(key: str, cache_dir: Path):
+    """
+    Load compiled code for the given key from the on-disk cache, if any.
+    Problems with the cache are never fatal, they just mean recompiling.
+    """
+    import diskcache  # type: ignore
+
+    try:
+        with diskcache.Cache(str(cache_dir)) as dc:
+            data = dc.get(key)
+        return None if data is None else marshal.loads(data)
+    except Exception:
+        return None
+
+
+def _store_code(key: str, code, cache_dir: Path) -> None:
+    import diskcache  # type: ignore
+
+    try:
+        with diskcache.Cache(str(cache_dir)) as dc:
+            dc[key] = marshal.dumps(code)
+    except Exception:
+        pass
+
+
+def load_validator(
+    schema: Any, use_cache: bool = False, cache_dir: Optional[Path] = None
+) -> Optional[Callable[[Any], bool]]:
+    """
+    Get a compiled validation function for the given schema.
+
+    :param use_cache: Whether to cache the compiled code on disk, keyed by a
+        hash of the schema, so it is only generated once.  The cached code is
+        executed when it is loaded again, so only enable this for cache
+        directories that only trusted users can write to.
+    :param cache_dir: The directory to cache the compiled code in. Defaults
+        to a `validators` directory in the user's cache directory.
+    :return: A function that returns `True` if an instance is valid, or
+        `None` if the schema can't be compiled.
+    """
+    if not use_cache:
+        cache_dir = None
+    elif cache_dir is None:
+        cache_dir = _cache_dir()
+
+    # marshal's format is specific to the Python version.
+    key = "|".join(
+        [
+            str(COMPILER_VERSION),
+            sys.implementation.cache_tag or sys.version,
+            _schema_digest(schema),
+        ]
+    )
+
+    code = _load_code(key, cache_dir) if cache_dir is not None else None
+    if code is None:
+        try:
+            source = compile_schema(schema)
+        except UnsupportedSchema:
+            return None
+        code = compile(source, f"<compiled schema {schema.get('$id')}>", "exec")
+        if cache_dir is not None:
+            _store_code(key, code, cache_dir)
+
+    namespace: Dict[str, Any] = dict(_NAMESPACE)
+    exec(code, namespace)
+    return namespace["validate"]
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Structured errors found while parsing input files.
+"""
+
+from pathlib import Path
+from typing import Any, Callable, Optional, Union
+
+
+from . import util
+
+
+class Diagnostic:
+    """
+    A problem found in an input file, as yielded by `parser.parse_objects`.
+
+    The message is only formatted, the same way as `util.format_error`, the
+    first time the diagnostic is turned into a string.  Callers that only
+    count the errors, or stop at the first one, don't pay for formatting the
+    others.
+
+    Diagnostics compare, hash, sort, concatenate and support `in` and the
+    `str` methods like their string form, so they can be used wherever the
+    errors used to be strings.
+
+    :param filepath: The file the problem is in, or "" if the content didn't
+        come from a file.
+    :param header: A short description of where the problem is, such as
+        "On instance category.name".
+    :param content: The message, or a function returning the message, which
+        is only called when the message is needed.
+    :param lineno: The line the problem is on, if known.
+    :param code: The kind of problem, such as "SCHEMA_VIOLATION".
+    :param object_id: The identifier of the metric, ping or tag the problem
+        is about, if any.
+    """
+
+    __slots__ = (
+        "filepath",
+        "header",
+        "_content",
+        "lineno",
+        "code",
+        "object_id",
+        "_text",
+    )
+
+    def __init__(
+        self,
+        filepath: Union[str, Path],
+        header: str,
+        content: Union[str, Callable[[], str]],
+        lineno: Optional[int] = None,
+        code: Optional[str] = None,
+        object_id: Optional[str] = None,
+    ):
+        self.filepath = filepath
+        self.header = header
+        self._content: Union[str, Callable[[], str]] = content
+        self.lineno = lineno
+        self.code = code
+        self.object_id = object_id
+        self._text: Optional[str] = None
+
+    @property
+    def message(self) -> str:
+        """
+        The message, without the file and header.
+        """
+        if not isinstance(self._content, str):
+            self._content = self._content()
+        return self._content
+
+    def __str__(self) -> str:
+        if self._text is None:
+            self._text = util.format_error(
+                self.filepath, self.header, self.message, self.lineno
+            )
+        return self._text
+
+    def __repr__(self) -> str:
+        return f"Diagnostic({str(self)!r})"
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (str, Diagnostic)):
+            return str(self) == str(other)
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(str(self))
+
+    def __lt__(self, other: Any) -> bool:
+        if isinstance(other, (str, Diagnostic)):
+            return str(self) < str(other)
+        return NotImplemented
+
+    def __contains__(self, item: str) -> bool:
+        return item in str(self)
+
+    def __len__(self) -> int:
+        return len(str(self))
+
+    def __add__(self, other: Any) -> str:
+        return str(self) + other
+
+    def __radd__(self, other: Any) -> str:
+        return other + str(self)
+
+    def __getattr__(self, name: str) -> Any:
+        # The `str` methods, such as `splitlines` or `startswith`.
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(str(self), name)
+
+    def __reduce__(self):
+        # The message may be a function of objects that can't be pickled,
+        # such as jsonschema errors, so it is computed first.
+        return (
+            self.__class__,
+            (
+                self.filepath,
+                self.header,
+                self.message,
+                self.lineno,
+                self.code,
+                self.object_id,
+            ),
+        )
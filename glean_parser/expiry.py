@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Evaluation of the `expires` field of many metrics at once.
+"""
+
+import datetime
+import functools
+from typing import Any, Dict, Optional, Tuple
+
+
+from . import util
+
+
+class ExpiryEvaluator:
+    """
+    Evaluates `expires` values the same way as `util.is_expired` and
+    `util.validate_expires`, but against a single reference time, and only
+    parsing each distinct value once.
+
+    Most metrics share a handful of expiration dates or versions, so a single
+    evaluator is shared by all of the metrics of a parser run.
+
+    :param major_version: The major version to expire against, when expiring
+        by version rather than by date.
+    :param now: The reference time to expire against. Defaults to
+        `util.now_epoch()`, read the first time a date is compared.
+    """
+
+    def __init__(
+        self,
+        major_version: Optional[int] = None,
+        now: Optional[datetime.datetime] = None,
+    ):
+        self.major_version = major_version
+        self._now = now
+        self._expired: Dict[Any, bool] = {}
+        self._errors: Dict[Any, Optional[Tuple[Any, ...]]] = {}
+
+    # The clock is only read once, and only if a date needs to be compared.
+    @functools.cached_property
+    def today(self) -> datetime.date:
+        now = self._now
+        if now is None:
+            now = util.now_epoch()
+        return now.date()
+
+    @functools.cached_property
+    def max_date(self) -> datetime.date:
+        # This uses the local time rather than `SOURCE_DATE_EPOCH`, like the
+        # linter always did.
+        return (datetime.datetime.now() + datetime.timedelta(days=730)).date()
+
+    def _parse(self, expires: Any) -> Any:
+        if self.major_version is not None:
+            return util.parse_expiration_version(expires)
+        return util.parse_expiration_date(expires)
+
+    def _is_expired(self, expires: Any) -> bool:
+        if expires == "never":
+            return False
+        elif expires == "expired":
+            return True
+        elif self.major_version is not None:
+            return self._parse(expires) <= self.major_version
+        else:
+            return self._parse(expires) <= self.today
+
+    def is_expired(self, expires: Any) -> bool:
+        """
+        Returns whether an object with the given `expires` value should be
+        considered expired.
+
+        Raises a ValueError if `expires` is invalid.
+        """
+        try:
+            return self._expired[expires]
+        except KeyError:
+            pass
+        except TypeError:
+            # Not hashable, so it can't be memoized.
+            return self._is_expired(expires)
+        # Invalid values raise every time, they are rare enough.
+        expired = self._is_expired(expires)
+        self._expired[expires] = expired
+        return expired
+
+    def _validation_error(self, expires: Any) -> Optional[Tuple[Any, ...]]:
+        if expires in ("never", "expired"):
+            return None
+
+        try:
+            parsed = self._parse(expires)
+        except ValueError as e:
+            return e.args
+
+        if self.major_version is None and parsed > self.max_date:
+            return (
+                f"'{expires}' is more than 730 days (~2 years) in the future.",
+                "Please make sure this is intentional.",
+                "You can supress this warning by adding EXPIRATION_DATE_TOO_FAR "
+                "to no_lint",
+                "See: https://mozilla.github.io/glean_parser/metrics-yaml.html#no_lint",
+            )
+        return None
+
+    def validate_expires(self, expires: Any) -> None:
+        """
+        Raises a ValueError if `expires` is invalid, or if it is a date more
+        than 730 days (~2 years) in the future.
+        """
+        try:
+            error = self._errors[expires]
+        except KeyError:
+            error = self._errors[expires] = self._validation_error(expires)
+        except TypeError:
+            error = self._validation_error(expires)
+        if error is not None:
+            raise ValueError(*error)
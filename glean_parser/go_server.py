@@ -34,6 +34,7 @@ from typing import Any, Dict, Optional, List
 from . import __version__
 from . import metrics
 from . import util
+from .index import get_index
 
 # Adding a metric here will require updating the `generate_metric_type` function
 # and require adjustments to `metrics` variables the the template.
@@ -159,37 +160,32 @@ def output_go(
     # ping->list of metric categories->list of metrics
     # for easier processing in the template.
     ping_to_metrics: Dict[str, Dict[str, List[metrics.Metric]]] = defaultdict(dict)
-    for _category_key, category_val in objs.items():
-        for _metric_name, metric in category_val.items():
-            if isinstance(metric, metrics.Metric):
-                if metric.type not in SUPPORTED_METRIC_TYPES:
-                    print(
-                        "❌ Ignoring unsupported metric type: "
-                        + f"{metric.type}:{metric.name}."
-                        + " Reach out to Glean team to add support for this"
-                        + " metric type."
-                    )
-                    continue
-
-                # Validate labeled_boolean metrics
-                if metric.type == "labeled_boolean" and not validate_labeled_boolean(
-                    metric
-                ):
-                    continue
-
-                for ping in metric.send_in_pings:
-                    if metric.type == "event" and metric not in event_metrics:
-                        event_metrics.append(metric)
-
-                    if (
-                        metric.type == "labeled_boolean"
-                        and metric not in labeled_boolean_metrics
-                    ):
-                        labeled_boolean_metrics.append(metric)
-
-                    metrics_by_type = ping_to_metrics[ping]
-                    metrics_list = metrics_by_type.setdefault(metric.type, [])
-                    metrics_list.append(metric)
+    for metric in get_index(objs).metrics:
+        if metric.type not in SUPPORTED_METRIC_TYPES:
+            print(
+                "❌ Ignoring unsupported metric type: "
+                + f"{metric.type}:{metric.name}."
+                + " Reach out to Glean team to add support for this"
+                + " metric type."
+            )
+            continue
+
+        # Validate labeled_boolean metrics
+        if metric.type == "labeled_boolean" and not validate_labeled_boolean(metric):
+            continue
+
+        # Each metric is only seen once, so it only needs to be added to
+        # these lists if it's used in any ping.
+        if metric.send_in_pings:
+            if metric.type == "event":
+                event_metrics.append(metric)
+            elif metric.type == "labeled_boolean":
+                labeled_boolean_metrics.append(metric)
+
+        for ping in metric.send_in_pings:
+            metrics_by_type = ping_to_metrics[ping]
+            metrics_list = metrics_by_type.setdefault(metric.type, [])
+            metrics_list.append(metric)
 
     PING_METRIC_ERROR_MSG = (
         " Server-side environment is simplified and this"
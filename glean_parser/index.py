@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Lookup tables over a parsed object tree, shared by the outputters and the
+linter so that each of them doesn't have to walk the whole tree again.
+"""
+
+from typing import Any, Dict, List
+
+from .metrics import Metric, ObjectTree
+from .pings import Ping
+from .tags import Tag
+
+
+class ObjectTreeIndex:
+    """
+    An index of the metrics, pings and tags in an `ObjectTree`, built in a
+    single pass over the tree.
+
+    All of the lists of metrics are in the order the metrics appear in the
+    tree.
+
+    - metrics: All of the metrics.
+    - categories: Category name -> metrics in that category.
+    - pings: Ping name -> ping.
+    - tags: Tag name -> tag.
+    - by_identifier: Metric identifier -> metric.
+    - by_ping: Ping name -> metrics sent in that ping.
+    - by_type: Metric type -> metrics of that type.
+    - by_tag: Tag name -> metrics with that tag in their metadata.
+    - numerators: Denominator metric identifier -> the metrics that use it
+      as their `denominator_metric`.
+    - references: The `references.References` between the objects, once
+      they are resolved.
+    """
+
+    def __init__(self, objs: ObjectTree):
+        self.metrics: List[Metric] = []
+        self.categories: Dict[str, List[Metric]] = {}
+        self.pings: Dict[str, Ping] = {}
+        self.tags: Dict[str, Tag] = {}
+        self.by_identifier: Dict[str, Metric] = {}
+        self.by_ping: Dict[str, List[Metric]] = {}
+        self.by_type: Dict[str, List[Metric]] = {}
+        self.by_tag: Dict[str, List[Metric]] = {}
+        self.numerators: Dict[str, List[Metric]] = {}
+        self.references: Any = None
+
+        for category_key, category_val in objs.items():
+            for key, obj in category_val.items():
+                if isinstance(obj, Metric):
+                    self._add_metric(category_key, obj)
+                elif isinstance(obj, Ping):
+                    self.pings[key] = obj
+                elif isinstance(obj, Tag):
+                    self.tags[key] = obj
+
+    def _add_metric(self, category_key: str, metric: Metric) -> None:
+        self.metrics.append(metric)
+        self.categories.setdefault(category_key, []).append(metric)
+        self.by_identifier[metric.identifier()] = metric
+        for ping_name in metric.send_in_pings:
+            self.by_ping.setdefault(ping_name, []).append(metric)
+        self.by_type.setdefault(metric.type, []).append(metric)
+        for tag_name in metric.metadata.get("tags", []):
+            self.by_tag.setdefault(tag_name, []).append(metric)
+        denominator_name = getattr(metric, "denominator_metric", None)
+        if denominator_name:
+            self.numerators.setdefault(denominator_name, []).append(metric)
+
+    def update_types(self) -> None:
+        """
+        Rebuild `by_type`, after the type of some of the metrics changed.
+        """
+        self.by_type = {}
+        for metric in self.metrics:
+            self.by_type.setdefault(metric.type, []).append(metric)
+
+
+def set_index(objs: ObjectTree, index: ObjectTreeIndex) -> None:
+    """
+    Keep `index` on `objs`, for `get_index` to return.
+
+    Only trees returned by the parser can hold an index.  Anything that changes
+    the tree afterward must set a new index.
+    """
+    try:
+        setattr(objs, "index", index)
+    except AttributeError:
+        pass
+
+
+def get_index(objs: ObjectTree) -> ObjectTreeIndex:
+    """
+    Get the index kept on `objs` by `set_index`, or build a new one.
+    """
+    index: Any = getattr(objs, "index", None)
+    if isinstance(index, ObjectTreeIndex):
+        return index
+    return ObjectTreeIndex(objs)
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+The filter behind the `interesting` parser config, which disables all of the
+metrics that aren't listed as interesting.
+"""
+
+import fnmatch
+import re
+from typing import Any, Iterable, List, Optional, Set
+
+
+# The file extension of plain lists of interesting metric identifiers.
+IDENTIFIER_LIST_SUFFIX = ".txt"
+
+
+def content_identifiers(content: Any) -> List[str]:
+    """
+    The identifiers of the metrics defined in the loaded content of a
+    metrics.yaml file.
+    """
+    if not isinstance(content, dict):
+        return []
+    return [
+        f"{category_key}.{metric_key}"
+        for category_key, category_val in content.items()
+        if not category_key.startswith("$") and isinstance(category_val, dict)
+        for metric_key in category_val
+    ]
+
+
+class InterestingFilter:
+    """
+    A set of interesting metric identifiers (`category.name`), and of glob
+    patterns matching them, such as `category.*`.
+    """
+
+    def __init__(self, identifiers: Iterable[str] = (), patterns: Iterable[str] = ()):
+        self.identifiers: Set[str] = set(identifiers)
+        self.patterns: List[str] = []
+        self._regex: Optional[re.Pattern] = None
+        self.add_patterns(patterns)
+
+    def add_patterns(self, patterns: Iterable[str]) -> None:
+        self.patterns.extend(patterns)
+        if self.patterns:
+            # All of the patterns are matched at once.
+            self._regex = re.compile(
+                "|".join(fnmatch.translate(pattern) for pattern in self.patterns)
+            )
+
+    def add_identifier_list(self, text: str) -> None:
+        """
+        Add the identifiers and patterns in a plain list, with one per line.
+        Empty lines and lines starting with `#` are ignored.
+        """
+        patterns = []
+        for line in text.splitlines():
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if any(c in line for c in "*?["):
+                patterns.append(line)
+            else:
+                self.identifiers.add(line)
+        self.add_patterns(patterns)
+
+    def is_interesting(self, category_key: str, metric_key: str) -> bool:
+        identifier = f"{category_key}.{metric_key}"
+        if identifier in self.identifiers:
+            return True
+        return self._regex is not None and self._regex.match(identifier) is not None
@@ -3,7 +3,13 @@
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
 
+import concurrent.futures
 import enum
+import functools
+import hashlib
+import json
+import multiprocessing
+import os
 from pathlib import Path
 import re
 import sys
@@ -25,6 +31,9 @@ from . import parser
 from . import pings
 from . import tags
 from . import util
+from .cache import LoadCache, open_cache
+from .index import ObjectTreeIndex
+from .similarity import PingNameIndex, SimilarityIndex
 
 
 # Yield only an error message
@@ -45,6 +54,45 @@ class CheckType(enum.Enum):
     error = 1
 
 
+class MetricCheckScope:
+    """
+    Declares which metrics a metric check applies to.  The check isn't run on
+    other metrics, which is the same as it finding nothing wrong with them.
+
+    :param types: The metric classes the check applies to, including their
+        subclasses.  `None` for all metric classes.
+    :param exclude_types: The metric classes, and their subclasses, the check
+        doesn't apply to.
+    :param fields: The metric attributes that must all be set to a non-empty
+        value for the check to apply.
+    """
+
+    def __init__(
+        self,
+        types: Optional[Tuple[type, ...]] = None,
+        exclude_types: Tuple[type, ...] = (),
+        fields: Tuple[str, ...] = (),
+    ):
+        self.types = types
+        self.exclude_types = exclude_types
+        self.fields = fields
+
+    def applies_to_class(self, cls: type) -> bool:
+        if self.types is not None and not issubclass(cls, self.types):
+            return False
+        return not issubclass(cls, self.exclude_types)
+
+    def __repr__(self) -> str:
+        def names(types):
+            return [ty.__qualname__ for ty in types]
+
+        return (
+            f"MetricCheckScope(types={names(self.types or ())!r}, "
+            f"all_types={self.types is None!r}, "
+            f"exclude_types={names(self.exclude_types)!r}, fields={self.fields!r})"
+        )
+
+
 def _split_words(name: str) -> List[str]:
     """
     Helper function to split words on either `.` or `_`.
@@ -66,22 +114,12 @@ def _english_list(items: List[str]) -> str:
         )
 
 
-def _hamming_distance(str1: str, str2: str) -> int:
+@functools.lru_cache(maxsize=None)
+def _reserved_ping_index() -> PingNameIndex:
     """
-    Count the # of differences between strings str1 and str2,
-    padding the shorter one with whitespace
+    The index of the reserved ping names, built once.
     """
-
-    diffs = 0
-    if len(str1) < len(str2):
-        str1, str2 = str2, str1
-    len_dist = len(str1) - len(str2)
-    str2 += " " * len_dist
-
-    for ch1, ch2 in zip(str1, str2):
-        if ch1 != ch2:
-            diffs += 1
-    return diffs
+    return PingNameIndex(pings.RESERVED_PING_NAMES)
 
 
 def check_unit_in_name(
@@ -197,11 +235,12 @@ def check_valid_in_baseline(
 def check_misspelled_pings(
     metric: metrics.Metric, parser_config: Dict[str, Any]
 ) -> LintGenerator:
+    reserved = _reserved_ping_index()
     for ping in metric.send_in_pings:
-        for builtin in pings.RESERVED_PING_NAMES:
-            distance = _hamming_distance(ping, builtin)
-            if distance == 1:
-                yield f"Ping '{ping}' seems misspelled. Did you mean '{builtin}'?"
+        if ping in reserved:
+            continue
+        for builtin in reserved.similar(ping):
+            yield f"Ping '{ping}' seems misspelled. Did you mean '{builtin}'?"
 
 
 def check_tags_required(
@@ -380,7 +419,7 @@ def check_unknown_ping(
     Check that all pings in `send_in_pings` for all metrics are either a builtin ping
     or in the list of defined custom pings.
     """
-    available_pings = [p for p in all_pings]
+    available_pings = PingNameIndex([*pings.RESERVED_PING_NAMES, *all_pings])
 
     for _, metric in metrics.items():
         if check_name in metric.no_lint:
@@ -388,11 +427,11 @@ def check_unknown_ping(
 
         send_in_pings = metric.send_in_pings
         for target_ping in send_in_pings:
-            if target_ping in pings.RESERVED_PING_NAMES:
-                continue
-
             if target_ping not in available_pings:
                 msg = f"Ping `{target_ping} `in `send_in_pings` is unknown."
+                similar = available_pings.similar(target_ping)
+                if similar:
+                    msg += f" Did you mean {_english_list(similar)}?"
                 name = ".".join([metric.category, metric.name])
                 nit = GlinterNit(
                     check_name,
@@ -414,22 +453,30 @@ def check_name_too_similar(
     Check that all metrics identifiers are suitably distinct.
     Require that at least n-1 of the similarly-named metrics must be no_lint'd to dismiss the lint.
 
-    Current similarity test: the fully-qualified identifier differs solely in punctuation.
-    e.g. formautofill.credit_cards and formautofill.creditcards
+    By default, the similarity test is that the fully-qualified identifier differs
+    solely in punctuation, e.g. formautofill.credit_cards and formautofill.creditcards.
+    `parser_config["similar_name_distance"]` also makes identifiers within that
+    edit distance similar, and `parser_config["similar_name_permutations"]`
+    identifiers with the same words in a different order.
+    See `similarity.SimilarityIndex`.
     """
-    seen_metrics: Dict[str, metrics.Metric] = dict()
+    index = SimilarityIndex(
+        parser_config.get("similar_name_distance") or 0,
+        parser_config.get("similar_name_permutations", False),
+    )
 
     for _, metric in all_metrics.items():
         if check_name in metric.no_lint:
             continue
 
-        no_punc = metric.identifier().replace("_", "").replace(".", "")
-        if no_punc in seen_metrics:
-            msg = f"Metric `{metric.identifier()}`'s name is too similar to existing metric `{seen_metrics[no_punc].identifier()}`"
+        similar = index.find(metric.identifier())
+        if similar:
+            # The most recently seen of the similar metrics.
+            msg = f"Metric `{metric.identifier()}`'s name is too similar to existing metric `{similar[-1][0]}`"
             nit = GlinterNit(check_name, metric.identifier(), msg, check_type)
             yield nit
 
-        seen_metrics[no_punc] = metric
+        index.add(metric.identifier())
 
 
 # The checks that operate on an entire category of metrics:
@@ -470,6 +517,27 @@ METRIC_CHECKS: Dict[
 }
 
 
+# The metrics that the checks in `METRIC_CHECKS` apply to:
+#     {NAME: MetricCheckScope}
+# Checks that aren't listed apply to all metrics.
+METRIC_CHECK_SCOPES: Dict[str, MetricCheckScope] = {
+    "UNIT_IN_NAME": MetricCheckScope(
+        types=(metrics.TimeBase, metrics.MemoryDistribution)
+    ),
+    "OLD_EVENT_API": MetricCheckScope(types=(metrics.Event,), fields=("extra_keys",)),
+    "METRIC_ON_EVENTS_LIFETIME": MetricCheckScope(exclude_types=(metrics.Event,)),
+    "EVENT_ON_NON_EVENTS_PING": MetricCheckScope(types=(metrics.Event,)),
+    "UNEXPECTED_UNIT": MetricCheckScope(
+        exclude_types=(metrics.Quantity, metrics.CustomDistribution),
+        fields=("unit",),
+    ),
+    "HIGHER_DATA_SENSITIVITY_REQUIRED": MetricCheckScope(
+        types=(metrics.Event,), fields=("extra_keys",)
+    ),
+    "UNUSED_NO_LINT": MetricCheckScope(types=()),
+}
+
+
 # The checks that operate on individual pings:
 #     {NAME: (function, is_error)}
 PING_CHECKS: Dict[
@@ -496,6 +564,30 @@ ALL_OBJECT_CHECKS: Dict[
 }
 
 
+def register_metric_check(
+    name: str,
+    check_func: Callable[[metrics.Metric, dict], LintGenerator],
+    check_type: CheckType,
+    scope: Optional[MetricCheckScope] = None,
+) -> None:
+    """
+    Register a check that runs on individual metrics, after the ones
+    registered before it.  It can be disabled with `no_lint` like the built-in
+    checks.
+
+    :param name: The name of the check, as used in `no_lint`.
+    :param check_func: A function taking a metric and the parser config, and
+        yielding an error message for each problem found.
+    :param check_type: Whether the problems found are errors or warnings.
+    :param scope: The metrics the check applies to.  By default, all of them.
+    """
+    if name in METRIC_CHECKS or name in CATEGORY_CHECKS or name in ALL_OBJECT_CHECKS:
+        raise ValueError(f"A lint named {name} is already registered")
+    METRIC_CHECKS[name] = (check_func, check_type)
+    if scope is not None:
+        METRIC_CHECK_SCOPES[name] = scope
+
+
 class GlinterNit:
     def __init__(self, check_name: str, name: str, msg: str, check_type: CheckType):
         self.check_name = check_name
@@ -587,6 +679,466 @@ def _lint_all_objects(
     return nits
 
 
+# The name, function, type and required fields of a metric check.  The
+# function is `None` if the check doesn't apply.
+_CompiledMetricCheck = Tuple[
+    str,
+    Optional[Callable[[metrics.Metric, dict], LintGenerator]],
+    CheckType,
+    Tuple[str, ...],
+]
+
+
+class _MetricRules:
+    """
+    The registered metric checks, compiled into a table of the checks to run
+    for each metric class, along with the names of all of the known lints.
+    """
+
+    def __init__(self) -> None:
+        self.known_lint_names = (
+            frozenset(METRIC_CHECKS)
+            | frozenset(ALL_OBJECT_CHECKS)
+            | frozenset(CATEGORY_CHECKS)
+        )
+        self._checks = [
+            (name, check_func, check_type, METRIC_CHECK_SCOPES.get(name))
+            for name, (check_func, check_type) in METRIC_CHECKS.items()
+        ]
+        self._by_class: Dict[type, List[_CompiledMetricCheck]] = {}
+
+    def for_class(self, cls: type) -> List[_CompiledMetricCheck]:
+        """
+        The metric checks, in order, for metrics of class `cls`.  The checks
+        that don't apply to the class are kept, since they can still be
+        listed in `no_lint`.
+        """
+        checks = self._by_class.get(cls)
+        if checks is None:
+            checks = self._by_class[cls] = [
+                (name, None, check_type, ())
+                if scope is not None and not scope.applies_to_class(cls)
+                else (name, check_func, check_type, scope.fields if scope else ())
+                for name, check_func, check_type, scope in self._checks
+            ]
+        return checks
+
+
+# The compiled metric checks of the current run, see `_compile_metric_rules`.
+# Forked lint workers inherit them.
+_metric_rules: Optional[_MetricRules] = None
+
+
+def _compile_metric_rules() -> _MetricRules:
+    """
+    Compile the registered metric checks, once at the start of each run so
+    that checks registered or changed since the previous run are picked up.
+    """
+    global _metric_rules
+    _metric_rules = _MetricRules()
+    return _metric_rules
+
+
+def _lint_metric(
+    metric: metrics.Metric, parser_config: Dict[str, Any]
+) -> List[GlinterNit]:
+    """
+    Run the checks that only depend on the metric itself and the config.
+    """
+    nits: List[GlinterNit] = []
+    rules = _metric_rules or _compile_metric_rules()
+
+    check_unused_lints = "UNUSED_NO_LINT" not in metric.no_lint
+    check_unknown_lint = "UNKNOWN_LINT" not in metric.no_lint
+
+    if check_unknown_lint and metric.no_lint:
+        unknown_lints = [
+            lint for lint in metric.no_lint if lint not in rules.known_lint_names
+        ]
+        if unknown_lints:
+            nits.append(
+                GlinterNit(
+                    "UNKNOWN_LINT",
+                    ".".join([metric.category, metric.name]),
+                    f"Metric contains unknown no_lints: {unknown_lints}. Please remove the `no_lint` entry.",
+                    CheckType.warning,
+                )
+            )
+
+    for check_name, check_func, check_type, fields in rules.for_class(type(metric)):
+        if check_func is None or (
+            fields and not all(getattr(metric, field, None) for field in fields)
+        ):
+            new_nits = []
+        else:
+            new_nits = list(check_func(metric, parser_config))
+        if check_unused_lints and check_name in metric.no_lint and not len(new_nits):
+            nits.append(
+                GlinterNit(
+                    "UNUSED_NO_LINT",
+                    ".".join([metric.category, metric.name]),
+                    f"Metric contains a no_lint: {check_name}, but {check_name} does not apply. Please remove the `no_lint` entry.",
+                    CheckType.warning,
+                )
+            )
+
+        if len(new_nits):
+            if check_name not in metric.no_lint:
+                nits.extend(
+                    GlinterNit(
+                        check_name,
+                        ".".join([metric.category, metric.name]),
+                        msg,
+                        check_type,
+                    )
+                    for msg in new_nits
+                )
+
+    return nits
+
+
+def _lint_category(
+    category_name: str,
+    category_metrics: Dict[str, metrics.Metric],
+    duplicate: Optional[str],
+    parser_config: Dict[str, Any],
+    valid_tag_names: List[str],
+    known_results: Dict[str, List[GlinterNit]],
+) -> Tuple[List[GlinterNit], Dict[str, List[GlinterNit]]]:
+    """
+    Lint a category and its metrics.
+
+    The per-metric results in `known_results`, by metric identifier, are used
+    instead of running the metric checks again.  Returns the nits, and the
+    per-metric results of the metrics that were checked.
+    """
+    nits: List[GlinterNit] = []
+
+    # The information for whether there's duplicate metrics found within the
+    # same YAML document is on the category value, which is not presently linted
+    # (we lint only its metrics).
+    # So we perform that custom work here.
+    if duplicate:
+        nits.append(
+            GlinterNit(
+                "REDEFINED_METRIC",
+                category_name,
+                f"Metric redefined {duplicate}",
+                CheckType.error,
+            )
+        )
+
+    for cat_check_name, (cat_check_func, check_type) in CATEGORY_CHECKS.items():
+        if any(
+            cat_check_name in metric.no_lint for metric in category_metrics.values()
+        ):
+            continue
+        nits.extend(
+            GlinterNit(cat_check_name, category_name, msg, check_type)
+            for msg in cat_check_func(category_name, category_metrics.values())
+        )
+
+    new_results: Dict[str, List[GlinterNit]] = {}
+    for _metric_name, metric in sorted(list(category_metrics.items())):
+        identifier = metric.identifier()
+        metric_nits = known_results.get(identifier)
+        if metric_nits is None:
+            metric_nits = new_results[identifier] = _lint_metric(metric, parser_config)
+        nits.extend(metric_nits)
+
+        # also check that tags for metric are valid
+        nits.extend(
+            _lint_item_tags(
+                ".".join([metric.category, metric.name]),
+                "metric",
+                metric.metadata.get("tags", []),
+                valid_tag_names,
+            )
+        )
+
+    return nits, new_results
+
+
+# The smallest number of metrics that are linted in worker processes when
+# `parser_config["jobs"]` asks for them.  Below that, starting the workers
+# costs more than it saves.
+PARALLEL_LINT_MIN_METRICS = 5000
+
+
+# The categories to lint, the parser config, the valid tag names and the known
+# per-metric results, shared with the lint worker processes.  They are forked
+# from this process and inherit it, which is much cheaper than pickling the
+# metrics to them.
+_worker_state: Optional[
+    Tuple[
+        Dict[str, Tuple[Dict[str, metrics.Metric], Optional[str]]],
+        Dict[str, Any],
+        List[str],
+        Dict[str, List[GlinterNit]],
+    ]
+] = None
+
+
+def _lint_categories_in_worker(
+    category_names: List[str],
+) -> List[Tuple[List[GlinterNit], Dict[str, List[GlinterNit]]]]:
+    assert _worker_state is not None
+    categories, parser_config, valid_tag_names, known_results = _worker_state
+    return [
+        _lint_category(
+            name, *categories[name], parser_config, valid_tag_names, known_results
+        )
+        for name in category_names
+    ]
+
+
+def _partition(
+    categories: Dict[str, Tuple[Dict[str, metrics.Metric], Optional[str]]],
+    num_chunks: int,
+) -> List[List[str]]:
+    """
+    Split the categories into chunks with about the same number of metrics.
+    """
+    chunks: List[List[str]] = [[] for _ in range(num_chunks)]
+    sizes = [0] * num_chunks
+    for name in sorted(categories, key=lambda name: -len(categories[name][0])):
+        smallest = sizes.index(min(sizes))
+        chunks[smallest].append(name)
+        sizes[smallest] += len(categories[name][0])
+    return [chunk for chunk in chunks if chunk]
+
+
+def _lint_categories(
+    categories: Dict[str, Tuple[Dict[str, metrics.Metric], Optional[str]]],
+    num_metrics: int,
+    parser_config: Dict[str, Any],
+    valid_tag_names: List[str],
+    known_results: Dict[str, List[GlinterNit]],
+) -> Dict[str, Tuple[List[GlinterNit], Dict[str, List[GlinterNit]]]]:
+    """
+    Run the category and metric checks on each category, with
+    `_lint_category`.  `num_metrics` is the number of metrics that aren't in
+    `known_results`, and need to be checked.
+
+    If `parser_config["jobs"]` is greater than 1, or negative for one per CPU,
+    the categories are linted concurrently in forked worker processes.  The
+    nits of each category are the same either way.
+    """
+    global _worker_state
+
+    jobs = parser_config.get("jobs") or 1
+    if jobs < 0:
+        jobs = os.cpu_count() or 1
+
+    if (
+        jobs == 1
+        or len(categories) < 2
+        or num_metrics < PARALLEL_LINT_MIN_METRICS
+        or "fork" not in multiprocessing.get_all_start_methods()
+    ):
+        return {
+            name: _lint_category(
+                name, *category, parser_config, valid_tag_names, known_results
+            )
+            for name, category in categories.items()
+        }
+
+    # A few chunks per worker, so that the workers finish at about the same
+    # time even if some checks are slower on some metrics.
+    chunks = _partition(categories, jobs * 4)
+    _worker_state = (categories, parser_config, valid_tag_names, known_results)
+    try:
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=min(jobs, len(chunks)),
+            mp_context=multiprocessing.get_context("fork"),
+        ) as executor:
+            results = executor.map(_lint_categories_in_worker, chunks)
+            return {
+                name: result
+                for chunk, chunk_results in zip(chunks, results)
+                for name, result in zip(chunk, chunk_results)
+            }
+    finally:
+        _worker_state = None
+
+
+# Bump this whenever a change to the metric checks changes their results, so
+# that the results cached by earlier versions aren't used.
+LINT_CACHE_VERSION = 2
+
+
+# The parser config keys that the metric checks, or the metric definitions they
+# check, depend on.
+_LINT_CONFIG_KEYS = (
+    "allow_reserved",
+    "require_tags",
+    "expire_by_version",
+    "do_not_disable_expired",
+    "interesting",
+)
+
+
+def _lint_cache_context(parser_config: Dict[str, Any]) -> Optional[str]:
+    """
+    A digest of everything the results of `_lint_metric` depend on, besides
+    the metric itself: the registered checks and the config.
+
+    Returns `None` if the results can't be cached, because the config has
+    custom expiry handlers.
+    """
+    if (
+        "custom_is_expired" in parser_config
+        or "custom_validate_expires" in parser_config
+    ):
+        return None
+    context = [
+        LINT_CACHE_VERSION,
+        [
+            [
+                name,
+                f"{func.__module__}.{func.__qualname__}",
+                check_type.name,
+                repr(METRIC_CHECK_SCOPES.get(name)),
+            ]
+            for name, (func, check_type) in METRIC_CHECKS.items()
+        ],
+        sorted(CATEGORY_CHECKS),
+        sorted(ALL_OBJECT_CHECKS),
+        {key: parser_config.get(key) for key in _LINT_CONFIG_KEYS},
+    ]
+    encoded = json.dumps(context, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _metric_digest(metric: metrics.Metric) -> str:
+    """
+    A digest of the definition of a metric and, if it expires by date, of
+    the dates its expiry is checked against.
+    """
+    evaluator = metric._expiry_evaluator()
+    dates = None
+    if metric.expires not in ("never", "expired") and evaluator.major_version is None:
+        dates = [evaluator.today.isoformat(), evaluator.max_date.isoformat()]
+    serialized = metric.serialize()
+    serialized.pop("defined_in", None)
+    # The serialized attributes are always in the same order, so their `repr`
+    # is stable, and it is much quicker than encoding them as JSON.
+    definition = repr([metric.category, metric.name, dates, serialized])
+    return hashlib.blake2b(definition.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _evaluation_dates(all_metrics: List[metrics.Metric]) -> Optional[List[str]]:
+    """
+    The dates the expiry of the metrics is checked against, or `None` if they
+    expire by version.  The parser shares one evaluator between all of them.
+    """
+    if not all_metrics:
+        return None
+    evaluator = all_metrics[0]._expiry_evaluator()
+    if evaluator.major_version is not None:
+        return None
+    return [evaluator.today.isoformat(), evaluator.max_date.isoformat()]
+
+
+def _file_digest(cache: LoadCache, filepath: str) -> Optional[str]:
+    if not filepath:
+        return None
+    try:
+        return cache.digest(Path(filepath))
+    except OSError:
+        return None
+
+
+def _load_lint_results(
+    cache: LoadCache, context: str, all_metrics: List[metrics.Metric]
+) -> Tuple[Dict[str, List[GlinterNit]], Dict[str, Dict[str, Any]]]:
+    """
+    Look the metrics up in the lint results cached for the files they are
+    defined in.
+
+    If a file and the evaluation dates didn't change since its results were
+    cached, the results of its metrics are reused as they are.  Otherwise
+    each of its metrics is looked up by `_metric_digest`, so that only the
+    metrics that changed are checked again.
+
+    Returns the cached results by metric identifier, and the new cache entry
+    of each file, without the results.
+    """
+    dates = _evaluation_dates(all_metrics)
+    by_file: Dict[str, List[metrics.Metric]] = {}
+    for metric in all_metrics:
+        filepath = (getattr(metric, "defined_in", None) or {}).get("filepath", "")
+        by_file.setdefault(filepath, []).append(metric)
+
+    known_results: Dict[str, List[GlinterNit]] = {}
+    entries: Dict[str, Dict[str, Any]] = {}
+    for filepath, file_metrics in by_file.items():
+        stored = cache.get_lint_results(filepath, context)
+        entry = entries[filepath] = {
+            "file": _file_digest(cache, filepath),
+            "dates": dates,
+            "identifiers": {},
+            "changed": True,
+        }
+        unchanged = (
+            entry["file"] is not None
+            and stored.get("file") == entry["file"]
+            and stored.get("dates") == dates
+        )
+        stored_identifiers = stored.get("identifiers", {})
+        stored_digests = set(stored_identifiers.values())
+        # Only the metrics with nits have results, to keep the entries small.
+        stored_results = stored.get("results", {})
+        for metric in file_metrics:
+            identifier = metric.identifier()
+            digest = stored_identifiers.get(identifier) if unchanged else None
+            if digest is None:
+                digest = _metric_digest(metric)
+            entry["identifiers"][identifier] = digest
+            if digest in stored_digests:
+                known_results[identifier] = [
+                    GlinterNit(check_name, name, msg, CheckType[check_type])
+                    for check_name, name, msg, check_type in stored_results.get(
+                        digest, []
+                    )
+                ]
+        entry["changed"] = not unchanged or (entry["identifiers"] != stored_identifiers)
+    return known_results, entries
+
+
+def _store_lint_results(
+    cache: LoadCache,
+    context: str,
+    entries: Dict[str, Dict[str, Any]],
+    results: Dict[str, List[GlinterNit]],
+) -> None:
+    """
+    Replace the cached lint results of the files that changed with the
+    results of the metrics they define now.
+    """
+    for filepath, entry in entries.items():
+        if not entry["changed"]:
+            continue
+        identifiers = entry["identifiers"]
+        cache.set_lint_results(
+            filepath,
+            context,
+            {
+                "file": entry["file"],
+                "dates": entry["dates"],
+                "identifiers": identifiers,
+                "results": {
+                    digest: [
+                        [nit.check_name, nit.name, nit.msg, nit.check_type.name]
+                        for nit in results[identifier]
+                    ]
+                    for identifier, digest in identifiers.items()
+                    if results[identifier]
+                },
+            },
+        )
+
+
 def lint_metrics(
     objs: metrics.ObjectTree,
     parser_config: Optional[Dict[str, Any]] = None,
@@ -596,6 +1148,11 @@ def lint_metrics(
     Performs glinter checks on a set of metrics objects.
 
     :param objs: Tree of metric objects, as returns by `parser.parse_objects`.
+    :param parser_config: Parser configuration object.  If its `jobs` is
+      greater than 1, large trees are linted in that many worker processes,
+      with the same result.  If its `cache` is enabled, the results of the
+      checks of each metric are cached, and are only computed again for the
+      metrics whose definition changed.
     :param file: The stream to write errors to.
     :returns: List of nits.
     """
@@ -603,7 +1160,9 @@ def lint_metrics(
         parser_config = {}
 
     nits: List[GlinterNit] = []
-    valid_tag_names = [tag for tag in objs.get("tags", [])]
+    index = ObjectTreeIndex(objs)
+    valid_tag_names = list(index.tags)
+    _compile_metric_rules()
 
     nits.extend(_lint_all_objects(objs, parser_config))
 
@@ -621,106 +1180,54 @@ def lint_metrics(
             )
         )
 
-    for category_name, category in sorted(list(objs.items())):
-        if category_name == "pings":
-            nits.extend(_lint_pings(category, parser_config, valid_tag_names))
-            continue
-
-        if category_name == "tags":
-            # currently we have no linting for tags
+    categories: Dict[str, Tuple[Dict[str, metrics.Metric], Optional[str]]] = {}
+    for category_name, category in objs.items():
+        if category_name in ("pings", "tags"):
             continue
-
-        # The information for whether there's duplicate metrics found within the
-        # same YAML document is on the category value, which is not presently linted
-        # (we lint only its metrics).
-        # So we perform that custom work here.
-        if getattr(objs[category_name], "duplicate", None):
-            nits.append(
-                GlinterNit(
-                    "REDEFINED_METRIC",
-                    category_name,
-                    f"Metric redefined {getattr(objs[category_name], 'duplicate', '')}",
-                    CheckType.error,
-                )
-            )
-
         # Make sure the category has only Metrics, not Pings or Tags
-        category_metrics = dict(
-            (name, metric)
-            for (name, metric) in category.items()
-            if isinstance(metric, metrics.Metric)
+        category_metrics = {
+            metric.name: metric for metric in index.categories.get(category_name, [])
+        }
+        categories[category_name] = (
+            category_metrics,
+            getattr(category, "duplicate", None),
         )
 
-        for cat_check_name, (cat_check_func, check_type) in CATEGORY_CHECKS.items():
-            if any(
-                cat_check_name in metric.no_lint for metric in category_metrics.values()
-            ):
-                continue
-            nits.extend(
-                GlinterNit(cat_check_name, category_name, msg, check_type)
-                for msg in cat_check_func(category_name, category_metrics.values())
-            )
+    # The results of the metric checks of unchanged metrics are reused from
+    # the cache.
+    cache = open_cache(parser_config)
+    context = _lint_cache_context(parser_config) if cache is not None else None
+    known_results: Dict[str, List[GlinterNit]] = {}
+    entries: Dict[str, Dict[str, Any]] = {}
+    if cache is not None and context is not None:
+        known_results, entries = _load_lint_results(cache, context, index.metrics)
 
-        for _metric_name, metric in sorted(list(category_metrics.items())):
-            check_unused_lints = "UNUSED_NO_LINT" not in metric.no_lint
-            check_unknown_lint = "UNKNOWN_LINT" not in metric.no_lint
-
-            if check_unknown_lint and metric.no_lint:
-                known_lint_names = (
-                    set(METRIC_CHECKS.keys())
-                    | set(ALL_OBJECT_CHECKS.keys())
-                    | set(CATEGORY_CHECKS.keys())
-                )
-                unknown_lints = [
-                    lint for lint in metric.no_lint if lint not in known_lint_names
-                ]
-                if unknown_lints:
-                    nits.append(
-                        GlinterNit(
-                            "UNKNOWN_LINT",
-                            ".".join([metric.category, metric.name]),
-                            f"Metric contains unknown no_lints: {unknown_lints}. Please remove the `no_lint` entry.",
-                            CheckType.warning,
-                        )
-                    )
-
-            for check_name, (check_func, check_type) in METRIC_CHECKS.items():
-                new_nits = list(check_func(metric, parser_config))
-                if (
-                    check_unused_lints
-                    and check_name in metric.no_lint
-                    and not len(new_nits)
-                ):
-                    nits.append(
-                        GlinterNit(
-                            "UNUSED_NO_LINT",
-                            ".".join([metric.category, metric.name]),
-                            f"Metric contains a no_lint: {check_name}, but {check_name} does not apply. Please remove the `no_lint` entry.",
-                            CheckType.warning,
-                        )
-                    )
+    try:
+        category_results = _lint_categories(
+            categories,
+            len(index.metrics) - len(known_results),
+            parser_config,
+            valid_tag_names,
+            known_results,
+        )
 
-                if len(new_nits):
-                    if check_name not in metric.no_lint:
-                        nits.extend(
-                            GlinterNit(
-                                check_name,
-                                ".".join([metric.category, metric.name]),
-                                msg,
-                                check_type,
-                            )
-                            for msg in new_nits
-                        )
+        if cache is not None and context is not None:
+            results = dict(known_results)
+            for _, new_results in category_results.values():
+                results.update(new_results)
+            _store_lint_results(cache, context, entries, results)
+    finally:
+        if cache is not None:
+            cache.close()
 
-            # also check that tags for metric are valid
-            nits.extend(
-                _lint_item_tags(
-                    ".".join([metric.category, metric.name]),
-                    "metric",
-                    metric.metadata.get("tags", []),
-                    valid_tag_names,
-                )
-            )
+    for category_name, category in sorted(list(objs.items())):
+        if category_name == "pings":
+            nits.extend(_lint_pings(category, parser_config, valid_tag_names))
+        elif category_name == "tags":
+            # currently we have no linting for tags
+            continue
+        else:
+            nits.extend(category_results[category_name][0])
 
     if len(nits):
         print("Sorry, Glean found some glinter nits:", file=file)
@@ -743,6 +1250,7 @@ def glinter(
     input_filepaths: Iterable[Path],
     parser_config: Optional[Dict[str, Any]] = None,
     file=sys.stderr,
+    session: Optional[parser.ParseSession] = None,
 ) -> int:
     """
     Commandline helper for glinter.
@@ -751,6 +1259,8 @@ def glinter(
     :param parser_config: Parser configuration object, passed to
       `parser.parse_objects`.
     :param file: The stream to write the errors to.
+    :param session: An optional `parser.ParseSession` for `input_filepaths`.
+      If given, it is refreshed instead of parsing all of the files again.
     :return: Non-zero if there were any glinter errors.
     """
     if parser_config is None:
@@ -758,7 +1268,10 @@ def glinter(
 
     errors = 0
 
-    objs = parser.parse_objects(input_filepaths, parser_config)
+    if session is not None:
+        objs = session.refresh()
+    else:
+        objs = parser.parse_objects(input_filepaths, parser_config)
     errors += util.report_validation_errors(objs)
 
     nits = lint_metrics(objs.value, parser_config=parser_config, file=file)
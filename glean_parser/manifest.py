@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Discovery of input files listed in manifest files.
+
+A manifest is a text file with one input file path or glob pattern per line,
+such as `components/**/metrics.yaml`.  Relative paths and patterns are relative
+to the directory of the manifest.  Empty lines and lines starting with `#` are
+ignored, and lines starting with `@` include another manifest.
+
+On the command line, `@path/to/manifest` expands to the files listed in the
+manifest, like a response file, so that build systems don't need to pass
+hundreds of paths as arguments.
+"""
+
+import concurrent.futures
+import glob
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+
+from .cache import file_digest, file_stamp
+
+
+MANIFEST_PREFIX = "@"
+
+
+def _is_pattern(entry: str) -> bool:
+    return any(c in entry for c in "*?[")
+
+
+def _manifest_entries(
+    manifest: Path, seen: Optional[Set[Path]] = None
+) -> List[Union[Path, str]]:
+    """
+    The paths and glob patterns listed in a manifest, in order, with the
+    included manifests expanded.  Patterns are returned as strings.
+    """
+    if seen is None:
+        seen = set()
+    resolved = manifest.resolve()
+    if resolved in seen:
+        raise ValueError(f"Manifest '{manifest}' includes itself")
+    seen.add(resolved)
+
+    entries: List[Union[Path, str]] = []
+    for line in manifest.read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith(MANIFEST_PREFIX):
+            included = manifest.parent / line[len(MANIFEST_PREFIX) :]
+            entries.extend(_manifest_entries(included, seen))
+        elif _is_pattern(line):
+            entries.append(os.path.join(manifest.parent, line))
+        else:
+            entries.append(manifest.parent / line)
+
+    seen.remove(resolved)
+    return entries
+
+
+def _glob(pattern: str) -> List[Path]:
+    return [
+        Path(x) for x in sorted(glob.glob(pattern, recursive=True)) if os.path.isfile(x)
+    ]
+
+
+def expand_inputs(
+    inputs: Iterable[Union[str, Path]],
+    executor: Optional[concurrent.futures.Executor] = None,
+) -> List[Path]:
+    """
+    Expand the `@manifest` entries of a list of inputs into the files they
+    list.  Other inputs are kept as they are.
+
+    The files matching each glob pattern are sorted, and patterns matching no
+    files are dropped.  Patterns are expanded concurrently in `executor`, if
+    given.
+    """
+    entries: List[Union[Path, str]] = []
+    for item in inputs:
+        item = str(item)
+        if item.startswith(MANIFEST_PREFIX):
+            entries.extend(_manifest_entries(Path(item[len(MANIFEST_PREFIX) :])))
+        else:
+            entries.append(Path(item))
+
+    if executor is None:
+        matches = {entry: _glob(entry) for entry in entries if isinstance(entry, str)}
+    else:
+        futures = {
+            entry: executor.submit(_glob, entry)
+            for entry in entries
+            if isinstance(entry, str)
+        }
+        matches = {entry: future.result() for entry, future in futures.items()}
+
+    filepaths: List[Path] = []
+    for entry in entries:
+        if isinstance(entry, str):
+            filepaths.extend(matches[entry])
+        else:
+            filepaths.append(entry)
+    return filepaths
+
+
+def _stamp_and_digest(filepath: Path) -> Optional[Tuple[Tuple[int, int], str]]:
+    stamp = file_stamp(filepath)
+    if stamp is None:
+        return None
+    try:
+        return stamp, file_digest(filepath)
+    except OSError:
+        return None
+
+
+def hash_inputs(
+    filepaths: Iterable[Path],
+    executor: Optional[concurrent.futures.Executor] = None,
+) -> Dict[Path, Tuple[Tuple[int, int], str]]:
+    """
+    Stat and hash the given files, concurrently in `executor` if given.
+
+    Returns a map from each existing file to its `cache.file_stamp` and
+    `cache.file_digest`, to be passed to the parser as the `input_digests`
+    config, so that the load cache doesn't hash the files again.
+    """
+    filepaths = list(dict.fromkeys(filepaths))
+    results: Iterable[Optional[Tuple[Tuple[int, int], str]]]
+    if executor is None:
+        results = map(_stamp_and_digest, filepaths)
+    else:
+        results = executor.map(_stamp_and_digest, filepaths)
+    return {
+        filepath: result
+        for filepath, result in zip(filepaths, results)
+        if result is not None
+    }
+
+
+def resolve_inputs(
+    inputs: Iterable[Union[str, Path]], parser_config: Dict
+) -> List[Path]:
+    """
+    Expand the manifests in `inputs` with `expand_inputs`.
+
+    If the load cache is enabled in `parser_config`, the files are also hashed
+    with `hash_inputs` and their digests are stored in
+    `parser_config["input_digests"]`.
+
+    Both are done in a thread pool, since they mostly wait on the file system.
+    """
+    with concurrent.futures.ThreadPoolExecutor() as executor:
+        filepaths = expand_inputs(inputs, executor)
+        if parser_config.get("cache", False):
+            parser_config["input_digests"] = hash_inputs(filepaths, executor)
+    return filepaths
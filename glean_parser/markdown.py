@@ -17,7 +17,7 @@ from . import __version__
 from . import metrics
 from . import pings
 from . import util
-from collections import defaultdict
+from .index import get_index
 
 
 def extra_info(obj: Union[metrics.Metric, pings.Ping]) -> List[Tuple[str, str]]:
@@ -205,27 +205,22 @@ def output_markdown(
     # }
     #
     # This also builds a dictionary of custom pings, if available.
-    custom_pings_cache: Dict[str, pings.Ping] = defaultdict()
-    metrics_by_pings: Dict[str, List[metrics.Metric]] = defaultdict(list)
-    for _category_key, category_val in objs.items():
-        for obj in category_val.values():
-            # Filter out custom pings. We will need them for extracting
-            # the description
-            if isinstance(obj, pings.Ping):
-                custom_pings_cache[obj.name] = obj
-                # Pings that have `send_if_empty` set to true,
-                # might not have any metrics. They need to at least have an
-                # empty array of metrics to show up on the template.
-                if obj.send_if_empty and not metrics_by_pings[obj.name]:
-                    metrics_by_pings[obj.name] = []
-
-            # If this is an internal Glean metric, and we don't
-            # want docs for it.
-            if isinstance(obj, metrics.Metric) and not obj.is_internal_metric():
-                # If we get here, obj is definitely a metric we want
-                # docs for.
-                for ping_name in obj.send_in_pings:
-                    metrics_by_pings[ping_name].append(obj)
+    index = get_index(objs)
+    custom_pings_cache: Dict[str, pings.Ping] = dict(index.pings)
+    metrics_by_pings: Dict[str, List[metrics.Metric]] = {}
+
+    # Pings that have `send_if_empty` set to true, might not have any metrics.
+    # They need to at least have an empty array of metrics to show up on the
+    # template.
+    for ping_name, ping in custom_pings_cache.items():
+        if ping.send_if_empty:
+            metrics_by_pings[ping_name] = []
+
+    for ping_name, ping_metrics in index.by_ping.items():
+        # Leave out the internal Glean metrics, we don't want docs for them.
+        docs_metrics = [obj for obj in ping_metrics if not obj.is_internal_metric()]
+        if docs_metrics:
+            metrics_by_pings[ping_name] = docs_metrics
 
     # Sort the metrics by their identifier, to make them show up nicely
     # in the docs and to make generated docs reproducible.
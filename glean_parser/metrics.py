@@ -8,13 +8,30 @@
 Classes for each of the high-level metric types.
 """
 
+import datetime
 import enum
-from typing import Any, Dict, List, Optional, Type, Union  # noqa
+import functools
+import json
+from typing import (  # noqa
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    Union,
+)
 
 
 from . import pings
 from . import tags
 from . import util
+from .diagnostics import Diagnostic
+from .expiry import ExpiryEvaluator
 
 
 # Important: if the values are ever changing here, make sure
@@ -34,12 +51,115 @@ class DataSensitivity(enum.Enum):
     highly_sensitive = 4
 
 
+def _serialize_value(value: Any) -> Any:
+    """
+    Serialize an attribute that isn't listed in `serialized_attributes`, based
+    on its type.
+    """
+    if isinstance(value, enum.Enum):
+        return value.name
+    if isinstance(value, set):
+        return sorted(list(value))
+    if isinstance(value, list) and len(value) and isinstance(value[0], enum.Enum):
+        return [x.name for x in value]
+    return value
+
+
+@functools.lru_cache(maxsize=None)
+def _make_serializer(
+    cls: Any,
+    attribute_names: Tuple[str, ...],
+    renames: Tuple[Tuple[str, str], ...] = (),
+) -> Callable:
+    """
+    Generate a function that serializes instances of `cls` with the given
+    attributes, in that order, from a dictionary of those attributes.
+
+    The attributes in `renames` are serialized last, under their new name,
+    even if they would otherwise be left out.
+    """
+    serialized: Dict[str, Optional[str]] = {}
+    for base in reversed(cls.__mro__):
+        serialized.update(base.__dict__.get("serialized_attributes", {}))
+
+    def convert(name, key):
+        expression = serialized.get(name)
+        if expression is None:
+            return [f"    d[{key!r}] = _serialize_value(a[{name!r}])"]
+        if expression == "value":
+            return [f"    d[{key!r}] = a[{name!r}]"]
+        return [f"    value = a[{name!r}]", f"    d[{key!r}] = {expression}"]
+
+    renamed = dict(renames)
+    lines = ["def serialize(self, a):", "    d = {}"]
+    for name in attribute_names:
+        if name in renamed or (name in serialized and serialized[name] is None):
+            continue
+        lines.extend(convert(name, name))
+    for name, key in renames:
+        if name in attribute_names:
+            lines.extend(convert(name, key))
+    if "unit" in attribute_names and "unit" not in renamed:
+        lines.append("    if not d['unit']:")
+        lines.append("        del d['unit']")
+    lines.append("    return d")
+
+    namespace: Dict[str, Any] = {"_serialize_value": _serialize_value}
+    code = compile("\n".join(lines), f"<serializer for {cls.__name__}>", "exec")
+    exec(code, namespace)
+    return namespace["serialize"]
+
+
+def _json_default(o: Any) -> Any:
+    if isinstance(o, datetime.datetime):
+        return o.isoformat()
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+# Shared, so that the encoder isn't set up again for every metric.
+_JSON_ENCODER = json.JSONEncoder(
+    sort_keys=True, separators=(",", ":"), default=_json_default
+)
+
+
 class Metric:
     typename: str = "ERROR"
     glean_internal_metric_cat: str = "glean.internal.metrics"
     metric_types: Dict[str, Any] = {}
     default_store_names: List[str] = ["metrics"]
 
+    # How `serialize` converts each of the known attributes: a Python
+    # expression of the attribute's `value` and the metric `self`, or `None`
+    # to leave the attribute out.  Subclasses list their own attributes, which
+    # are merged with these.  Any other attribute is converted based on its
+    # type.
+    serialized_attributes: Dict[str, Optional[str]] = {
+        "type": "value",
+        "category": None,
+        "name": None,
+        "bugs": "value",
+        "description": "value",
+        "notification_emails": "value",
+        "expires": "value",
+        "metadata": "value",
+        "data_reviews": "value",
+        "version": "value",
+        "disabled": "value",
+        "lifetime": "value.name",
+        "send_in_pings": "value",
+        "unit": "value",
+        "gecko_datapoint": "value",
+        "no_lint": "value",
+        "data_sensitivity": "[x.name for x in value]",
+        "defined_in": "value",
+        "telemetry_mirror": "value",
+        "in_session": "value",
+        "_config": None,
+        "_expiry": None,
+        "_generate_enums": None,
+        "_generate_structure": None,
+    }
+
     def __init__(
         self,
         type: str,
@@ -123,8 +243,14 @@ class Metric:
             self.category = ""
 
     def __init_subclass__(cls, **kwargs):
-        # Create a mapping of all of the subclasses of this class
-        if cls not in Metric.metric_types and hasattr(cls, "typename"):
+        # Create a mapping of all of the subclasses of this class.  The
+        # subclasses created by `compact` are left out, so they don't replace
+        # the classes they derive from.
+        if (
+            cls not in Metric.metric_types
+            and hasattr(cls, "typename")
+            and "_compact_fields" not in cls.__dict__
+        ):
             Metric.metric_types[cls.typename] = cls
         super().__init_subclass__(**kwargs)
 
@@ -165,36 +291,128 @@ class Metric:
             **metric_info,
         )
 
+    @classmethod
+    @util.keep_value
+    def make_metrics(
+        cls,
+        metrics_info: Iterable[Tuple[str, str, Dict[str, util.JSONType]]],
+        config: Optional[Dict[str, Any]] = None,
+    ) -> Generator[Diagnostic, None, List[Optional["Metric"]]]:
+        """
+        Given a sequence of (category, name, metric_info) tuples, return a
+        metric instance for each of them.
+
+        This is equivalent to calling `make_metric` for each of them, but much
+        faster, since all of the metrics are validated against the schema
+        together rather than one at a time.
+
+        :param: metrics_info A sequence of (category, name, metric_info)
+            tuples, where metric_info is a dictionary of the remaining metric
+            parameters, as for `make_metric`.
+        :param: config A dictionary containing commandline configuration
+            parameters
+        :return: A generator of error strings, one per problem found.  Once
+            it is exhausted, its `value` attribute is a list with a Metric
+            instance for each of the entries in `metrics_info`, or `None` for
+            the ones that have errors.
+        """
+        # Avoid cyclical import
+        from . import parser
+
+        results: List[Optional[Metric]] = []
+        keys: List[Tuple[str, str]] = []
+        # Each document holds any given category and name only once, so
+        # duplicates are validated in separate documents.
+        documents: List[Dict[str, Any]] = []
+        document_indices: List[Dict[Tuple[str, str], int]] = []
+
+        for i, (category, name, metric_info) in enumerate(metrics_info):
+            keys.append((category, name))
+            try:
+                metric = cls.make_metric(
+                    category, name, metric_info, config=config, validated=True
+                )
+            except Exception as e:
+                yield Diagnostic(
+                    "",
+                    f"On instance {category}.{name}",
+                    str(e),
+                    code="INVALID_METRIC",
+                    object_id=f"{category}.{name}",
+                )
+                results.append(None)
+                continue
+            results.append(metric)
+
+            for document, indices in zip(documents, document_indices):
+                if (category, name) not in indices:
+                    break
+            else:
+                document = {"$schema": parser.METRICS_ID}
+                indices = {}
+                documents.append(document)
+                document_indices.append(indices)
+            document.setdefault(category, {})[name] = metric._serialize_input()
+            indices[(category, name)] = i
+
+        for document, indices in zip(documents, document_indices):
+            # Find the metrics that have errors.  Errors that are not about a
+            # single metric implicate all of the metrics below them.
+            failed: Set[int] = set()
+            for error in parser._validation_errors(document, parser.METRICS_ID):
+                path = tuple(error.absolute_path)[:2]
+                failed.update(v for k, v in indices.items() if k[: len(path)] == path)
+
+            # Validate each of those metrics on its own to report its errors
+            # exactly as `make_metric` would.
+            for i in sorted(failed):
+                category, name = keys[i]
+                single = {
+                    "$schema": parser.METRICS_ID,
+                    category: {name: document[category][name]},
+                }
+                errors = list(parser._validation_errors(single, parser.METRICS_ID))
+                for error in errors:
+                    yield Diagnostic(
+                        "",
+                        f"On instance {category}.{name}",
+                        functools.partial(util.pprint_validation_error, error),
+                        code="SCHEMA_VIOLATION",
+                        object_id=f"{category}.{name}",
+                    )
+                if errors:
+                    results[i] = None
+
+        return results
+
+    def _attributes(self) -> Dict[str, Any]:
+        """
+        The instance attributes, in the order they were set.
+        """
+        return self.__dict__.copy()
+
     def serialize(
         self, rename_fields: Optional[Dict[str, str]] = None
     ) -> Dict[str, util.JSONType]:
         """
         Serialize the metric back to JSON object model.
         """
-        d = self.__dict__.copy()
-        # Convert enum fields back to strings
-        for key, val in d.items():
-            if isinstance(val, enum.Enum):
-                d[key] = d[key].name
-            if isinstance(val, set):
-                d[key] = sorted(list(val))
-            if isinstance(val, list) and len(val) and isinstance(val[0], enum.Enum):
-                d[key] = [x.name for x in val]
-
-        if rename_fields is not None:
-            for key, val in rename_fields.items():
-                if key in d:
-                    d[val] = d[key]
-                    del d[key]
-
-        del d["name"]
-        del d["category"]
-        if not d["unit"]:
-            d.pop("unit")
-        d.pop("_config", None)
-        d.pop("_generate_enums", None)
-        d.pop("_generate_structure", None)
-        return d
+        # The serializer is generated the first time a class with a given set
+        # of attributes is serialized.
+        if type(self)._attributes is Metric._attributes:
+            attributes = self.__dict__
+        else:
+            attributes = self._attributes()
+        renames = tuple(rename_fields.items()) if rename_fields else ()
+        cls: Any = self.__class__
+        serializer = _make_serializer(cls, tuple(attributes), renames)
+        return serializer(self, attributes)
+
+    def to_json_bytes(self) -> bytes:
+        """
+        Serialize the metric to compact JSON, with sorted keys.
+        """
+        return _JSON_ENCODER.encode(self.serialize()).encode("ascii")
 
     def _serialize_input(self) -> Dict[str, util.JSONType]:
         d = self.serialize()
@@ -214,15 +432,22 @@ class Metric:
     def is_disabled(self) -> bool:
         return self.disabled or self.is_expired()
 
+    def _expiry_evaluator(self) -> ExpiryEvaluator:
+        # The parser shares one evaluator between all of the metrics of a run.
+        evaluator = getattr(self, "_expiry", None)
+        if evaluator is None:
+            evaluator = ExpiryEvaluator(self._config.get("expire_by_version"))
+        return evaluator
+
     def is_expired(self) -> bool:
         def default_handler(expires) -> bool:
-            return util.is_expired(expires, self._config.get("expire_by_version"))
+            return self._expiry_evaluator().is_expired(expires)
 
         return self._config.get("custom_is_expired", default_handler)(self.expires)
 
     def validate_expires(self):
         def default_handler(expires):
-            return util.validate_expires(expires, self._config.get("expire_by_version"))
+            return self._expiry_evaluator().validate_expires(expires)
 
         return self._config.get("custom_validate_expires", default_handler)(
             self.expires
@@ -263,6 +488,8 @@ class TimeUnit(enum.Enum):
 
 
 class TimeBase(Metric):
+    serialized_attributes = {"time_unit": "value.name"}
+
     def __init__(self, *args, **kwargs):
         self.time_unit = getattr(TimeUnit, kwargs.pop("time_unit", "millisecond"))
         super().__init__(*args, **kwargs)
@@ -290,6 +517,8 @@ class MemoryUnit(enum.Enum):
 class MemoryDistribution(Metric):
     typename = "memory_distribution"
 
+    serialized_attributes = {"memory_unit": "value.name"}
+
     def __init__(self, *args, **kwargs):
         self.memory_unit = getattr(MemoryUnit, kwargs.pop("memory_unit", "byte"))
         super().__init__(*args, **kwargs)
@@ -303,6 +532,13 @@ class HistogramType(enum.Enum):
 class CustomDistribution(Metric):
     typename = "custom_distribution"
 
+    serialized_attributes = {
+        "range_min": "value",
+        "range_max": "value",
+        "bucket_count": "value",
+        "histogram_type": "value.name",
+    }
+
     def __init__(self, *args, **kwargs):
         self.range_min = kwargs.pop("range_min", 1)
         self.range_max = kwargs.pop("range_max")
@@ -322,6 +558,8 @@ class Event(Metric):
 
     default_store_names = ["events"]
 
+    serialized_attributes = {"extra_keys": "value"}
+
     def __init__(self, *args, **kwargs):
         self.extra_keys = kwargs.pop("extra_keys", {})
         self.in_session = kwargs.pop("in_session", True)
@@ -398,6 +636,11 @@ class CowString(str):
 class Labeled(Metric):
     labeled = True
 
+    serialized_attributes = {
+        "ordered_labels": None,
+        "labels": "self.ordered_labels",
+    }
+
     def __init__(self, *args, **kwargs):
         labels = kwargs.pop("labels", None)
         if labels is not None:
@@ -408,17 +651,6 @@ class Labeled(Metric):
             self.labels = None
         super().__init__(*args, **kwargs)
 
-    def serialize(
-        self, rename_fields: Optional[Dict[str, str]] = None
-    ) -> Dict[str, util.JSONType]:
-        """
-        Serialize the metric back to JSON object model.
-        """
-        d = super().serialize(rename_fields=rename_fields)
-        d["labels"] = self.ordered_labels
-        del d["ordered_labels"]
-        return d
-
 
 class LabeledBoolean(Labeled, Boolean):
     typename = "labeled_boolean"
@@ -451,6 +683,8 @@ class LabeledQuantity(Labeled, Quantity):
 class Rate(Metric):
     typename = "rate"
 
+    serialized_attributes = {"denominator_metric": "value"}
+
     def __init__(self, *args, **kwargs):
         self.denominator_metric = kwargs.pop("denominator_metric", None)
         super().__init__(*args, **kwargs)
@@ -581,6 +815,13 @@ class DualLabeledCounter(Metric):
     typename = "dual_labeled_counter"
     dual_labeled = True
 
+    serialized_attributes = {
+        "ordered_keys": None,
+        "keys": "self.ordered_keys",
+        "ordered_categories": None,
+        "categories": "self.ordered_categories",
+    }
+
     def __init__(self, *args, **kwargs):
         dual_labels = kwargs.pop("dual_labels", None)
         if not dual_labels:
@@ -615,18 +856,5 @@ class DualLabeledCounter(Metric):
             self.categories = None
         super().__init__(*args, **kwargs)
 
-    def serialize(
-        self, rename_fields: Optional[Dict[str, str]] = None
-    ) -> Dict[str, util.JSONType]:
-        """
-        Serialize the metric back to JSON object model.
-        """
-        d = super().serialize(rename_fields=rename_fields)
-        d["keys"] = self.ordered_keys
-        d["categories"] = self.ordered_categories
-        del d["ordered_keys"]
-        del d["ordered_categories"]
-        return d
-
 
 ObjectTree = Dict[str, Dict[str, Union[Metric, pings.Ping, tags.Tag]]]
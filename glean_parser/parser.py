@@ -8,14 +8,40 @@
 Code for parsing metrics.yaml files.
 """
 
+import concurrent.futures
 import functools
+import hashlib
+import json
+import os
 from pathlib import Path
 import textwrap
-from typing import Any, cast, Dict, Generator, Iterable, Optional, Set, Tuple, Union
-
-import jsonschema  # type: ignore
-from jsonschema.exceptions import ValidationError  # type: ignore
-
+from typing import (
+    Any,
+    Callable,
+    cast,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+from . import compact
+from . import compiled_schema
+from . import snapshot
+from .cache import LoadCache, file_digest, file_stamp, open_cache
+from .diagnostics import Diagnostic
+from .expiry import ExpiryEvaluator
+from .interesting import (
+    IDENTIFIER_LIST_SUFFIX,
+    InterestingFilter,
+    content_identifiers,
+)
 from .metrics import Metric, ObjectTree
 from .pings import Ping, RESERVED_PING_NAMES
 from .tags import Tag
@@ -36,6 +62,7 @@ def _update_validator(validator):
     Adds some custom validators to the jsonschema validator that produce
     nicer error messages.
     """
+    from jsonschema.exceptions import ValidationError  # type: ignore
 
     def required(validator, required, instance, schema):
         if not validator.is_type(instance, "object"):
@@ -52,14 +79,72 @@ def _update_validator(validator):
     validator.VALIDATORS["required"] = required
 
 
+def _lookup_cache(
+    filepath: Path, cache: Optional[LoadCache]
+) -> Tuple[Optional[str], Optional[Tuple[Dict[str, util.JSONType], Optional[str]]]]:
+    """
+    Look the given file up in the `cache`.
+
+    Returns the digest of the file (or `None` if it can't be cached) and the
+    cached `(content, filetype)`, if any.
+    """
+    if cache is None or not isinstance(filepath, Path):
+        return None, None
+
+    try:
+        digest = cache.digest(filepath)
+    except OSError:
+        # Let the regular loading path report the problem.
+        return None, None
+
+    return digest, cache.get(filepath, digest)
+
+
+def _store_cache(
+    filepath: Path,
+    cache: Optional[LoadCache],
+    digest: Optional[str],
+    content: Dict[str, util.JSONType],
+    filetype: Optional[str],
+) -> None:
+    """
+    Store the result of loading a file in the `cache`.
+    """
+    # Validation errors reset the content, so only successfully validated
+    # files end up in the cache.
+    if cache is not None and digest is not None and filetype is not None and content:
+        cache.set(filepath, digest, content, filetype)
+
+
 def _load_file(
-    filepath: Path, parser_config: Dict[str, Any]
-) -> Generator[str, None, Tuple[Dict[str, util.JSONType], Optional[str]]]:
+    filepath: Path,
+    parser_config: Dict[str, Any],
+    cache: Optional[LoadCache] = None,
+) -> Generator[Diagnostic, None, Tuple[Dict[str, util.JSONType], Optional[str]]]:
     """
     Load a metrics.yaml or pings.yaml format file.
 
     If the `filepath` does not exist, raises `FileNotFoundError`, unless
     `parser_config["allow_missing_files"]` is `True`.
+
+    If a `cache` is given, files that have been successfully loaded and
+    validated before are returned from it without being parsed again.
+    """
+    digest, cached = _lookup_cache(filepath, cache)
+    if cached is not None:
+        return cached
+
+    content, filetype = yield from _load_and_validate_file(filepath, parser_config)
+    _store_cache(filepath, cache, digest, content, filetype)
+    return content, filetype
+
+
+def _load_and_validate_file(
+    filepath: Path, parser_config: Dict[str, Any]
+) -> Generator[Diagnostic, None, Tuple[Dict[str, util.JSONType], Optional[str]]]:
+    """
+    Load a metrics.yaml or pings.yaml format file and validate it against its
+    schema, bypassing the cache.
     """
     try:
         content = util.load_yaml_or_json(filepath)
@@ -69,11 +154,13 @@ def _load_file(
         else:
             return {}, None
     except Exception as e:
-        yield util.format_error(filepath, "", textwrap.fill(str(e)))
+        yield Diagnostic(filepath, "", textwrap.fill(str(e)), code="INVALID_FILE")
         return {}, None
 
     if content is None:
-        yield util.format_error(filepath, "", f"'{filepath}' file can not be empty.")
+        yield Diagnostic(
+            filepath, "", f"'{filepath}' file can not be empty.", code="INVALID_FILE"
+        )
         return {}, None
 
     if not isinstance(content, dict):
@@ -95,76 +182,313 @@ def _load_file(
     if filetype not in ("metrics", "pings", "tags"):
         filetype = None
 
-    for error in validate(content, filepath):
+    for error in validate(content, filepath, parser_config):
         content = {}
         yield error
 
     return content, filetype
 
 
+# The parser config keys that affect loading a file, and are therefore passed
+# on to worker processes.  The rest of the config may contain things that can't
+# be sent to another process, such as callables.
+_LOAD_CONFIG_KEYS = ("allow_missing_files",)
+
+
+def _load_file_collecting_errors(
+    filepath: Path, parser_config: Dict[str, Any]
+) -> Tuple[List[Diagnostic], Tuple[Dict[str, util.JSONType], Optional[str]]]:
+    """
+    Load and validate a file in a worker process, returning the errors found
+    together with the loaded content and filetype.
+    """
+    result = util.keep_value(_load_and_validate_file)(filepath, parser_config)
+    errors = list(result)
+    return errors, result.value
+
+
+def _replay_load_result(
+    filepath: Path,
+    future: "concurrent.futures.Future",
+    cache: Optional[LoadCache],
+    digest: Optional[str],
+) -> Generator[Diagnostic, None, Tuple[Dict[str, util.JSONType], Optional[str]]]:
+    """
+    Turn the result of `_load_file_collecting_errors` back into the same
+    generator interface as `_load_file`.
+    """
+    errors, (content, filetype) = future.result()
+    yield from errors
+    _store_cache(filepath, cache, digest, content, filetype)
+    return content, filetype
+
+
+def _cached_load_result(
+    result: Tuple[Dict[str, util.JSONType], Optional[str]],
+) -> Generator[Diagnostic, None, Tuple[Dict[str, util.JSONType], Optional[str]]]:
+    return result
+    yield
+
+
+def _load_files(
+    filepaths: Sequence[Path],
+    parser_config: Dict[str, Any],
+    cache: Optional[LoadCache] = None,
+) -> Iterator[
+    Tuple[
+        Path,
+        Generator[Diagnostic, None, Tuple[Dict[str, util.JSONType], Optional[str]]],
+    ]
+]:
+    """
+    Load a list of files, yielding pairs of the file path and a generator with
+    the same interface as `_load_file`, in the order of `filepaths`.
+
+    If `parser_config["jobs"]` is greater than 1, the files are loaded and
+    validated concurrently in a pool of worker processes.  Since the results
+    are still consumed in input order, the errors and the resulting object
+    tree are exactly the same as when loading sequentially.
+    """
+    jobs = parser_config.get("jobs") or 1
+    if jobs < 0:
+        jobs = os.cpu_count() or 1
+
+    if jobs == 1 or len(filepaths) < 2:
+        for filepath in filepaths:
+            yield filepath, _load_file(filepath, parser_config, cache)
+        return
+
+    worker_config = {
+        key: parser_config[key] for key in _LOAD_CONFIG_KEYS if key in parser_config
+    }
+    executor = concurrent.futures.ProcessPoolExecutor(
+        max_workers=min(jobs, len(filepaths))
+    )
+    try:
+        pending = []
+        for filepath in filepaths:
+            digest, cached = _lookup_cache(filepath, cache)
+            if cached is not None:
+                pending.append((filepath, _cached_load_result(cached)))
+            else:
+                future = executor.submit(
+                    _load_file_collecting_errors, filepath, worker_config
+                )
+                pending.append(
+                    (filepath, _replay_load_result(filepath, future, cache, digest))
+                )
+
+        yield from pending
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+SCHEMA_ID_PREFIX = "moz://mozilla.org/schemas/glean/"
+
+
 @functools.lru_cache(maxsize=1)
+def _schema_paths() -> Dict[str, Path]:
+    """
+    Map the $id of each of the known schemas to its file on disk.
+
+    The $id is derived from the filename, e.g. `metrics.2-0-0.schema.yaml` has
+    the $id `moz://mozilla.org/schemas/glean/metrics/2-0-0`, so no schema needs
+    to be read to build the map.
+    """
+    paths = {}
+    for schema_path in sorted(SCHEMAS_DIR.glob("*.schema.yaml")):
+        kind, version = schema_path.name[: -len(".schema.yaml")].split(".", 1)
+        paths[f"{SCHEMA_ID_PREFIX}{kind}/{version}"] = schema_path
+    return paths
+
+
+def _read_schema(schema_path: Path) -> Any:
+    """
+    Read a schema, preferring the JSON copy generated at build time (see
+    `hatch_build.py`) over the YAML source, since it is much faster to load.
+
+    The copy records the SHA-256 of the YAML source it was generated from, and
+    is only used if that still matches.  File modification times aren't
+    reliable for this, since installing a package doesn't preserve them.
+    """
+    json_path = schema_path.with_suffix(".json")
+    try:
+        source = schema_path.read_bytes()
+        with json_path.open("r", encoding="utf-8") as fd:
+            copy = json.load(fd)
+        if (
+            isinstance(copy, dict)
+            and copy.get("yaml_sha256") == hashlib.sha256(source).hexdigest()
+        ):
+            return copy["schema"]
+    except (OSError, ValueError, KeyError):
+        pass
+    return util.load_yaml_or_json(schema_path)
+
+
+@functools.lru_cache(maxsize=None)
+def _load_schema_document(schema_id: str) -> Any:
+    """
+    Load the schema with the given $id.
+
+    The schemas are checked against their meta-schema by the test suite and
+    when building the package, so that isn't repeated here.
+    """
+    return _read_schema(_schema_paths()[schema_id])
+
+
+@functools.lru_cache(maxsize=None)
+def _load_schema(schema_id: str) -> Tuple[Any, Any]:
+    """
+    Load the schema with the given $id, and build a validator for it.
+    """
+    import jsonschema  # type: ignore
+
+    schema = _load_schema_document(schema_id)
+    resolver = util.get_null_resolver(schema)
+    validator_class = jsonschema.validators.validator_for(schema)
+    _update_validator(validator_class)
+    validator = validator_class(schema, resolver=resolver)
+    return schema, validator
+
+
 def _load_schemas() -> Dict[str, Tuple[Any, Any]]:
     """
-    Load all of the known schemas from disk, and put them in a map based on the
-    schema's $id.
+    Load all of the known schemas, and put them in a map based on the schema's
+    $id.
     """
-    schemas = {}
-    for schema_path in SCHEMAS_DIR.glob("*.yaml"):
-        schema = util.load_yaml_or_json(schema_path)
-        resolver = util.get_null_resolver(schema)
-        validator_class = jsonschema.validators.validator_for(schema)
-        _update_validator(validator_class)
-        validator_class.check_schema(schema)
-        validator = validator_class(schema, resolver=resolver)
-        schemas[schema["$id"]] = (schema, validator)
-    return schemas
+    return {schema_id: _load_schema(schema_id) for schema_id in _schema_paths()}
 
 
-def _get_schema(
-    schema_id: str, filepath: Union[str, Path] = "<input>"
-) -> Tuple[Any, Any]:
+def _check_schema_id(schema_id: str, filepath: Union[str, Path]) -> None:
     """
-    Get the schema for the given schema $id.
+    Raise a ValueError if there is no known schema with the given $id.
     """
-    schemas = _load_schemas()
-    if schema_id not in schemas:
+    schema_paths = _schema_paths()
+    if schema_id not in schema_paths:
         raise ValueError(
-            util.format_error(
+            Diagnostic(
                 filepath,
                 "",
-                f"$schema key must be one of {', '.join(schemas.keys())}",
+                f"$schema key must be one of {', '.join(schema_paths.keys())}",
+                code="INVALID_SCHEMA",
             )
         )
-    return schemas[schema_id]
 
 
-def _get_schema_for_content(
-    content: Dict[str, util.JSONType], filepath: Union[str, Path]
+def _get_schema(
+    schema_id: str, filepath: Union[str, Path] = "<input>"
 ) -> Tuple[Any, Any]:
     """
-    Get the appropriate schema for the given JSON content.
+    Get the schema for the given schema $id.
+    """
+    _check_schema_id(schema_id, filepath)
+    return _load_schema(schema_id)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_fast_validator(
+    schema_id: str, use_cache: bool = False, cache_dir: Optional[str] = None
+) -> Optional[Callable[[Any], bool]]:
+    """
+    Get the compiled fast-path validation function for the given schema $id,
+    or `None` if the schema can't be compiled.
+
+    The compiled code is kept in memory, and only cached on disk if
+    `use_cache` is set, see `compiled_schema.load_validator`.
+    """
+    _check_schema_id(schema_id, "<input>")
+    return compiled_schema.load_validator(
+        _load_schema_document(schema_id),
+        use_cache,
+        Path(cache_dir) / "validators" if cache_dir is not None else None,
+    )
+
+
+def _fast_validator_cache(
+    parser_config: Optional[Dict[str, Any]],
+) -> Tuple[bool, Optional[str]]:
+    """
+    Whether to cache the compiled validators on disk, and the directory to
+    cache them in, following the `cache` and `cache_dir` parser config.
+    """
+    if not parser_config or not parser_config.get("cache", False):
+        return False, None
+    cache_dir = parser_config.get("cache_dir")
+    return True, str(cache_dir) if cache_dir is not None else None
+
+
+def _get_schema_id_for_content(
+    content: Dict[str, util.JSONType], filepath: Union[str, Path]
+) -> str:
+    """
+    Get the $id of the appropriate schema for the given JSON content.
     """
     schema_url = content.get("$schema")
     if not isinstance(schema_url, str):
         raise TypeError("Invalid $schema type {schema_url}")
-    return _get_schema(schema_url, filepath)
+    _check_schema_id(schema_url, filepath)
+    return schema_url
+
+
+def _get_schema_for_content(
+    content: Dict[str, util.JSONType], filepath: Union[str, Path]
+) -> Tuple[Any, Any]:
+    """
+    Get the appropriate schema for the given JSON content.
+    """
+    return _load_schema(_get_schema_id_for_content(content, filepath))
 
 
 def validate(
-    content: Dict[str, util.JSONType], filepath: Union[str, Path] = "<input>"
-) -> Generator[str, None, None]:
+    content: Dict[str, util.JSONType],
+    filepath: Union[str, Path] = "<input>",
+    parser_config: Optional[Dict[str, Any]] = None,
+) -> Generator[Diagnostic, None, None]:
     """
     Validate the given content against the appropriate schema.
+
+    :param parser_config: The parser config.  If its `cache` is enabled, the
+        validation code generated from the schema is cached on disk too.
     """
     try:
-        schema, validator = _get_schema_for_content(content, filepath)
+        schema_id = _get_schema_id_for_content(content, filepath)
     except ValueError as e:
-        yield str(e)
-    else:
-        yield from (
-            util.format_error(filepath, "", util.pprint_validation_error(e))
-            for e in validator.iter_errors(content)
+        yield e.args[0]
+        return
+
+    # Formatting the errors is slow, so it is only done if they are printed.
+    depth = 2 if schema_id.startswith(METRICS_ID.rsplit("/", 1)[0]) else 1
+    yield from (
+        Diagnostic(
+            filepath,
+            "",
+            functools.partial(util.pprint_validation_error, e),
+            code="SCHEMA_VIOLATION",
+            object_id=".".join(str(x) for x in list(e.absolute_path)[:depth]) or None,
         )
+        for e in _validation_errors(content, schema_id, parser_config)
+    )
+
+
+def _validation_errors(
+    content: Any, schema_id: str, parser_config: Optional[Dict[str, Any]] = None
+) -> Iterator[Any]:
+    """
+    Validate the given content against the schema with the given $id, and
+    return an iterator over the jsonschema `ValidationError`s.
+    """
+    # Most content is valid, which the compiled validator checks much faster
+    # than jsonschema does.  jsonschema is only loaded to report the errors
+    # when there are any.
+    fast_validator = _get_fast_validator(
+        schema_id, *_fast_validator_cache(parser_config)
+    )
+    if fast_validator is not None and fast_validator(content):
+        return iter(())
+
+    _, validator = _load_schema(schema_id)
+    return validator.iter_errors(content)
 
 
 def _instantiate_metrics(
@@ -173,7 +497,7 @@ def _instantiate_metrics(
     content: Dict[str, util.JSONType],
     filepath: Path,
     config: Dict[str, Any],
-) -> Generator[str, None, None]:
+) -> Generator[Diagnostic, None, None]:
     """
     Load a list of metrics.yaml files, convert the JSON information into Metric
     objects, and merge them into a single tree.
@@ -193,11 +517,13 @@ def _instantiate_metrics(
             continue
         if not config.get("allow_reserved") and category_key.split(".")[0] == "glean":
             if category_key not in ("glean.attribution", "glean.distribution"):
-                yield util.format_error(
+                yield Diagnostic(
                     filepath,
                     f"For category '{category_key}'",
                     "Categories beginning with 'glean' are reserved for "
                     "Glean internal use.",
+                    code="RESERVED_NAME",
+                    object_id=category_key,
                 )
                 continue
         all_objects.setdefault(category_key, DictWrapper())
@@ -211,11 +537,13 @@ def _instantiate_metrics(
                 and category_key in ("glean.attribution", "glean.distribution")
                 and metric_key != "ext"
             ):
-                yield util.format_error(
+                yield Diagnostic(
                     filepath,
                     f"For {category_key}.{metric_key}",
                     f"May only use semi-reserved category {category_key} with metric name 'ext'",
                     metric_val.defined_in["line"],
+                    code="RESERVED_NAME",
+                    object_id=f"{category_key}.{metric_key}",
                 )
                 continue
             try:
@@ -223,22 +551,26 @@ def _instantiate_metrics(
                     category_key, metric_key, metric_val, validated=True, config=config
                 )
             except Exception as e:
-                yield util.format_error(
+                yield Diagnostic(
                     filepath,
                     f"On instance {category_key}.{metric_key}",
                     str(e),
                     metric_val.defined_in["line"],
+                    code="INVALID_METRIC",
+                    object_id=f"{category_key}.{metric_key}",
                 )
                 metric_obj = None
             else:
                 if not config.get("allow_reserved"):
                     if "all-pings" in metric_obj.send_in_pings:
-                        yield util.format_error(
+                        yield Diagnostic(
                             filepath,
                             f"On instance {category_key}.{metric_key}",
                             'Only internal metrics may specify "all-pings" '
                             'in "send_in_pings"',
                             metric_val.defined_in["line"],
+                            code="RESERVED_NAME",
+                            object_id=f"{category_key}.{metric_key}",
                         )
                         metric_obj = None
                     elif (
@@ -246,11 +578,13 @@ def _instantiate_metrics(
                         in ("glean.attribution.ext", "glean.distribution.ext")
                         and metric_obj.type != "object"
                     ):
-                        yield util.format_error(
+                        yield Diagnostic(
                             filepath,
                             f"On instance {category_key}.{metric_key}",
                             "Extended attribution/distribution metrics must be of type 'object'",
                             metric_val.defined_in["line"],
+                            code="INVALID_METRIC",
+                            object_id=f"{category_key}.{metric_key}",
                         )
                         metric_obj = None
 
@@ -267,7 +601,7 @@ def _instantiate_metrics(
             already_seen = sources.get((category_key, metric_key))
             if already_seen is not None:
                 # We've seen this metric name already
-                yield util.format_error(
+                yield Diagnostic(
                     filepath,
                     "",
                     (
@@ -275,6 +609,8 @@ def _instantiate_metrics(
                         f"already defined in '{already_seen}'"
                     ),
                     metric_obj.defined_in["line"],
+                    code="DUPLICATE_NAME",
+                    object_id=f"{category_key}.{metric_key}",
                 )
             else:
                 if not hasattr(all_objects[category_key], "duplicate"):
@@ -293,7 +629,7 @@ def _instantiate_pings(
     content: Dict[str, util.JSONType],
     filepath: Path,
     config: Dict[str, Any],
-) -> Generator[str, None, None]:
+) -> Generator[Diagnostic, None, None]:
     """
     Load a list of pings.yaml files, convert the JSON information into Ping
     objects.
@@ -305,10 +641,12 @@ def _instantiate_pings(
     # Duplicate ping names end up on the root content.
     duplicate_ping = getattr(content, "duplicate", None)
     if duplicate_ping:
-        yield util.format_error(
+        yield Diagnostic(
             filepath,
             "",
             f"Duplicate ping named '{duplicate_ping}'.",
+            code="DUPLICATE_NAME",
+            object_id=duplicate_ping,
         )
 
     for ping_key, ping_val in sorted(content.items()):
@@ -318,10 +656,12 @@ def _instantiate_pings(
             continue
         if not config.get("allow_reserved"):
             if ping_key in RESERVED_PING_NAMES:
-                yield util.format_error(
+                yield Diagnostic(
                     filepath,
                     f"For ping '{ping_key}'",
                     f"Ping uses a reserved name ({RESERVED_PING_NAMES})",
+                    code="RESERVED_NAME",
+                    object_id=ping_key,
                 )
                 continue
         if not isinstance(ping_val, dict):
@@ -330,10 +670,12 @@ def _instantiate_pings(
 
         if "metadata" in ping_val and "ping_schedule" in ping_val["metadata"]:
             if ping_key in ping_val["metadata"]["ping_schedule"]:
-                yield util.format_error(
+                yield Diagnostic(
                     filepath,
                     f"For ping '{ping_key}'",
                     "ping_schedule contains its own ping name",
+                    code="INVALID_PING",
+                    object_id=ping_key,
                 )
                 continue
             for ping_schedule in ping_val["metadata"]["ping_schedule"]:
@@ -348,7 +690,13 @@ def _instantiate_pings(
                 **ping_val,
             )
         except Exception as e:
-            yield util.format_error(filepath, f"On instance '{ping_key}'", str(e))
+            yield Diagnostic(
+                filepath,
+                f"On instance '{ping_key}'",
+                str(e),
+                code="INVALID_PING",
+                object_id=ping_key,
+            )
             continue
 
         if ping_obj is not None:
@@ -360,10 +708,12 @@ def _instantiate_pings(
         already_seen = sources.get(ping_key)
         if already_seen is not None:
             # We've seen this ping name already
-            yield util.format_error(
+            yield Diagnostic(
                 filepath,
                 "",
                 f"Duplicate ping name '{ping_key}' already defined in '{already_seen}'",
+                code="DUPLICATE_NAME",
+                object_id=ping_key,
             )
         else:
             all_objects.setdefault("pings", {})[ping_key] = ping_obj
@@ -383,7 +733,7 @@ def _instantiate_tags(
     content: Dict[str, util.JSONType],
     filepath: Path,
     config: Dict[str, Any],
-) -> Generator[str, None, None]:
+) -> Generator[Diagnostic, None, None]:
     """
     Load a list of tags.yaml files, convert the JSON information into Tag
     objects.
@@ -406,7 +756,13 @@ def _instantiate_tags(
                 **tag_val,
             )
         except Exception as e:
-            yield util.format_error(filepath, f"On instance '{tag_key}'", str(e))
+            yield Diagnostic(
+                filepath,
+                f"On instance '{tag_key}'",
+                str(e),
+                code="INVALID_TAG",
+                object_id=tag_key,
+            )
             continue
 
         if tag_obj is not None:
@@ -418,43 +774,142 @@ def _instantiate_tags(
         already_seen = sources.get(tag_key)
         if already_seen is not None:
             # We've seen this tag name already
-            yield util.format_error(
+            yield Diagnostic(
                 filepath,
                 "",
                 f"Duplicate tag name '{tag_key}' already defined in '{already_seen}'",
+                code="DUPLICATE_NAME",
+                object_id=tag_key,
             )
         else:
             all_objects.setdefault("tags", {})[tag_key] = tag_obj
             sources[tag_key] = filepath
 
 
+def _preprocess_metric(
+    obj: Metric, config: Dict[str, Any], evaluator: ExpiryEvaluator
+) -> None:
+    """
+    Preprocess a single metric to better set defaults.
+    """
+    setattr(obj, "_expiry", evaluator)
+
+    if not config.get("do_not_disable_expired", False) and hasattr(obj, "is_disabled"):
+        obj.disabled = obj.is_disabled()
+
+    if hasattr(obj, "send_in_pings"):
+        if "default" in obj.send_in_pings:
+            obj.send_in_pings = obj.default_store_names + [
+                x for x in obj.send_in_pings if x != "default"
+            ]
+        obj.send_in_pings = sorted(list(set(obj.send_in_pings)))
+
+
 def _preprocess_objects(objs: ObjectTree, config: Dict[str, Any]) -> ObjectTree:
     """
     Preprocess the object tree to better set defaults.
     """
+    # Shared by all of the metrics, so each distinct `expires` value is only
+    # evaluated once, against a single reference time.
+    evaluator = ExpiryEvaluator(config.get("expire_by_version"))
+
     for category in objs.values():
         for obj in category.values():
-            if not isinstance(obj, Metric):
+            if isinstance(obj, Metric):
+                _preprocess_metric(obj, config, evaluator)
+    return objs
+
+
+def _load_interesting(
+    config: Dict[str, Any],
+    cache: Optional[LoadCache],
+    loaded: Optional[Dict[Any, List[str]]] = None,
+) -> Generator[Diagnostic, None, InterestingFilter]:
+    """
+    Load the files given in the `interesting` config into a filter.
+
+    They are either metrics.yaml files, or plain lists of identifiers and
+    patterns (see `InterestingFilter.add_identifier_list`).
+
+    :param loaded: The metric identifiers of the files that were already
+        loaded as input files, so they are not loaded again.
+    """
+    if loaded is None:
+        loaded = {}
+
+    interesting = InterestingFilter()
+    for filepath in util.ensure_list(config.get("interesting")):
+        if isinstance(filepath, Path) and filepath in loaded:
+            interesting.identifiers.update(loaded[filepath])
+        elif isinstance(filepath, Path) and filepath.suffix == IDENTIFIER_LIST_SUFFIX:
+            try:
+                text = filepath.read_text(encoding="utf-8")
+            except FileNotFoundError:
+                if not config.get("allow_missing_files", False):
+                    raise
                 continue
+            interesting.add_identifier_list(text)
+        else:
+            content, _ = yield from _load_file(filepath, config, cache)
+            if not isinstance(content, dict):
+                raise TypeError(f"Invalid content for {filepath}")
+            interesting.identifiers.update(content_identifiers(content))
+    return interesting
+
+
+def _disable_uninteresting(
+    all_objects: ObjectTree, interesting: InterestingFilter
+) -> None:
+    """
+    Disable the metrics that aren't interesting.
+    """
+    for category_key, category_val in all_objects.items():
+        if category_key in ("pings", "tags"):
+            continue
 
-            if not config.get("do_not_disable_expired", False) and hasattr(
-                obj, "is_disabled"
+        for metric_key, obj in category_val.items():
+            if hasattr(obj, "disabled") and not interesting.is_interesting(
+                category_key, metric_key
             ):
-                obj.disabled = obj.is_disabled()
-
-            if hasattr(obj, "send_in_pings"):
-                if "default" in obj.send_in_pings:
-                    obj.send_in_pings = obj.default_store_names + [
-                        x for x in obj.send_in_pings if x != "default"
-                    ]
-                obj.send_in_pings = sorted(list(set(obj.send_in_pings)))
-    return objs
+                obj.disabled = True
+
+
+def _parse_files(
+    all_objects: ObjectTree,
+    sources: Dict[Any, Path],
+    filepaths: Sequence[Path],
+    config: Dict[str, Any],
+    cache: Optional[LoadCache],
+    loaded_identifiers: Optional[Dict[Any, List[str]]] = None,
+) -> Generator[Diagnostic, None, None]:
+    """
+    Load, validate and instantiate the objects of the given input files.
+
+    :param loaded_identifiers: If given, the identifiers of the metrics defined
+        in each file are added to it, for `_load_interesting`.
+    """
+    for filepath, loaded in _load_files(filepaths, config, cache):
+        content, filetype = yield from loaded
+        if loaded_identifiers is not None and isinstance(filepath, Path):
+            loaded_identifiers[filepath] = content_identifiers(content)
+        if filetype == "metrics":
+            yield from _instantiate_metrics(
+                all_objects, sources, content, filepath, config
+            )
+        elif filetype == "pings":
+            yield from _instantiate_pings(
+                all_objects, sources, content, filepath, config
+            )
+        elif filetype == "tags":
+            yield from _instantiate_tags(
+                all_objects, sources, content, filepath, config
+            )
 
 
 @util.keep_value
 def parse_objects(
     filepaths: Iterable[Path], config: Optional[Dict[str, Any]] = None
-) -> Generator[str, None, ObjectTree]:
+) -> Generator[Diagnostic, None, ObjectTree]:
     """
     Parse one or more metrics.yaml and/or pings.yaml files, returning a tree of
     `metrics.Metric`, `pings.Ping`, and `tags.Tag` instances.
@@ -486,61 +941,461 @@ def parse_objects(
           the input `filepaths` do not exist.
         - `interesting`: Contains an array of interesting metrics/ping files.
           Probes not included in these files will be marked as disabled.
+          Plain `.txt` files listing metric identifiers (`category.name`) and
+          glob patterns (`category.*`), one per line, can be used as well.
+        - `cache`: Keep the loaded and validated content of input files in an
+          on-disk cache, so that unchanged files are not parsed and validated
+          again on the next run. Defaults to `False`.
+        - `cache_dir`: The directory to keep the cache in. Defaults to a
+          `parse` directory in the user's cache directory.
+        - `cache_size_limit`: The maximum size of the cache in bytes. The
+          least-recently used entries are evicted when it is exceeded.
+        - `input_digests`: The stamps and digests of the input files, as
+          computed by `manifest.hash_inputs`, which the cache uses instead of
+          hashing the files again.
+        - `jobs`: The number of worker processes to load and validate input
+          files in. Defaults to 1, which loads them in the current process.
+          A negative number uses one process per CPU. The result is the same
+          regardless of the number of jobs.
+        - `compact`: Return compact, read-only metric, ping and tag objects
+          that use much less memory. See `glean_parser.compact`.
+
+    Instead of the input files, `filepaths` can be a single snapshot compiled
+    from them by `glean_parser compile`, which is loaded without parsing the
+    files again. See `glean_parser.snapshot`.
     """
     if config is None:
         config = {}
 
     all_objects: ObjectTree = DictWrapper()
     sources: Dict[Any, Path] = {}
+    # Interesting files are usually input files too, and are not loaded again.
+    loaded_identifiers: Dict[Any, List[str]] = {}
     filepaths = util.ensure_list(filepaths)
-    for filepath in filepaths:
-        content, filetype = yield from _load_file(filepath, config)
-        if filetype == "metrics":
-            yield from _instantiate_metrics(
-                all_objects, sources, content, filepath, config
-            )
-        elif filetype == "pings":
-            yield from _instantiate_pings(
-                all_objects, sources, content, filepath, config
+    cache = open_cache(config)
+    try:
+        if any(snapshot.is_snapshot(filepath) for filepath in filepaths):
+            loaded_snapshot = snapshot.load_objects(filepaths, config)
+            yield from loaded_snapshot
+            all_objects = loaded_snapshot.value
+        else:
+            yield from _parse_files(
+                all_objects, sources, filepaths, config, cache, loaded_identifiers
             )
-        elif filetype == "tags":
-            yield from _instantiate_tags(
-                all_objects, sources, content, filepath, config
+
+        if config.get("interesting"):
+            interesting = yield from _load_interesting(
+                config, cache, loaded_identifiers
             )
+            _disable_uninteresting(all_objects, interesting)
+    finally:
+        if cache is not None:
+            cache.close()
 
-    if config.get("interesting"):
-        # We're configured to disable probes not included in the interesting list.
-        filepaths = util.ensure_list(config.get("interesting"))
-        interesting_metrics_dict: Dict[str, Dict[str, Any]] = dict()
-        interesting_metrics_dict.setdefault("metrics", DictWrapper())
-        interesting_metrics_dict.setdefault("pings", DictWrapper())
-        for filepath in filepaths:
-            content, filetype = yield from _load_file(filepath, config)
+    all_objects = _preprocess_objects(all_objects, config)
+    if config.get("compact"):
+        compact.compact_tree(all_objects)
+    return all_objects
 
-            if not isinstance(content, dict):
-                raise TypeError(f"Invalid content for {filepath}")
 
-            for category_key, category_val in sorted(content.items()):
-                if category_key.startswith("$"):
-                    continue
+def iter_objects(
+    filepaths: Iterable[Path], config: Optional[Dict[str, Any]] = None
+) -> Generator[Tuple[str, Any], None, None]:
+    """
+    Parse one or more metrics.yaml, pings.yaml and/or tags.yaml files like
+    `parse_objects`, but yield the objects as the files are parsed instead of
+    returning the whole tree at the end.
+
+    The result is a generator of `(kind, value)` pairs, where `kind` is one
+    of:
 
-                interesting_metrics_dict.setdefault(category_key, DictWrapper())
+    - `"metric"`: `value` is a `metrics.Metric`.
+    - `"ping"`: `value` is a `pings.Ping`.
+    - `"tag"`: `value` is a `tags.Tag`.
+    - `"error"`: `value` is an error message, as yielded by `parse_objects`.
 
-                if not isinstance(category_val, dict):
-                    raise TypeError(f"Invalid category_val for {category_key}")
+    For example::
 
-                for metric_key, metric_val in sorted(category_val.items()):
-                    interesting_metrics_dict[category_key][metric_key] = metric_val
+      for kind, value in parser.iter_objects(filepaths):
+          if kind == "error":
+              print(value)
+          elif kind == "metric":
+              print(value.identifier())
+
+    Metrics and tags are yielded as soon as the file defining them is parsed,
+    preprocessed the same way `parse_objects` does it.  Pings are yielded
+    after all of the files are parsed, because pings defined in later files
+    may schedule them.
+
+    The objects and errors are the same as the ones from `parse_objects`,
+    except that errors in the `interesting` files are reported first.  The
+    first definition of a duplicated object is yielded before the error about
+    the duplicate.
+
+    :param filepaths: list of Path objects to metrics.yaml, pings.yaml, and/or
+        tags.yaml files, or a single snapshot.
+    :param config: A dictionary of options that change parsing behavior.
+        See `parse_objects` for the supported keys.
+    """
+    if config is None:
+        config = {}
 
-        for category_key, category_val in all_objects.items():
-            if category_key == "tags":
+    filepaths = util.ensure_list(filepaths)
+    if any(snapshot.is_snapshot(filepath) for filepath in filepaths):
+        # Snapshots are loaded whole anyway.
+        result = parse_objects(filepaths, config)
+        for error in result:
+            yield ("error", error)
+        yield from _object_events(result.value, config)
+        return
+
+    evaluator = ExpiryEvaluator(config.get("expire_by_version"))
+    interesting: Optional[InterestingFilter] = None
+    # Pings are kept in a single tree, so that `_instantiate_pings` can
+    # schedule the pings of earlier files.
+    ping_objects: ObjectTree = DictWrapper()
+    sources: Dict[Any, Path] = {}
+    cache = open_cache(config)
+    try:
+        if config.get("interesting"):
+            interesting = yield from _error_events(_load_interesting(config, cache))
+
+        for filepath, loaded in _load_files(filepaths, config, cache):
+            content, filetype = yield from _error_events(loaded)
+
+            if filetype == "metrics":
+                instantiate = _instantiate_metrics
+            elif filetype == "tags":
+                instantiate = _instantiate_tags
+            elif filetype == "pings":
+                yield from _error_events(
+                    _instantiate_pings(ping_objects, sources, content, filepath, config)
+                )
                 continue
+            else:
+                continue
+
+            file_objects: ObjectTree = DictWrapper()
+            yield from _error_events(
+                instantiate(file_objects, sources, content, filepath, config)
+            )
 
-            for metric_key, metric_val in sorted(category_val.items()):
-                category_dict = interesting_metrics_dict.get(category_key, {})
-                if metric_key not in category_dict:
-                    obj = all_objects[category_key][metric_key]
-                    if hasattr(obj, "disabled"):
+            for category_key, category_val in file_objects.items():
+                for key, obj in category_val.items():
+                    if not isinstance(obj, Metric):
+                        continue
+                    if interesting is not None and not interesting.is_interesting(
+                        category_key, key
+                    ):
                         obj.disabled = True
+                    _preprocess_metric(obj, config, evaluator)
+            yield from _object_events(file_objects, config)
+    finally:
+        if cache is not None:
+            cache.close()
+
+    yield from _object_events(ping_objects, config)
+
+
+def _error_events(
+    errors: Generator[Diagnostic, None, Any],
+) -> Generator[Tuple[str, Any], None, Any]:
+    """
+    The `iter_objects` events for the errors yielded by `errors`, returning
+    the value it returns.
+    """
+    while True:
+        try:
+            error = next(errors)
+        except StopIteration as e:
+            return e.value
+        yield ("error", error)
+
+
+def _object_events(
+    objs: ObjectTree, config: Dict[str, Any]
+) -> Generator[Tuple[str, Any], None, None]:
+    """
+    The `iter_objects` events for the objects in the given tree.
+    """
+    for category_val in objs.values():
+        for obj in category_val.values():
+            if isinstance(obj, Metric):
+                kind = "metric"
+            elif isinstance(obj, Ping):
+                kind = "ping"
+            elif isinstance(obj, Tag):
+                kind = "tag"
+            else:
+                continue
+            if config.get("compact"):
+                obj = compact.compact(obj)
+            yield (kind, obj)
+
+
+class _FileContribution:
+    """
+    The objects and errors contributed by a single input file to a
+    `ParseSession`.
+    """
+
+    def __init__(
+        self,
+        stamp: Optional[Tuple[int, int]],
+        digest: Optional[str],
+        filetype: Optional[str],
+        objects: ObjectTree,
+        errors: List[Diagnostic],
+        identifiers: List[str],
+    ):
+        self.stamp = stamp
+        self.digest = digest
+        self.filetype = filetype
+        self.objects = objects
+        self.errors = errors
+        # The metrics defined in the file, for the `interesting` config.
+        self.identifiers = identifiers
+        # The `disabled` value of each metric as defined in the file, before
+        # the `interesting` and expiry passes change it.
+        self.defined_disabled = [
+            (obj, obj.disabled)
+            for category_key, category_val in objects.items()
+            if category_key not in ("pings", "tags")
+            for obj in category_val.values()
+            if isinstance(obj, Metric)
+        ]
+
+    def reset_disabled(self) -> None:
+        """
+        Restore the `disabled` value of the metrics to the one defined in the
+        file.
+        """
+        for obj, disabled in self.defined_disabled:
+            obj.disabled = disabled
+
+    @property
+    def ping_schedules(self) -> Dict[str, List[str]]:
+        """
+        The pings scheduled by each ping defined in this file, as a map from
+        the scheduling ping to the scheduled ones.
+        """
+        schedules: Dict[str, Set[str]] = {}
+        for ping_key, ping_obj in self.objects.get("pings", {}).items():
+            ping_obj = cast(Ping, ping_obj)
+            for scheduler in ping_obj.metadata.get("ping_schedule", []):
+                schedules.setdefault(scheduler, set()).add(ping_key)
+        return {k: sorted(v) for k, v in schedules.items()}
+
+
+def _merge_contribution(
+    all_objects: ObjectTree,
+    sources: Dict[Any, Path],
+    contribution: _FileContribution,
+    filepath: Path,
+) -> Generator[Diagnostic, None, None]:
+    """
+    Merge the objects of a single file into the whole tree, reporting
+    duplicates the same way the `_instantiate_*` functions do.
+    """
+    objects = contribution.objects
+
+    if contribution.filetype == "metrics" and not hasattr(all_objects, "duplicate"):
+        setattr(all_objects, "duplicate", getattr(objects, "duplicate", None))
+
+    for category_key, category_val in objects.items():
+        if contribution.filetype in ("pings", "tags"):
+            for key, obj in category_val.items():
+                already_seen = sources.get(key)
+                if already_seen is not None:
+                    yield Diagnostic(
+                        filepath,
+                        "",
+                        f"Duplicate {contribution.filetype[:-1]} name '{key}' "
+                        f"already defined in '{already_seen}'",
+                        code="DUPLICATE_NAME",
+                        object_id=key,
+                    )
+                else:
+                    all_objects.setdefault(category_key, {})[key] = obj
+                    sources[key] = filepath
+            continue
 
-    return _preprocess_objects(all_objects, config)
+        all_objects.setdefault(category_key, DictWrapper())
+        for metric_key, metric_obj in category_val.items():
+            already_seen = sources.get((category_key, metric_key))
+            if already_seen is not None:
+                yield Diagnostic(
+                    filepath,
+                    "",
+                    (
+                        f"Duplicate metric name '{category_key}.{metric_key}' "
+                        f"already defined in '{already_seen}'"
+                    ),
+                    (getattr(metric_obj, "defined_in", None) or {}).get("line"),
+                    code="DUPLICATE_NAME",
+                    object_id=f"{category_key}.{metric_key}",
+                )
+            else:
+                if not hasattr(all_objects[category_key], "duplicate"):
+                    setattr(
+                        all_objects[category_key],
+                        "duplicate",
+                        getattr(category_val, "duplicate", None),
+                    )
+                all_objects[category_key][metric_key] = metric_obj
+                sources[(category_key, metric_key)] = filepath
+
+
+class ParseSession:
+    """
+    A stateful alternative to `parse_objects` for long-running processes, such
+    as editor integrations and build daemons, that need to parse the same set
+    of files over and over again.
+
+    Each call to `refresh` only loads, validates and instantiates the files
+    that changed since the previous call, and merges their objects with the
+    ones from the unchanged files::
+
+      session = parser.ParseSession(filepaths, config)
+      for err in session.refresh():
+          print(err)
+      all_metrics = session.objects
+
+    The errors and objects are the same as the ones from `parse_objects` for
+    the same files, except that duplicate definitions across files are
+    reported after the other errors of the file that contains them.
+
+    Objects from unchanged files are shared between refreshes, but the tree
+    containing them is rebuilt every time.  With the `compact` config, the
+    tree holds compact copies of them, made on every refresh.
+    """
+
+    def __init__(
+        self, filepaths: Iterable[Path], config: Optional[Dict[str, Any]] = None
+    ):
+        """
+        :param filepaths: list of Path objects to metrics.yaml, pings.yaml,
+            and/or tags.yaml files
+        :param config: A dictionary of options that change parsing behavior.
+            See `parse_objects` for the supported keys.
+        """
+        if config is None:
+            config = {}
+
+        self.filepaths = list(util.ensure_list(filepaths))
+        self.config = config
+        self.objects: ObjectTree = DictWrapper()
+        self.sources: Dict[Any, Path] = {}
+        # The files that were (re-)ingested by the last call to `refresh`.
+        self.changed: List[Path] = []
+        self._files: List[Optional[_FileContribution]] = [None] * len(self.filepaths)
+
+    def _ingest(
+        self,
+        filepath: Path,
+        stamp: Optional[Tuple[int, int]],
+        digest: Optional[str],
+        cache: Optional[LoadCache],
+    ) -> _FileContribution:
+        loaded = util.keep_value(_load_file)(filepath, self.config, cache)
+        errors = list(loaded)
+        content, filetype = loaded.value
+        identifiers = content_identifiers(content)
+
+        objects: ObjectTree = DictWrapper()
+        instantiate = {
+            "metrics": _instantiate_metrics,
+            "pings": _instantiate_pings,
+            "tags": _instantiate_tags,
+        }.get(cast(str, filetype))
+        if instantiate is not None:
+            errors.extend(instantiate(objects, {}, content, filepath, self.config))
+
+        return _FileContribution(stamp, digest, filetype, objects, errors, identifiers)
+
+    @util.keep_value
+    def refresh(self) -> Generator[Diagnostic, None, ObjectTree]:
+        """
+        Bring the object tree up-to-date with the files on disk.
+
+        Like `parse_objects`, the result is a generator over any errors, and
+        the object tree is available from `result.value` (and from
+        `self.objects`) once it is exhausted.
+        """
+        if any(snapshot.is_snapshot(filepath) for filepath in self.filepaths):
+            # Snapshots are always loaded whole, they are quick to load.
+            self.changed = list(self.filepaths)
+            result = parse_objects(self.filepaths, self.config)
+            yield from result
+            self.objects = result.value
+            return self.objects
+
+        self.changed = []
+        cache = open_cache(self.config)
+        try:
+            for index, filepath in enumerate(self.filepaths):
+                stamp = file_stamp(filepath)
+                previous = self._files[index]
+                if (
+                    previous is not None
+                    and stamp is not None
+                    and previous.stamp == stamp
+                ):
+                    continue
+
+                digest = None
+                if stamp is not None:
+                    digest = (
+                        cache.digest(filepath)
+                        if cache is not None
+                        else file_digest(filepath)
+                    )
+                if previous is not None and digest is not None:
+                    if previous.digest == digest:
+                        previous.stamp = stamp
+                        continue
+
+                self._files[index] = self._ingest(filepath, stamp, digest, cache)
+                self.changed.append(filepath)
+
+            # The scheduled pings are set up again below, the same way
+            # `_instantiate_pings` does, where later files override the
+            # schedules from earlier ones.  Likewise, the metrics are
+            # disabled again below, since the interesting files or the date
+            # may have changed.
+            for contribution in self._files:
+                assert contribution is not None
+                for ping_obj in contribution.objects.get("pings", {}).values():
+                    cast(Ping, ping_obj).schedules_pings = []
+                contribution.reset_disabled()
+
+            all_objects: ObjectTree = DictWrapper()
+            sources: Dict[Any, Path] = {}
+            for filepath, contribution in zip(self.filepaths, self._files):
+                assert contribution is not None
+                yield from contribution.errors
+                yield from _merge_contribution(
+                    all_objects, sources, contribution, filepath
+                )
+                for scheduler, scheduled in contribution.ping_schedules.items():
+                    scheduler_obj = all_objects.get("pings", {}).get(scheduler)
+                    if isinstance(scheduler_obj, Ping):
+                        scheduler_obj.schedules_pings = scheduled
+
+            if self.config.get("interesting"):
+                loaded = {
+                    filepath: contribution.identifiers
+                    for filepath, contribution in zip(self.filepaths, self._files)
+                    if contribution is not None and isinstance(filepath, Path)
+                }
+                interesting = yield from _load_interesting(self.config, cache, loaded)
+                _disable_uninteresting(all_objects, interesting)
+        finally:
+            if cache is not None:
+                cache.close()
+
+        self.objects = _preprocess_objects(all_objects, self.config)
+        if self.config.get("compact"):
+            compact.compact_tree(self.objects)
+        self.sources = sources
+        return self.objects
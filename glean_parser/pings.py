@@ -8,7 +8,7 @@
 Classes for managing the description of pings.
 """
 
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 
 
 from . import util
@@ -93,11 +93,17 @@ class Ping:
     def reason_codes(self) -> List[str]:
         return sorted(list(self.reasons.keys()))
 
+    def _attributes(self) -> Dict[str, Any]:
+        """
+        The instance attributes, in the order they were set.
+        """
+        return self.__dict__.copy()
+
     def serialize(self) -> Dict[str, util.JSONType]:
         """
         Serialize the metric back to JSON object model.
         """
-        d = self.__dict__.copy()
+        d = self._attributes()
         del d["name"]
         return d
 
@@ -33,6 +33,7 @@ from typing import Any, Dict, Optional, List
 from . import __version__
 from . import metrics
 from . import util
+from .index import get_index
 
 # Adding a metric here will require updating the `generate_metric_type` function
 # and require adjustments to `metrics` variables the the template.
@@ -103,21 +104,19 @@ def output_python(
     # ping->list of metric categories->list of metrics
     # for easier processing in the template.
     ping_to_metrics: Dict[str, Dict[str, List[metrics.Metric]]] = defaultdict(dict)
-    for _category_key, category_val in objs.items():
-        for _metric_name, metric in category_val.items():
-            if isinstance(metric, metrics.Metric):
-                if metric.type not in SUPPORTED_METRIC_TYPES:
-                    print(
-                        "❌ Ignoring unsupported metric type: "
-                        + f"{metric.type}:{metric.name}."
-                        + " Reach out to Glean team to add support for this"
-                        + " metric type."
-                    )
-                    continue
-                for ping in metric.send_in_pings:
-                    metrics_by_type = ping_to_metrics[ping]
-                    metrics_list = metrics_by_type.setdefault(metric.type, [])
-                    metrics_list.append(metric)
+    for metric in get_index(objs).metrics:
+        if metric.type not in SUPPORTED_METRIC_TYPES:
+            print(
+                "❌ Ignoring unsupported metric type: "
+                + f"{metric.type}:{metric.name}."
+                + " Reach out to Glean team to add support for this"
+                + " metric type."
+            )
+            continue
+        for ping in metric.send_in_pings:
+            metrics_by_type = ping_to_metrics[ping]
+            metrics_list = metrics_by_type.setdefault(metric.type, [])
+            metrics_list.append(metric)
 
     extension = ".py"
     filepath = output_dir / ("server_events" + extension)
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Resolution of the references between objects by name, such as the
+`denominator_metric` of a rate, over an `index.ObjectTreeIndex`.
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+
+
+from .index import ObjectTreeIndex, get_index
+from .metrics import Metric, ObjectTree
+from .pings import RESERVED_PING_NAMES
+
+
+class ReferenceKind:
+    """
+    A kind of reference from metrics or pings to other objects by name.
+
+    :param name: The name of the reference kind, usually the name of the
+        attribute holding the references.
+    :param source: Whether the references are held by "metric" or "ping"
+        objects.
+    :param targets: Returns the names referred to by an object.
+    :param lookup: Returns the object a name refers to in an index, or None
+        if there is no such object.
+    :param required: Whether a reference to a missing object is an error, or
+        just a reference to something defined outside of the parsed files.
+    :param expected: What a reference should refer to, for error messages.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        source: str,
+        targets: Callable[[Any], List[str]],
+        lookup: Callable[[ObjectTreeIndex, str], Any],
+        required: bool = False,
+        expected: str = "object",
+    ):
+        self.name = name
+        self.source = source
+        self.targets = targets
+        self.lookup = lookup
+        self.required = required
+        self.expected = expected
+
+
+def _lookup_counter(index: ObjectTreeIndex, name: str) -> Optional[Metric]:
+    metric = index.by_identifier.get(name)
+    if metric is None or metric.type not in ("counter", "denominator"):
+        return None
+    return metric
+
+
+def _lookup_ping(index: ObjectTreeIndex, name: str) -> Any:
+    if name in RESERVED_PING_NAMES:
+        return name
+    return index.pings.get(name)
+
+
+# The kinds of references that are resolved, by name.  Other kinds can be
+# added before the references are resolved.
+REFERENCE_KINDS: Dict[str, ReferenceKind] = {
+    kind.name: kind
+    for kind in [
+        ReferenceKind(
+            "denominator_metric",
+            "metric",
+            lambda metric: (
+                [metric.denominator_metric]
+                if getattr(metric, "denominator_metric", None)
+                else []
+            ),
+            _lookup_counter,
+            required=True,
+            expected="`counter`",
+        ),
+        ReferenceKind(
+            "send_in_pings",
+            "metric",
+            lambda metric: metric.send_in_pings,
+            _lookup_ping,
+            expected="ping",
+        ),
+        ReferenceKind(
+            "ping_schedule",
+            "ping",
+            lambda ping: ping.metadata.get("ping_schedule", []),
+            _lookup_ping,
+            expected="ping",
+        ),
+    ]
+}
+
+
+class References:
+    """
+    The references between the objects of a tree, resolved by
+    `resolve_references`.
+
+    - referrers: Reference kind name -> referred name -> the objects that
+      refer to it, in the order they appear in the tree.
+    - resolved: Reference kind name -> referred name -> the object it refers
+      to, for the names that could be resolved.
+    """
+
+    def __init__(self, kinds: Dict[str, ReferenceKind]):
+        self.kinds = kinds
+        self.referrers: Dict[str, Dict[str, List[Any]]] = {name: {} for name in kinds}
+        self.resolved: Dict[str, Dict[str, Any]] = {name: {} for name in kinds}
+
+    def dangling(self, kind_name: str) -> Dict[str, List[Any]]:
+        """
+        The names of the given kind that refer to nothing, and the objects
+        that refer to them.
+        """
+        resolved = self.resolved[kind_name]
+        return {
+            name: referrers
+            for name, referrers in self.referrers[kind_name].items()
+            if name not in resolved
+        }
+
+    def errors(self) -> List[str]:
+        """
+        A message for each dangling reference of a required kind.
+        """
+        errors = []
+        for kind in self.kinds.values():
+            if not kind.required:
+                continue
+            for name, referrers in self.dangling(kind.name).items():
+                names = ", ".join(_describe(referrer) for referrer in referrers)
+                errors.append(
+                    f"No {kind.expected} named {name} found to be used as "
+                    f"{kind.name} for {names}"
+                )
+        return errors
+
+
+def _describe(obj: Any) -> str:
+    if isinstance(obj, Metric):
+        return obj.identifier()
+    return obj.name
+
+
+def resolve_references(
+    index: ObjectTreeIndex, kinds: Optional[Dict[str, ReferenceKind]] = None
+) -> References:
+    """
+    Resolve all of the references in an index, looking up each referred name
+    only once.
+
+    :param index: The index of the tree.
+    :param kinds: The kinds of references to resolve.  Defaults to
+        `REFERENCE_KINDS`.
+    """
+    if kinds is None:
+        kinds = REFERENCE_KINDS
+    references = References(kinds)
+
+    sources: Dict[str, List[Any]] = {
+        "metric": index.metrics,
+        "ping": list(index.pings.values()),
+    }
+    for kind in kinds.values():
+        referrers = references.referrers[kind.name]
+        for obj in sources[kind.source]:
+            for name in kind.targets(obj):
+                referrers.setdefault(name, []).append(obj)
+
+        resolved = references.resolved[kind.name]
+        for name in referrers:
+            target = kind.lookup(index, name)
+            if target is not None:
+                resolved[name] = target
+
+    return references
+
+
+def get_references(objs: ObjectTree) -> References:
+    """
+    Get the references kept with the index of `objs` by
+    `translate.transform_metrics`, or resolve them again.
+    """
+    index = get_index(objs)
+    references: Any = getattr(index, "references", None)
+    if not isinstance(references, References):
+        references = resolve_references(index)
+        index.references = references
+    return references
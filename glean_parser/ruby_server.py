@@ -24,6 +24,7 @@ from pathlib import Path
 from typing import Any, Dict, List, Optional
 
 from . import __version__, metrics, util
+from .index import get_index
 
 SUPPORTED_METRIC_TYPES = ["string", "event"]
 
@@ -91,30 +92,28 @@ def output_ruby(
     # ping->list of metric categories->list of metrics
     # for easier processing in the template.
     ping_to_metrics: Dict[str, Dict[str, List[metrics.Metric]]] = defaultdict(dict)
-    for _category_key, category_val in objs.items():
-        for _metric_name, metric in category_val.items():
-            if isinstance(metric, metrics.Metric):
-                if metric.type not in SUPPORTED_METRIC_TYPES:
+    for metric in get_index(objs).metrics:
+        if metric.type not in SUPPORTED_METRIC_TYPES:
+            print(
+                "❌ Ignoring unsupported metric type: "
+                + f"{metric.type}:{metric.name}."
+                + " Reach out to Glean team to add support for this"
+                + " metric type."
+            )
+            continue
+        for ping in metric.send_in_pings:
+            if ping != "events":
+                (
                     print(
-                        "❌ Ignoring unsupported metric type: "
-                        + f"{metric.type}:{metric.name}."
-                        + " Reach out to Glean team to add support for this"
-                        + " metric type."
+                        "❌ Non-events ping reference found."
+                        + PING_METRIC_ERROR_MSG
+                        + f"Ignoring the {ping} ping type."
                     )
-                    continue
-                for ping in metric.send_in_pings:
-                    if ping != "events":
-                        (
-                            print(
-                                "❌ Non-events ping reference found."
-                                + PING_METRIC_ERROR_MSG
-                                + f"Ignoring the {ping} ping type."
-                            )
-                        )
-                        continue
-                    metrics_by_type = ping_to_metrics[ping]
-                    metrics_list = metrics_by_type.setdefault(metric.type, [])
-                    metrics_list.append(metric)
+                )
+                continue
+            metrics_by_type = ping_to_metrics[ping]
+            metrics_list = metrics_by_type.setdefault(metric.type, [])
+            metrics_list.append(metric)
     if "event" not in ping_to_metrics["events"]:
         print("❌ No event metrics found...at least one event metric is required")
         return
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Indexes for finding similar identifiers and ping names, used by the
+`NAME_TOO_SIMILAR`, `MISSPELLED_PING` and `UNKNOWN_PING_REFERENCED` lints,
+without comparing every name to all of the others.
+"""
+
+import functools
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Set, Tuple
+
+
+_SEPARATORS = re.compile(r"[._]")
+
+
+def _strip(identifier: str) -> str:
+    return _SEPARATORS.sub("", identifier)
+
+
+@functools.lru_cache(maxsize=None)
+def _segments(length: int, max_distance: int) -> List[Tuple[int, int]]:
+    """
+    The start and length of each of the `max_distance + 1` segments a string
+    of `length` characters is split into.
+    """
+    count = max_distance + 1
+    base, extra = divmod(length, count)
+    segments = []
+    start = 0
+    for i in range(count):
+        segment_length = base + (1 if i >= count - extra else 0)
+        segments.append((start, segment_length))
+        start += segment_length
+    return segments
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    The Levenshtein distance between `a` and `b`, or `max_distance + 1` if it
+    is greater than `max_distance`.
+    """
+    too_far = max_distance + 1
+    if abs(len(a) - len(b)) > max_distance:
+        return too_far
+
+    # Common prefixes and suffixes don't change the distance.
+    shortest = min(len(a), len(b))
+    prefix = 0
+    while prefix < shortest and a[prefix] == b[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < shortest - prefix and a[-1 - suffix] == b[-1 - suffix]:
+        suffix += 1
+    a = a[prefix : len(a) - suffix]
+    b = b[prefix : len(b) - suffix]
+    if not a or not b:
+        return min(len(a) + len(b), too_far)
+
+    # Only the cells within `max_distance` of the diagonal can be in range.
+    previous = [min(j, too_far) for j in range(len(b) + 1)]
+    for i, ca in enumerate(a, 1):
+        current = [too_far] * (len(b) + 1)
+        if i <= max_distance:
+            current[0] = i
+        best = current[0]
+        for j in range(max(1, i - max_distance), min(len(b), i + max_distance) + 1):
+            cost = previous[j - 1] + (ca != b[j - 1])
+            if previous[j] < cost:
+                cost = previous[j] + 1
+            if current[j - 1] < cost:
+                cost = current[j - 1] + 1
+            current[j] = cost
+            if cost < best:
+                best = cost
+        if best > max_distance:
+            return too_far
+        previous = current
+    return min(previous[-1], too_far)
+
+
+class SimilarityIndex:
+    """
+    An index of identifiers, which finds the ones similar to a given
+    identifier.  Ignoring `_` and `.`, two identifiers are similar if:
+
+    - they are the same, e.g. `a.credit_cards` and `a.creditcards`,
+    - they are at most `max_distance` insertions, deletions or substitutions
+      apart, e.g. `a.color` and `a.colour` with a `max_distance` of 1, or
+    - if `token_permutations` is set, they have the same words in a different
+      order, e.g. `a.tab_count` and `a.count_tab`.
+
+    Instead of comparing identifiers pairwise, each identifier is split into
+    `max_distance + 1` segments, and filed under each of them.  Each edit
+    changes at most one segment, so an identifier within `max_distance` edits
+    contains at least one of the segments unchanged, shifted by at most
+    `max_distance` characters.  Only the identifiers sharing such a segment,
+    or the same sorted words, are compared, so finding similar identifiers
+    takes about `max_distance ** 3` lookups rather than a comparison with
+    every identifier.
+    """
+
+    def __init__(self, max_distance: int = 0, token_permutations: bool = False):
+        if max_distance < 0:
+            raise ValueError("max_distance can't be negative")
+        self.max_distance = max_distance
+        self.token_permutations = token_permutations
+        # (identifier, stripped identifier, sorted words, value)
+        self._entries: List[Tuple[str, str, str, Any]] = []
+        self._buckets: Dict[str, List[int]] = {}
+
+    def _words(self, identifier: str) -> str:
+        if not self.token_permutations:
+            return ""
+        return " ".join(sorted(word for word in _SEPARATORS.split(identifier) if word))
+
+    def _index_keys(self, stripped: str, words: str) -> Iterator[str]:
+        length = len(stripped)
+        if length <= self.max_distance:
+            # Too short to be split, these are all compared.
+            yield f"short:{length}"
+        else:
+            for i, (start, segment_length) in enumerate(
+                _segments(length, self.max_distance)
+            ):
+                yield f"{length}:{i}:{stripped[start : start + segment_length]}"
+        if words:
+            yield f"words:{words}"
+
+    def _query_keys(self, stripped: str, words: str) -> Iterator[str]:
+        k = self.max_distance
+        query_length = len(stripped)
+        for length in range(max(0, query_length - k), query_length + k + 1):
+            if length <= k:
+                yield f"short:{length}"
+                continue
+            for i, (start, segment_length) in enumerate(_segments(length, k)):
+                first = max(0, start - k)
+                last = min(query_length - segment_length, start + k)
+                for position in range(first, last + 1):
+                    segment = stripped[position : position + segment_length]
+                    yield f"{length}:{i}:{segment}"
+        if words:
+            yield f"words:{words}"
+
+    def add(self, identifier: str, value: Any = None) -> None:
+        """
+        Add an identifier, with an optional value to return along with it.
+        """
+        stripped = _strip(identifier)
+        words = self._words(identifier)
+        position = len(self._entries)
+        self._entries.append((identifier, stripped, words, value))
+        for key in self._index_keys(stripped, words):
+            self._buckets.setdefault(key, []).append(position)
+
+    def find(self, identifier: str) -> List[Tuple[str, Any]]:
+        """
+        The identifiers in the index that are similar to `identifier`, and
+        their values, in the order they were added.
+        """
+        stripped = _strip(identifier)
+        words = self._words(identifier)
+        candidates: Set[int] = set()
+        for key in self._query_keys(stripped, words):
+            candidates.update(self._buckets.get(key, ()))
+
+        # Sharing a segment doesn't mean being within `max_distance` edits.
+        return [
+            (other, value)
+            for other, other_stripped, other_words, value in (
+                self._entries[position] for position in sorted(candidates)
+            )
+            if stripped == other_stripped
+            or (words and words == other_words)
+            or (
+                self.max_distance > 0
+                and edit_distance(stripped, other_stripped, self.max_distance)
+                <= self.max_distance
+            )
+        ]
+
+
+class PingNameIndex:
+    """
+    An index of ping names, for looking up referenced ping names exactly or
+    finding the ones they may be a misspelling of.
+
+    Names are bucketed by length, so only the names whose length is within
+    `max_distance` of a looked up name are compared with it.  Unlike
+    `SimilarityIndex`, punctuation counts as any other character, since ping
+    names such as `deletion-request` use it.
+    """
+
+    def __init__(self, names: Iterable[str]):
+        self._names: Dict[str, int] = {}
+        self._by_length: Dict[int, List[str]] = {}
+        for name in names:
+            if name not in self._names:
+                self._names[name] = len(self._names)
+                self._by_length.setdefault(len(name), []).append(name)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._names
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._names)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def similar(self, name: str, max_distance: int = 1) -> List[str]:
+        """
+        The names other than `name` within `max_distance` insertions, deletions
+        or substitutions of `name`, in the order they were given.
+        """
+        found = [
+            other
+            for length in range(len(name) - max_distance, len(name) + max_distance + 1)
+            for other in self._by_length.get(length, ())
+            if other != name
+            and edit_distance(name, other, max_distance) <= max_distance
+        ]
+        found.sort(key=self._names.__getitem__)
+        return found
@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Compiled registry snapshots.
+
+A snapshot holds the object tree of a set of metrics.yaml, pings.yaml and
+tags.yaml files, after parsing, validating and preprocessing them, so that
+several commands can run on the same inputs without parsing them each time.
+The objects keep their `defined_in` source file and line.
+
+Snapshots are created with `glean_parser compile`, and are recognized by
+their `.glean` suffix wherever the input files are accepted.  They are only
+meant to be used by the version of glean_parser that created them.
+
+The file format is an 8-byte magic number, the length of a JSON header as a
+4-byte big-endian integer, the JSON header itself, and the zlib-compressed
+pickled object tree.
+"""
+
+import functools
+import io
+import json
+import os
+from pathlib import Path
+import pickle
+import struct
+import sys
+import tempfile
+from typing import Any, Dict, FrozenSet, Generator, Iterable, List, Optional, Tuple
+import zlib
+
+
+from . import util
+from .cache import file_digest
+from .diagnostics import Diagnostic
+from .metrics import ObjectTree
+
+
+SNAPSHOT_SUFFIX = ".glean"
+
+
+# Bump this whenever the layout of snapshot files changes.
+SNAPSHOT_FORMAT_VERSION = 1
+
+
+_MAGIC = b"GLEANSNP"
+_HEADER_LENGTH = struct.Struct(">I")
+
+
+# The parser config entries that are recorded in the header.  They change
+# which objects are valid or disabled, so a snapshot is only used as it is with
+# the same config.
+_RECORDED_CONFIG = (
+    "allow_reserved",
+    "require_tags",
+    "expire_by_version",
+    "do_not_disable_expired",
+)
+
+
+def _recorded_config(config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The entries of `config` recorded in the header of a snapshot, in a form
+    that can be compared between the config a snapshot was compiled with and
+    the config it is loaded with.
+    """
+    recorded = {key: config.get(key) or None for key in _RECORDED_CONFIG}
+    # Which metrics are interesting depends on the contents of these files.
+    recorded["interesting"] = [
+        {"path": str(path), "sha256": file_digest(path) if path.exists() else None}
+        for path in util.ensure_list(config.get("interesting"))
+        if isinstance(path, Path)
+    ] or None
+    return recorded
+
+
+def _sources_unchanged(sources: List[Dict[str, str]]) -> bool:
+    """
+    Whether the source files recorded in a snapshot header still exist with
+    the same contents.
+    """
+    try:
+        return all(
+            file_digest(Path(source["path"])) == source["sha256"] for source in sources
+        )
+    except OSError:
+        return False
+
+
+def _parser_version() -> Optional[str]:
+    import glean_parser
+
+    return getattr(glean_parser, "__version__", None)
+
+
+# The classes from outside of glean_parser an object tree may contain.
+_ALLOWED_CLASSES = {
+    ("datetime", "date"),
+    ("datetime", "datetime"),
+    ("datetime", "timedelta"),
+    ("datetime", "timezone"),
+    # The parser config kept on the objects can contain paths.
+    ("pathlib", "Path"),
+    ("pathlib", "PosixPath"),
+    ("pathlib", "WindowsPath"),
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _allowed_classes() -> FrozenSet[Tuple[str, str]]:
+    """
+    The `(module, name)` of every class and function an object tree may be
+    made of.
+    """
+    # Avoid cyclical import
+    from . import compact, expiry, metrics, pings, tags
+
+    allowed = set(_ALLOWED_CLASSES)
+    # The metric classes, and the enums and strings of their attributes.
+    for name, value in vars(metrics).items():
+        if isinstance(value, type) and value.__module__ == metrics.__name__:
+            allowed.add((metrics.__name__, name))
+    for obj in (
+        pings.Ping,
+        tags.Tag,
+        util.DictWrapper,
+        expiry.ExpiryEvaluator,
+        compact.FrozenList,
+        compact.FrozenDict,
+        compact._restore,
+    ):
+        allowed.add((obj.__module__, obj.__qualname__))
+    return frozenset(allowed)
+
+
+class _Unpickler(pickle.Unpickler):
+    """
+    Only allows loading the classes the object tree is made of.
+    """
+
+    def find_class(self, module: str, name: str) -> Any:
+        # Dotted names would look up attributes of the allowed classes.
+        if "." in name or (module, name) not in _allowed_classes():
+            raise pickle.UnpicklingError(f"Unexpected class {module}.{name}")
+        return super().find_class(module, name)
+
+
+def is_snapshot(filepath: Any) -> bool:
+    """
+    Whether the given input file is a snapshot.
+    """
+    return isinstance(filepath, Path) and filepath.suffix == SNAPSHOT_SUFFIX
+
+
+def write_snapshot(
+    objs: ObjectTree,
+    filepath: Path,
+    sources: Iterable[Path],
+    config: Optional[Dict[str, Any]] = None,
+) -> None:
+    """
+    Write the object tree `objs` to a snapshot file.
+
+    :param objs: The object tree, as returned by `parser.parse_objects`.
+    :param filepath: The path of the snapshot file to write.
+    :param sources: The input files `objs` was parsed from.
+    :param config: The parser config `objs` was parsed with.
+    """
+    if config is None:
+        config = {}
+
+    header = {
+        "format": SNAPSHOT_FORMAT_VERSION,
+        "glean_parser": _parser_version(),
+        "sources": [
+            {"path": str(source), "sha256": file_digest(source)}
+            for source in sources
+            if source.exists()
+        ],
+        "config": _recorded_config(config),
+    }
+    header_bytes = json.dumps(header, sort_keys=True).encode("utf-8")
+    tree_bytes = zlib.compress(pickle.dumps(objs, protocol=pickle.HIGHEST_PROTOCOL))
+
+    # Write to a temporary file first, so that an interrupted compilation
+    # doesn't leave a truncated snapshot behind.
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmpname = tempfile.mkstemp(dir=filepath.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(_MAGIC)
+            tmp.write(_HEADER_LENGTH.pack(len(header_bytes)))
+            tmp.write(header_bytes)
+            tmp.write(tree_bytes)
+        os.replace(tmpname, filepath)
+    except BaseException:
+        os.unlink(tmpname)
+        raise
+
+
+def read_snapshot(filepath: Path) -> Tuple[Dict[str, Any], ObjectTree]:
+    """
+    Read a snapshot file.
+
+    Raises a ValueError if the file is not a snapshot, or if it was written by
+    a different version of glean_parser.
+
+    :return: The header of the snapshot, and the object tree.
+    """
+    with filepath.open("rb") as fd:
+        data = fd.read()
+
+    start = len(_MAGIC) + _HEADER_LENGTH.size
+    if not data.startswith(_MAGIC) or len(data) < start:
+        raise ValueError(f"'{filepath}' is not a glean_parser snapshot.")
+    (header_length,) = _HEADER_LENGTH.unpack_from(data, len(_MAGIC))
+    header = json.loads(data[start : start + header_length])
+
+    version = header.get("glean_parser")
+    if header.get("format") != SNAPSHOT_FORMAT_VERSION or version != _parser_version():
+        raise ValueError(
+            f"'{filepath}' was compiled by glean_parser {version}. "
+            "Compile it again with this version."
+        )
+
+    tree = zlib.decompress(data[start + header_length :])
+    return header, _Unpickler(io.BytesIO(tree)).load()
+
+
+@util.keep_value
+def load_objects(
+    filepaths: Iterable[Path], config: Dict[str, Any]
+) -> Generator[Diagnostic, None, ObjectTree]:
+    """
+    Load the object tree of a snapshot given as the input files of
+    `parser.parse_objects`, which can only contain that snapshot.
+
+    The objects are set up to use `config`, as if they had been parsed with
+    it.  If the snapshot was compiled with a different config, its source
+    files are parsed again with `config` instead, provided that they haven't
+    changed since.
+    """
+    # Avoid cyclical import
+    from . import parser
+
+    filepaths = util.ensure_list(filepaths)
+    if len(filepaths) != 1:
+        yield Diagnostic(
+            "",
+            "",
+            "A snapshot can't be combined with other input files. "
+            "Compile all of the input files into a single snapshot instead.",
+            code="INVALID_SNAPSHOT",
+        )
+        return util.DictWrapper()
+
+    filepath = filepaths[0]
+    try:
+        header, objs = read_snapshot(filepath)
+    except (OSError, ValueError, pickle.UnpicklingError, zlib.error) as e:
+        yield Diagnostic(filepath, "", str(e), code="INVALID_SNAPSHOT")
+        return util.DictWrapper()
+
+    recorded = header.get("config", {})
+    expected = _recorded_config(config)
+    if recorded != expected:
+        sources = header.get("sources", [])
+        if sources and _sources_unchanged(sources):
+            reparsed = parser.parse_objects(
+                [Path(source["path"]) for source in sources], config
+            )
+            yield from reparsed
+            return reparsed.value
+        different = sorted(
+            key for key in expected if recorded.get(key) != expected[key]
+        )
+        yield Diagnostic(
+            filepath,
+            "",
+            f"'{filepath}' was compiled with different {', '.join(different)} "
+            "options and its input files have changed since. "
+            "Compile it again with the same options.",
+            code="INVALID_SNAPSHOT",
+        )
+        return util.DictWrapper()
+
+    for category in objs.values():
+        for obj in category.values():
+            if hasattr(obj, "_config"):
+                setattr(obj, "_config", config)
+    return objs
+
+
+def compile_snapshot(
+    input_filepaths: Iterable[Path],
+    output: Path,
+    parser_config: Optional[Dict[str, Any]] = None,
+    file=sys.stderr,
+) -> int:
+    """
+    Commandline helper for compiling input files into a snapshot.
+
+    :param input_filepaths: List of Path objects to load metrics from.
+    :param output: The path of the snapshot file to write.
+    :param parser_config: Parser configuration object, passed to
+      `parser.parse_objects`.
+    :param file: The stream to write the errors to.
+    :return: Non-zero if there were any errors.
+    """
+    # Avoid cyclical import
+    from . import parser
+
+    if parser_config is None:
+        parser_config = {}
+
+    input_filepaths = util.ensure_list(input_filepaths)
+    if any(is_snapshot(filepath) for filepath in input_filepaths):
+        print("❌ Snapshots can't be compiled again.", file=file)
+        return 1
+
+    objs = parser.parse_objects(input_filepaths, parser_config)
+    if util.report_validation_errors(objs):
+        return 1
+
+    write_snapshot(objs.value, output, input_filepaths, parser_config)
+    print(f"✨ Compiled {len(input_filepaths)} files to '{output}'. ✨", file=file)
+    return 0
@@ -1,4 +1,4 @@
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 from . import util
 
 
@@ -40,10 +40,16 @@ class Tag:
         modified_dict = util.remove_output_params(d, "defined_in")
         return modified_dict
 
+    def _attributes(self) -> Dict[str, Any]:
+        """
+        The instance attributes, in the order they were set.
+        """
+        return self.__dict__.copy()
+
     def serialize(self) -> Dict[str, util.JSONType]:
         """
         Serialize the tag back to JSON object model.
         """
-        d = self.__dict__.copy()
+        d = self._attributes()
         del d["name"]
         return d
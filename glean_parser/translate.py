@@ -8,26 +8,19 @@
 High-level interface for translating `metrics.yaml` into other formats.
 """
 
+import importlib
 from pathlib import Path
 import os
 import shutil
 import tempfile
-from typing import Any, Callable, Dict, Iterable, List, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
 
+from . import compact
+from .index import ObjectTreeIndex, set_index
 from . import lint
 from . import parser
-from . import go_server
-from . import javascript
-from . import javascript_server
-from . import python_server
-from . import kotlin
-from . import markdown
+from .references import resolve_references
 from . import metrics
-from . import ruby_server
-from . import rust
-from . import rust_server
-from . import rust_sym
-from . import swift
 from . import util
 
 
@@ -38,7 +31,9 @@ class Outputter:
     Each outputter in the table has the following member values:
 
     - output_func: the main function of the outputter, the one which
-      does the actual translation.
+      does the actual translation.  It may be given as the dotted name of a
+      function in a glean_parser module, in which case that module is only
+      imported the first time the outputter is used.
 
     - clear_patterns: A list of glob patterns to clear in the directory before
       writing new results to it.
@@ -46,30 +41,41 @@ class Outputter:
 
     def __init__(
         self,
-        output_func: Callable[[metrics.ObjectTree, Path, Dict[str, Any]], None],
+        output_func: Union[
+            Callable[[metrics.ObjectTree, Path, Dict[str, Any]], None], str
+        ],
         clear_patterns: Optional[List[str]] = None,
     ):
         if clear_patterns is None:
             clear_patterns = []
 
-        self.output_func = output_func
+        self._output_func = output_func
         self.clear_patterns = clear_patterns
 
+    @property
+    def output_func(self) -> Callable[[metrics.ObjectTree, Path, Dict[str, Any]], None]:
+        output_func = self._output_func
+        if isinstance(output_func, str):
+            module_name, func_name = output_func.rsplit(".", 1)
+            module = importlib.import_module(f".{module_name}", __package__)
+            output_func = self._output_func = getattr(module, func_name)
+        return output_func
+
 
 OUTPUTTERS = {
-    "go_server": Outputter(go_server.output_go_logger, []),
-    "javascript": Outputter(javascript.output_javascript, []),
-    "typescript": Outputter(javascript.output_typescript, []),
-    "javascript_server": Outputter(javascript_server.output_javascript, []),
-    "typescript_server": Outputter(javascript_server.output_typescript, []),
-    "python_server": Outputter(python_server.output_python, []),
-    "ruby_server": Outputter(ruby_server.output_ruby, []),
-    "kotlin": Outputter(kotlin.output_kotlin, ["*.kt"]),
-    "markdown": Outputter(markdown.output_markdown, []),
-    "swift": Outputter(swift.output_swift, ["*.swift"]),
-    "rust": Outputter(rust.output_rust, []),
-    "rust_server": Outputter(rust_server.output_rust, []),
-    "rust_sym": Outputter(rust_sym.output_rust, []),
+    "go_server": Outputter("go_server.output_go_logger", []),
+    "javascript": Outputter("javascript.output_javascript", []),
+    "typescript": Outputter("javascript.output_typescript", []),
+    "javascript_server": Outputter("javascript_server.output_javascript", []),
+    "typescript_server": Outputter("javascript_server.output_typescript", []),
+    "python_server": Outputter("python_server.output_python", []),
+    "ruby_server": Outputter("ruby_server.output_ruby", []),
+    "kotlin": Outputter("kotlin.output_kotlin", ["*.kt"]),
+    "markdown": Outputter("markdown.output_markdown", []),
+    "swift": Outputter("swift.output_swift", ["*.swift"]),
+    "rust": Outputter("rust.output_rust", []),
+    "rust_server": Outputter("rust_server.output_rust", []),
+    "rust_sym": Outputter("rust_sym.output_rust", []),
 }
 
 
@@ -80,31 +86,46 @@ def transform_metrics(objects):
 
     e.g. This will transform a `rate` to be a `numerator` if its denominator is
     external.
+
+    This can be run more than once on the same metrics, e.g. when they are
+    kept in a `parser.ParseSession`.
+
+    The index of the transformed tree is kept on it for the outputters, see
+    `index.get_index`, along with the resolved references between its
+    objects, see `references.get_references`.
+
+    Raises a `ValueError` listing all of the `denominator_metric` references
+    that don't refer to a `counter`.
     """
-    counters = {}
-    numerators_by_denominator: Dict[str, Any] = {}
-    for category_name, category_val in objects.items():
-        if category_name == "tags":
-            continue
-        for metric in category_val.values():
-            fqmn = metric.identifier()
-            if getattr(metric, "type", None) == "counter":
-                counters[fqmn] = metric
-            denominator_name = getattr(metric, "denominator_metric", None)
-            if denominator_name:
-                metric.type = "numerator"
-                numerators_by_denominator.setdefault(denominator_name, [])
-                numerators_by_denominator[denominator_name].append(metric)
-
-    for denominator_name, numerators in numerators_by_denominator.items():
-        if denominator_name not in counters:
-            raise ValueError(
-                f"No `counter` named {denominator_name} found to be used as"
-                "denominator for {numerators}",
-            )
-        counters[denominator_name].__class__ = metrics.Denominator
-        counters[denominator_name].type = "denominator"
-        counters[denominator_name].numerators = numerators
+    index = ObjectTreeIndex(objects)
+
+    # Turn denominators from a previous run back into counters, in case they
+    # lost their numerators since.
+    for metric in index.by_type.get("denominator", []):
+        metric.__class__ = compact.class_for(metric, metrics.Counter)
+        metric.type = "counter"
+        vars(metric).pop("numerators", None)
+
+    # All of the dangling references are reported at once.
+    references = resolve_references(index)
+    errors = references.errors()
+    if errors:
+        raise ValueError("\n".join(errors))
+
+    denominators = references.resolved["denominator_metric"]
+    for denominator_name, numerators in references.referrers[
+        "denominator_metric"
+    ].items():
+        for metric in numerators:
+            metric.type = "numerator"
+        denominator = denominators[denominator_name]
+        denominator.__class__ = compact.class_for(denominator, metrics.Denominator)
+        denominator.type = "denominator"
+        denominator.numerators = numerators  # type: ignore[attr-defined]
+
+    index.update_types()
+    index.references = references
+    set_index(objects, index)
 
 
 def translate_metrics(
@@ -114,6 +135,7 @@ def translate_metrics(
     clear_patterns: Optional[List[str]] = None,
     options: Optional[Dict[str, Any]] = None,
     parser_config: Optional[Dict[str, Any]] = None,
+    session: Optional[parser.ParseSession] = None,
 ):
     """
     Translate the files in `input_filepaths` by running the metrics through a
@@ -137,6 +159,8 @@ def translate_metrics(
         format specific. These are passed unchanged to `translation_func`.
     :param parser_config: A dictionary of options that change parsing behavior.
         See `parser.parse_metrics` for more info.
+    :param session: An optional `parser.ParseSession` for `input_filepaths`.
+        If given, it is refreshed instead of parsing all of the files again.
     """
     if clear_patterns is None:
         clear_patterns = []
@@ -155,10 +179,14 @@ def translate_metrics(
         print("Use `--allow-missing-files` to not treat this as an error.")
         return 1
 
-    if lint.glinter(input_filepaths, parser_config):
+    if lint.glinter(input_filepaths, parser_config, session=session):
         return 1
 
-    all_objects = parser.parse_objects(input_filepaths, parser_config)
+    if session is not None:
+        # This is cheap, since the session was just refreshed by the linter.
+        all_objects = session.refresh()
+    else:
+        all_objects = parser.parse_objects(input_filepaths, parser_config)
 
     if util.report_validation_errors(all_objects):
         return 1
@@ -204,6 +232,7 @@ def translate(
     output_dir: Path,
     options: Optional[Dict[str, Any]] = None,
     parser_config: Optional[Dict[str, Any]] = None,
+    session: Optional[parser.ParseSession] = None,
 ):
     """
     Translate the files in `input_filepaths` to the given `output_format` and
@@ -216,6 +245,7 @@ def translate(
         format specific.
     :param parser_config: A dictionary of options that change parsing behavior.
         See `parser.parse_metrics` for more info.
+    :param session: An optional `parser.ParseSession` for `input_filepaths`.
     """
     if options is None:
         options = {}
@@ -235,4 +265,5 @@ def translate(
         format_desc.clear_patterns,
         options,
         parser_config,
+        session,
     )
@@ -13,14 +13,17 @@ from pathlib import Path
 import sys
 import re
 import textwrap
-from typing import Any, Callable, Iterable, Sequence, Tuple, Union, Optional
-import urllib.request
-
-import diskcache  # type: ignore
-import jinja2
-import jsonschema  # type: ignore
-from jsonschema import _utils  # type: ignore
-import platformdirs  # type: ignore
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    List,
+    Sequence,
+    Tuple,
+    Union,
+    Optional,
+)
+
 import yaml
 
 try:
@@ -79,33 +82,176 @@ class _NoDatesSafeLoader(SafeLoader):
 _NoDatesSafeLoader.remove_implicit_resolver("tag:yaml.org,2002:timestamp")
 
 
+# The depth of the mappings that get a `DictWrapper`, with their line and
+# any duplicate key: the root of a file (0), categories, pings and tags (1),
+# and metrics (2).  The parser doesn't report on anything deeper than that.
+_LINE_TRACKING_DEPTH = 2
+
+
+_STR_TAG = "tag:yaml.org,2002:str"
+_SEQ_TAG = "tag:yaml.org,2002:seq"
+_MAP_TAG = "tag:yaml.org,2002:map"
+
+
+class _LineLoader(_NoDatesSafeLoader):
+    """
+    Loads mappings into `DictWrapper`s that know the line they start on and
+    the last duplicate key in them, preserving the order of metrics as they
+    appear in the metrics.yaml file.
+
+    PyYAML's constructors handle any node the way the safe loader does, but
+    they are slow, so strings, sequences and mappings are constructed
+    directly instead.  Mappings deeper than `_LINE_TRACKING_DEPTH` are plain
+    dictionaries.
+    """
+
+    def construct_document(self, node):
+        self._in_progress = set()
+        data = self._construct_node(node, 0)
+        self.constructed_objects = {}
+        self._in_progress = set()
+        return data
+
+    def _construct_node(self, node, depth):
+        tag = node.tag
+        if tag == _STR_TAG and isinstance(node, yaml.ScalarNode):
+            return node.value
+
+        if node in self.constructed_objects:
+            return self.constructed_objects[node]
+        if tag == _SEQ_TAG:
+            data = self._construct_sequence(node, depth)
+        elif tag == _MAP_TAG:
+            data = self._construct_mapping(node, depth)
+        else:
+            # Numbers, booleans, null and any explicitly tagged value.
+            return self.construct_object(node, deep=True)
+        self.constructed_objects[node] = data
+        return data
+
+    def _enter(self, node):
+        # Anchors make it possible for a node to contain itself.
+        if node in self._in_progress:
+            raise yaml.constructor.ConstructorError(
+                None, None, "found unconstructable recursive node", node.start_mark
+            )
+        self._in_progress.add(node)
+
+    def _construct_sequence(self, node, depth):
+        self._enter(node)
+        data = [self._construct_node(child, depth + 1) for child in node.value]
+        self._in_progress.discard(node)
+        return data
+
+    def _construct_mapping(self, node, depth):
+        self._enter(node)
+        self.flatten_mapping(node)
+        if depth > _LINE_TRACKING_DEPTH:
+            data = {
+                self._construct_node(key_node, depth + 1): self._construct_node(
+                    value_node, depth + 1
+                )
+                for key_node, value_node in node.value
+            }
+        else:
+            # Redefinition of a key might be a mistake if that key is a metric
+            # name.
+            data = DictWrapper()
+            for key_node, value_node in node.value:
+                key = self._construct_node(key_node, depth + 1)
+                if key in data:
+                    data.duplicate = key
+                data[key] = self._construct_node(value_node, depth + 1)
+            data.defined_in = {"line": node.start_mark.line}
+        self._in_progress.discard(node)
+        return data
+
+
 def yaml_load(stream):
     """
     Map line number to yaml nodes, and preserve the order
     of metrics as they appear in the metrics.yaml file.
+
+    Only the mappings at the depths the parser reports errors on are
+    `DictWrapper` instances with a `defined_in` line number.  See
+    `_LINE_TRACKING_DEPTH`.
     """
+    # The garbage collector is deliberately left alone, even though creating
+    # this many objects triggers many full collections: disabling, freezing or
+    # tuning it is process-wide, and other threads may be allocating at the
+    # same time.  The command line raises its thresholds instead, see
+    # `__main__.GC_THRESHOLDS`.
+    return yaml.load(stream, _LineLoader)
 
-    class SafeLineLoader(_NoDatesSafeLoader):
-        pass
 
-    def _construct_mapping_adding_line(loader, node):
-        loader.flatten_mapping(node)
-        pairs = loader.construct_pairs(node)
+# Every byte but the ones `_json_object_lines` looks at.
+_JSON_NON_STRUCTURAL = bytes(range(256)).translate(None, b"{}\n")
+
 
-        # Redefinition of a key might be a mistake if that key is a metric name.
-        mapping = DictWrapper()
-        for pair in pairs:
-            if pair[0] in mapping:
-                mapping.duplicate = pair[0]
-            mapping[pair[0]] = pair[1]
+_JSON_STRING = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"')
 
-        mapping.defined_in = {"line": node.start_mark.line}
+
+def _json_object_lines(data: bytes) -> Optional[List[int]]:
+    """
+    The (1-based) line of the opening brace of each object in a JSON
+    document, in the order the objects end.
+
+    Returns None if the braces don't match up, which happens when some of them
+    are in strings.
+    """
+    lines = []
+    stack = []
+    braces = data.translate(None, _JSON_NON_STRUCTURAL)
+    try:
+        for lineno, chunk in enumerate(braces.split(b"\n"), 1):
+            for brace in chunk:
+                if brace == ord("{"):
+                    stack.append(lineno)
+                else:
+                    lines.append(stack.pop())
+    except IndexError:
+        return None
+    if stack:
+        return None
+    return lines
+
+
+def json_load(data: Union[str, bytes]):
+    """
+    Load JSON content into the same kind of tree as `yaml_load`: objects are
+    `DictWrapper`s, with the line of their opening brace in `defined_in` and
+    a key that appears more than once in `duplicate`.
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+
+    mappings = []
+
+    def _mapping(pairs):
+        mapping = DictWrapper(pairs)
+        if len(mapping) != len(pairs):
+            # Redefinition of a key might be a mistake if that key is a metric
+            # name.
+            seen = set()
+            for key, _ in pairs:
+                if key in seen:
+                    mapping.duplicate = key
+                seen.add(key)
+        mappings.append(mapping)
         return mapping
 
-    SafeLineLoader.add_constructor(
-        yaml.resolver.BaseResolver.DEFAULT_MAPPING_TAG, _construct_mapping_adding_line
-    )
-    return yaml.load(stream, SafeLineLoader)
+    content = json.loads(data, object_pairs_hook=_mapping)
+
+    # The line numbers are found separately, as the json module doesn't
+    # report positions.  Looking at the braces alone is enough unless some
+    # strings contain braces, so the strings are only skipped when needed.
+    lines = _json_object_lines(data)
+    if lines is None or len(lines) != len(mappings):
+        lines = _json_object_lines(_JSON_STRING.sub(b'""', data))
+    assert lines is not None and len(lines) == len(mappings)
+    for mapping, line in zip(mappings, lines):
+        mapping.defined_in = {"line": line}
+    return content
 
 
 def ordered_yaml_dump(data, **kwargs):
@@ -118,6 +264,8 @@ def ordered_yaml_dump(data, **kwargs):
         )
 
     OrderedDumper.add_representer(DictWrapper, _dict_representer)
+    # Only the outer mappings of loaded content are `DictWrapper`s.
+    OrderedDumper.add_representer(dict, _dict_representer)
     return yaml.dump(data, Dumper=OrderedDumper, **kwargs)
 
 
@@ -136,8 +284,7 @@ def load_yaml_or_json(path: Path):
         return yaml_load(yaml.dump(path))
 
     if path.suffix == ".json":
-        with path.open("r", encoding="utf-8") as fd:
-            return json.load(fd)
+        return json_load(path.read_bytes())
     elif path.suffix in (".yml", ".yaml", ".yamlx"):
         with path.open("r", encoding="utf-8") as fd:
             return yaml_load(fd)
@@ -230,6 +377,8 @@ def get_jinja2_template(
     :param filters: tuple of 2-tuple. A tuple of (name, func) pairs defining
         additional filters.
     """
+    import jinja2
+
     env = jinja2.Environment(
         loader=jinja2.PackageLoader("glean_parser", "templates"),
         trim_blocks=True,
@@ -272,6 +421,7 @@ def get_null_resolver(schema):
 
     This lets us handle the moz: URLs in our schemas.
     """
+    import jsonschema  # type: ignore
 
     class NullResolver(jsonschema.RefResolver):
         def resolve_remote(self, uri):
@@ -298,6 +448,11 @@ def fetch_remote_url(url: str, cache: bool = True):
         with open(url, "r", encoding="utf-8") as fd:
             return fd.read()
 
+    import urllib.request
+
+    import diskcache  # type: ignore
+    import platformdirs  # type: ignore
+
     if cache:
         cache_dir = platformdirs.user_cache_dir("glean_parser", "mozilla")
         with diskcache.Cache(cache_dir, disk=diskcache.JSONDisk) as dc:
@@ -313,9 +468,6 @@ def fetch_remote_url(url: str, cache: bool = True):
     return contents
 
 
-_unset = _utils.Unset()
-
-
 def pprint_validation_error(error) -> str:
     """
     A version of jsonschema's ValidationError __str__ method that doesn't
@@ -325,13 +477,15 @@ def pprint_validation_error(error) -> str:
     It also shows any subschemas of anyOf/allOf that failed, if any (what
     jsonschema calls "context").
     """
+    from jsonschema import _utils  # type: ignore
+
     essential_for_verbose = (
         error.validator,
         error.validator_value,
         error.instance,
         error.schema,
     )
-    if any(m is _unset for m in essential_for_verbose):
+    if any(isinstance(m, _utils.Unset) for m in essential_for_verbose):
         return textwrap.fill(error.message)
 
     instance = error.instance
@@ -427,16 +581,12 @@ def is_expired(expires: str, major_version: Optional[int] = None) -> bool:
     """
     Parses the `expires` field in a metric or ping and returns whether
     the object should be considered expired.
+
+    To evaluate many objects at once, use an `expiry.ExpiryEvaluator`.
     """
-    if expires == "never":
-        return False
-    elif expires == "expired":
-        return True
-    elif major_version is not None:
-        return parse_expiration_version(expires) <= major_version
-    else:
-        date = parse_expiration_date(expires)
-        return date <= now_epoch().date()
+    from .expiry import ExpiryEvaluator
+
+    return ExpiryEvaluator(major_version).is_expired(expires)
 
 
 def validate_expires(expires: str, major_version: Optional[int] = None) -> None:
@@ -446,26 +596,12 @@ def validate_expires(expires: str, major_version: Optional[int] = None) -> None:
     Otherwise raises a ValueError in case the `expires` is not ISO8601
     parseable, or in case the date is more than 730 days (~2 years) in
     the future.
-    """
-    if expires in ("never", "expired"):
-        return
 
-    if major_version is not None:
-        parse_expiration_version(expires)
-        # Don't need to keep parsing dates if expiration by version
-        # is enabled. We don't allow mixing dates and versions for a
-        # single product.
-        return
+    To validate many objects at once, use an `expiry.ExpiryEvaluator`.
+    """
+    from .expiry import ExpiryEvaluator
 
-    date = parse_expiration_date(expires)
-    max_date = datetime.datetime.now() + datetime.timedelta(days=730)
-    if date > max_date.date():
-        raise ValueError(
-            f"'{expires}' is more than 730 days (~2 years) in the future.",
-            "Please make sure this is intentional.",
-            "You can supress this warning by adding EXPIRATION_DATE_TOO_FAR to no_lint",
-            "See: https://mozilla.github.io/glean_parser/metrics-yaml.html#no_lint",
-        )
+    ExpiryEvaluator(major_version).validate_expires(expires)
 
 
 def build_date(date: Optional[str]) -> datetime.datetime:
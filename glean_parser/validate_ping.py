@@ -14,8 +14,6 @@ import json
 from pathlib import Path
 import sys
 
-import jsonschema  # type: ignore
-
 from . import util
 
 
@@ -30,6 +28,8 @@ def _get_ping_schema(schema_url):
 
 
 def _validate_ping(ins, outs, schema_url):
+    import jsonschema  # type: ignore
+
     schema = _get_ping_schema(schema_url)
 
     resolver = util.get_null_resolver(schema)
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Support for watching input files and re-running a command when they change.
+"""
+
+import ctypes
+import ctypes.util
+import os
+from pathlib import Path
+import select
+import struct
+import sys
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+
+from . import parser
+from .cache import file_stamp
+
+
+# From <sys/inotify.h>
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_CLOEXEC = 0o2000000
+_IN_NONBLOCK = 0o4000
+
+_INOTIFY_MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+
+# How long to wait for more changes after the first one, so that a single save
+# from an editor (which may write, rename and touch a file) triggers only one
+# re-run.
+SETTLE_TIME = 0.1
+
+
+class FileWatcher:
+    """
+    Waits for changes to a set of files.
+
+    On Linux this uses inotify on the directories containing the files, so
+    that files replaced by editors through a rename are still noticed.
+    Everywhere else, or if inotify is not available, the files are polled.
+    """
+
+    def __init__(
+        self,
+        filepaths: Iterable[Path],
+        poll_interval: float = 0.5,
+        use_inotify: bool = True,
+    ):
+        self.filepaths = [Path(x).absolute() for x in filepaths]
+        self.poll_interval = poll_interval
+        self._inotify_fd: Optional[int] = None
+        self._watches: Dict[int, Path] = {}
+
+        if use_inotify and sys.platform.startswith("linux"):
+            self._init_inotify()
+
+        self._stamps = {x: file_stamp(x) for x in self.filepaths}
+
+    def _init_inotify(self) -> None:
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            fd = libc.inotify_init1(_IN_CLOEXEC | _IN_NONBLOCK)
+        except (OSError, AttributeError):
+            return
+        if fd < 0:
+            return
+
+        for directory in sorted(set(x.parent for x in self.filepaths)):
+            wd = libc.inotify_add_watch(fd, os.fsencode(directory), _INOTIFY_MASK)
+            if wd < 0:
+                # Fall back to polling if any of the directories can't be
+                # watched, e.g. because it doesn't exist (yet).
+                os.close(fd)
+                self._watches = {}
+                return
+            self._watches[wd] = directory
+
+        self._inotify_fd = fd
+
+    @property
+    def uses_inotify(self) -> bool:
+        return self._inotify_fd is not None
+
+    def close(self) -> None:
+        if self._inotify_fd is not None:
+            os.close(self._inotify_fd)
+            self._inotify_fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _read_inotify_events(self, timeout: Optional[float]) -> Set[Path]:
+        assert self._inotify_fd is not None
+
+        changed: Set[Path] = set()
+        readable, _, _ = select.select([self._inotify_fd], [], [], timeout)
+        if not readable:
+            return changed
+
+        try:
+            buf = os.read(self._inotify_fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+
+        offset = 0
+        while offset < len(buf):
+            wd, _mask, _cookie, length = _INOTIFY_EVENT.unpack_from(buf, offset)
+            offset += _INOTIFY_EVENT.size
+            name = buf[offset : offset + length].rstrip(b"\0")
+            offset += length
+            directory = self._watches.get(wd)
+            if directory is not None and name:
+                changed.add(directory / os.fsdecode(name))
+
+        return changed & set(self.filepaths)
+
+    def _poll(self) -> Set[Path]:
+        changed = set()
+        for filepath in self.filepaths:
+            stamp = file_stamp(filepath)
+            if stamp != self._stamps[filepath]:
+                changed.add(filepath)
+                self._stamps[filepath] = stamp
+        return changed
+
+    def wait(self, timeout: Optional[float] = None) -> List[Path]:
+        """
+        Block until at least one of the files changed, or until `timeout`
+        seconds have passed.
+
+        :return: The sorted list of files that changed.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        changed: Set[Path] = set()
+        while not changed:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                break
+
+            if self._inotify_fd is not None:
+                changed = self._read_inotify_events(remaining)
+            else:
+                time.sleep(
+                    self.poll_interval
+                    if remaining is None
+                    else min(self.poll_interval, remaining)
+                )
+                changed = self._poll()
+
+        if changed:
+            # Give the writer a moment to finish, and pick up anything else that
+            # changed in the meantime.
+            time.sleep(SETTLE_TIME)
+            if self._inotify_fd is not None:
+                changed |= self._read_inotify_events(0)
+            changed |= self._poll()
+
+        return sorted(changed)
+
+
+def watch(
+    input_filepaths: Iterable[Path],
+    run: Callable[[parser.ParseSession], Any],
+    parser_config: Optional[Dict[str, Any]] = None,
+    file=sys.stderr,
+    max_runs: Optional[int] = None,
+) -> int:
+    """
+    Run `run` with a `parser.ParseSession` for the input files, and run it
+    again every time any of them changes.
+
+    The session is kept between runs, so only the files that changed are
+    parsed again.
+
+    :param input_filepaths: List of Path objects to watch and parse.
+    :param run: The function to call with the session.  It is responsible
+        for refreshing the session.
+    :param parser_config: Parser configuration object, passed to
+        `parser.ParseSession`.
+    :param file: The stream to write status messages to.
+    :param max_runs: Stop after this many runs.  By default, this keeps
+        running until interrupted.
+    :return: The return value of the last run.
+    """
+    input_filepaths = list(input_filepaths)
+    session = parser.ParseSession(input_filepaths, parser_config)
+    result = 0
+    runs = 0
+
+    with FileWatcher(input_filepaths) as watcher:
+        try:
+            while True:
+                result = run(session)
+                runs += 1
+                if max_runs is not None and runs >= max_runs:
+                    break
+                print("👀 Watching for changes. Press Ctrl+C to stop.", file=file)
+                changed = watcher.wait()
+                print(
+                    f"🔄 Changed: {', '.join(str(x) for x in changed)}",
+                    file=file,
+                )
+        except KeyboardInterrupt:
+            pass
+
+    return result
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Build hook that checks the bundled schemas and ships a JSON copy of each of
+them, which `glean_parser.parser` loads much faster than the YAML source.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+
+import jsonschema
+import yaml
+from hatchling.builders.hooks.plugin.interface import BuildHookInterface
+
+
+class CustomBuildHook(BuildHookInterface):
+    def initialize(self, version, build_data):
+        schemas_dir = Path(self.root) / "glean_parser" / "schemas"
+        for schema_path in sorted(schemas_dir.glob("*.schema.yaml")):
+            with schema_path.open("r", encoding="utf-8") as fd:
+                schema = yaml.safe_load(fd)
+            jsonschema.validators.validator_for(schema).check_schema(schema)
+
+            # The digest of the YAML source tells whether the copy is up to
+            # date, see `glean_parser.parser._read_schema`.  The keys are kept
+            # in the order of the YAML source, since `jsonschema` reports
+            # errors in that order.
+            copy = {
+                "yaml_sha256": hashlib.sha256(schema_path.read_bytes()).hexdigest(),
+                "schema": schema,
+            }
+            json_path = schema_path.with_suffix(".json")
+            with json_path.open("w", encoding="utf-8") as fd:
+                json.dump(copy, fd, separators=(",", ":"))
+            build_data["artifacts"].append(json_path.relative_to(self.root).as_posix())
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+
+# Any copyright is dedicated to the Public Domain.
+# http://creativecommons.org/publicdomain/zero/1.0/
+
+from pathlib import Path
+import shutil
+
+import pytest
+
+from glean_parser import cache
+from glean_parser import parser
+from glean_parser import util
+
+
+ROOT = Path(__file__).parent
+
+
+def test_encode_roundtrip():
+    content = util.load_yaml_or_json(ROOT / "data" / "core.yaml")
+    decoded = cache._decode(cache._encode(content))
+
+    assert decoded == content
+    assert isinstance(decoded, util.DictWrapper)
+    for category_key, category_val in content.items():
+        if not isinstance(category_val, dict):
+            continue
+        assert decoded[category_key].defined_in == category_val.defined_in
+        for metric_key, metric_val in category_val.items():
+            assert decoded[category_key][metric_key].defined_in == (
+                metric_val.defined_in
+            )
+
+
+def test_encode_keeps_duplicate():
+    content = util.load_yaml_or_json(ROOT / "data" / "redefined_metric.yamlx")
+    decoded = cache._decode(cache._encode(content))
+
+    assert decoded["redefined.metric"].duplicate == "metric_name"
+
+
+def test_parse_objects_uses_cache(tmp_path, monkeypatch):
+    config = {"allow_reserved": True, "cache": True, "cache_dir": tmp_path / "c"}
+    inputs = [ROOT / "data" / "core.yaml", ROOT / "data" / "pings.yaml"]
+
+    uncached = parser.parse_objects(inputs, {"allow_reserved": True})
+    assert list(uncached) == []
+
+    first = parser.parse_objects(inputs, config)
+    assert list(first) == []
+
+    def fail(*args, **kwargs):
+        raise AssertionError("file should have been loaded from the cache")
+
+    monkeypatch.setattr(parser, "_load_and_validate_file", fail)
+
+    second = parser.parse_objects(inputs, config)
+    assert list(second) == []
+
+    for tree in (first.value, second.value):
+        assert tree.keys() == uncached.value.keys()
+        for category_key, category_val in tree.items():
+            for name, obj in category_val.items():
+                expected = uncached.value[category_key][name]
+                assert obj.serialize() == expected.serialize()
+
+
+def test_changed_file_is_reloaded(tmp_path):
+    config = {"allow_reserved": True, "cache": True, "cache_dir": tmp_path / "c"}
+    metrics_path = tmp_path / "metrics.yaml"
+    shutil.copy(ROOT / "data" / "core.yaml", metrics_path)
+
+    assert list(parser.parse_objects([metrics_path], config)) == []
+
+    with metrics_path.open("a") as fd:
+        fd.write("\n  invalid: 42\n")
+
+    errors = list(parser.parse_objects([metrics_path], config))
+    assert len(errors) == 1
+
+
+def test_invalid_files_are_not_cached(tmp_path):
+    cache_dir = tmp_path / "c"
+    config = {"cache": True, "cache_dir": cache_dir}
+    path = ROOT / "data" / "schema-violation.yaml"
+
+    with cache.LoadCache(cache_dir) as load_cache:
+        assert len(list(parser._load_file(path, config, load_cache))) > 0
+        assert load_cache.get(path, cache.file_digest(path)) is None
+
+
+@pytest.mark.parametrize("config", [{}, {"cache": False}])
+def test_cache_disabled(tmp_path, config):
+    config["cache_dir"] = tmp_path / "c"
+
+    assert cache.open_cache(config) is None
+    assert list(parser.parse_objects([ROOT / "data" / "smaller.yaml"], config)) == []
+    assert not (tmp_path / "c").exists()
+
+
+def test_size_limit(tmp_path):
+    with cache.LoadCache(tmp_path, size_limit=1234) as load_cache:
+        assert load_cache._cache.size_limit == 1234
+        assert load_cache._cache.eviction_policy == "least-recently-used"
+
+
+def test_known_digests(tmp_path):
+    path = tmp_path / "metrics.yaml"
+    shutil.copy(ROOT / "data" / "core.yaml", path)
+
+    digests = {path: (cache.file_stamp(path), "known")}
+    with cache.LoadCache(tmp_path / "c", digests=digests) as load_cache:
+        assert load_cache.digest(path) == "known"
+
+        # A changed file is hashed again.
+        with path.open("a") as fd:
+            fd.write("\n")
+        assert load_cache.digest(path) == cache.file_digest(path)
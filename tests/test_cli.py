@@ -282,3 +282,55 @@ def test_no_file_can_be_skipped(tmp_path):
         ["translate", "-o", str(tmp_path), "-f", "kotlin", "--allow-missing-files"],
     )
     assert result.exit_code == 0
+
+
+def test_glinter_manifest(tmp_path):
+    """Test passing the input files to 'glinter' in a manifest."""
+    manifest = tmp_path / "inputs.txt"
+    manifest.write_text(f"# Globbed.\n{ROOT / 'data'}/bad_ping.yaml?\n")
+
+    runner = CliRunner()
+    result = runner.invoke(__main__.main, ["glinter", f"@{manifest}"])
+    assert result.exit_code == 1
+    assert "Found 1 errors" in result.output
+
+    result = runner.invoke(__main__.main, ["glinter", "--manifest", str(manifest)])
+    assert result.exit_code == 1
+    assert "Found 1 errors" in result.output
+
+    result = runner.invoke(__main__.main, ["glinter", f"@{tmp_path / 'missing'}"])
+    assert result.exit_code == 2
+
+
+def test_glinter_bad_included_manifest(tmp_path):
+    """Errors in included manifests are reported without a traceback."""
+    manifest = tmp_path / "inputs.txt"
+    manifest.write_text("@missing.txt\n")
+
+    runner = CliRunner()
+    result = runner.invoke(__main__.main, ["glinter", f"@{manifest}"])
+    assert result.exit_code == 2
+    assert f"Can't read manifest '{tmp_path / 'missing.txt'}'" in result.output
+    assert "Traceback" not in result.output
+
+    manifest.write_text("@inputs.txt\n")
+    result = runner.invoke(__main__.main, ["glinter", "--manifest", str(manifest)])
+    assert result.exit_code == 2
+    assert f"Manifest '{manifest}' includes itself" in result.output
+    assert "Traceback" not in result.output
+
+
+def test_cache_is_opt_in(monkeypatch):
+    """Test that the commands only cache on disk with --cache."""
+    configs = []
+
+    def glinter(input_filepaths, parser_config, **kwargs):
+        configs.append(parser_config)
+        return 0
+
+    monkeypatch.setattr(__main__.lint, "glinter", glinter)
+    runner = CliRunner()
+    input = str(ROOT / "data" / "core.yaml")
+    assert runner.invoke(__main__.main, ["glinter", input]).exit_code == 0
+    assert runner.invoke(__main__.main, ["glinter", input, "--cache"]).exit_code == 0
+    assert [config["cache"] for config in configs] == [False, True]
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+# Any copyright is dedicated to the Public Domain.
+# http://creativecommons.org/publicdomain/zero/1.0/
+
+import gc
+from pathlib import Path
+import pickle
+import tracemalloc
+
+import pytest
+
+from glean_parser import compact
+from glean_parser import metrics
+from glean_parser import parser
+from glean_parser import pings
+from glean_parser import translate
+
+
+ROOT = Path(__file__).parent
+
+
+INPUTS = [ROOT / "data" / "core.yaml", ROOT / "data" / "pings.yaml"]
+
+
+def _parse(filepaths, **config):
+    result = parser.parse_objects(filepaths, {"allow_reserved": True, **config})
+    assert not list(result)
+    return result.value
+
+
+def test_compact_objects_serialize_the_same():
+    regular = _parse(INPUTS)
+    compacted = _parse(INPUTS, compact=True)
+
+    assert regular.keys() == compacted.keys()
+    for category_key, category_val in regular.items():
+        for key, obj in category_val.items():
+            other = compacted[category_key][key]
+            assert compact.is_compact(other)
+            assert not compact.is_compact(obj)
+            assert type(other).__name__ == type(obj).__name__
+            assert isinstance(other, type(obj))
+            # The order matters too, since it shows up in the output.
+            assert list(other.serialize().items()) == list(obj.serialize().items())
+
+
+def test_compact_objects_share_values():
+    objects = _parse(INPUTS, compact=True)
+
+    seq = objects["core_ping"]["seq"]
+    created = objects["core_ping"]["created"]
+    assert seq.send_in_pings == ["core"]
+    assert seq.send_in_pings is created.send_in_pings
+    assert seq.notification_emails is created.notification_emails
+
+    with pytest.raises(TypeError):
+        seq.send_in_pings.append("metrics")
+
+    # Assigning new values still works.
+    seq.send_in_pings = ["metrics"]
+    assert seq.serialize()["send_in_pings"] == ["metrics"]
+    seq.new_attribute = 42
+    assert seq.new_attribute == 42
+
+
+def test_compact_classes_are_not_registered():
+    objects = _parse(INPUTS, compact=True)
+
+    assert metrics.Metric.metric_types["counter"] is metrics.Counter
+    assert type(objects["core_ping"]["seq"]) is not metrics.Counter
+    assert isinstance(objects["pings"]["custom-ping"], pings.Ping)
+
+
+def test_compact_objects_pickle():
+    objects = _parse(INPUTS, compact=True)
+
+    seq = objects["core_ping"]["seq"]
+    copy = pickle.loads(pickle.dumps(seq))
+    assert compact.is_compact(copy)
+    assert copy.serialize() == seq.serialize()
+
+
+def test_translate_compact(tmp_path):
+    inputs = [ROOT / "data" / "rate.yaml"]
+    translate.translate(inputs, "markdown", tmp_path / "regular", {}, {})
+    translate.translate(inputs, "markdown", tmp_path / "compact", {}, {"compact": True})
+
+    regular = (tmp_path / "regular" / "metrics.md").read_text()
+    compacted = (tmp_path / "compact" / "metrics.md").read_text()
+    assert regular == compacted
+
+
+def test_compact_uses_less_memory():
+    info = {
+        "type": "counter",
+        "bugs": ["https://bugzilla.mozilla.org/1"],
+        "description": "A counter.",
+        "notification_emails": ["nobody@example.com"],
+        "data_reviews": ["https://example.com/review"],
+        "expires": "never",
+        "send_in_pings": ["metrics"],
+    }
+
+    def measure(make):
+        gc.collect()
+        tracemalloc.start()
+        objects = [make(f"metric_{i}") for i in range(1000)]
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del objects
+        return size
+
+    def make_regular(name):
+        return metrics.Metric.make_metric("category", name, dict(info), validated=True)
+
+    def make_compact(name):
+        return compact.compact(make_regular(name))
+
+    assert measure(make_compact) < measure(make_regular) * 0.75
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+
+# Any copyright is dedicated to the Public Domain.
+# http://creativecommons.org/publicdomain/zero/1.0/
+
+import copy
+from pathlib import Path
+
+import pytest
+
+from glean_parser import compiled_schema
+from glean_parser import parser
+from glean_parser import util
+
+
+ROOT = Path(__file__).parent
+
+
+def _data_files():
+    for filepath in sorted((ROOT / "data").glob("*.yaml")):
+        content = util.load_yaml_or_json(filepath)
+        if isinstance(content, dict) and content.get("$schema") in (
+            parser._load_schemas()
+        ):
+            yield filepath, content
+
+
+def _is_valid(content):
+    _, validator = parser._get_schema(content["$schema"])
+    return not any(validator.iter_errors(content))
+
+
+@pytest.mark.parametrize("schema_id", sorted(parser._load_schemas()))
+def test_bundled_schemas_compile(schema_id):
+    schema, _ = parser._get_schema(schema_id)
+    source = compiled_schema.compile_schema(schema)
+    compile(source, schema_id, "exec")
+    assert parser._get_fast_validator(schema_id) is not None
+
+
+def test_agrees_with_jsonschema():
+    for filepath, content in _data_files():
+        fast_validator = parser._get_fast_validator(content["$schema"])
+        assert fast_validator(content) == _is_valid(content), filepath
+
+
+def test_rejects_invalid_content():
+    content = util.load_yaml_or_json(ROOT / "data" / "core.yaml")
+    fast_validator = parser._get_fast_validator(content["$schema"])
+    assert fast_validator(content)
+
+    for mutate in [
+        lambda c: c["core_ping"]["seq"].update({"type": "not_a_type"}),
+        lambda c: c["core_ping"]["seq"].pop("bugs"),
+        lambda c: c["core_ping"]["seq"].update({"unknown_key": True}),
+        lambda c: c["core_ping"]["seq"].update({"bugs": []}),
+        lambda c: c["core_ping"]["seq"].update({"send_in_pings": "core"}),
+        lambda c: c["core_ping"].update({"Invalid-Name": {}}),
+        lambda c: c["core_ping"]["seq"].update({"lifetime": "forever"}),
+    ]:
+        mutated = copy.deepcopy(content)
+        mutate(mutated)
+        assert not _is_valid(mutated)
+        assert not fast_validator(mutated)
+
+
+def test_same_error_messages():
+    content = util.load_yaml_or_json(ROOT / "data" / "schema-violation.yaml")
+    _, validator = parser._get_schema(content["$schema"])
+
+    errors = list(parser.validate(content))
+    assert errors
+    assert errors == [
+        util.format_error("<input>", "", util.pprint_validation_error(e))
+        for e in validator.iter_errors(content)
+    ]
+
+
+@pytest.mark.parametrize(
+    "schema,instance,expected",
+    [
+        ({"type": "integer"}, 1.0, True),
+        ({"type": "integer"}, True, False),
+        ({"type": "number"}, False, False),
+        ({"enum": [1, "a"]}, True, False),
+        ({"enum": [1, "a"]}, 1, True),
+        ({"const": False}, 0, False),
+        ({"uniqueItems": True}, ["a", "b"], True),
+        ({"uniqueItems": True}, ["a", "a"], False),
+        ({"oneOf": [{"type": "string"}, {"minLength": 1}]}, "a", False),
+        ({"if": {"type": "string"}, "then": {"minLength": 2}}, "a", False),
+        ({"if": {"type": "string"}, "then": {"minLength": 2}}, 3, True),
+        ({"not": {"type": "string"}}, "a", False),
+        ({"additionalProperties": {"type": "string"}}, {"a": 1}, False),
+        ({"$ref": "#/definitions/a", "definitions": {"a": False}}, 1, False),
+    ],
+)
+def test_keywords(schema, instance, expected):
+    namespace = dict(compiled_schema._NAMESPACE)
+    exec(compiled_schema.compile_schema(schema), namespace)
+    assert namespace["validate"](instance) == expected
+
+
+def test_unsupported_keyword():
+    with pytest.raises(compiled_schema.UnsupportedSchema):
+        compiled_schema.compile_schema({"multipleOf": 2})
+
+    assert compiled_schema.load_validator({"multipleOf": 2}, use_cache=False) is None
+
+
+def test_compiled_code_is_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(compiled_schema, "_cache_dir", lambda: tmp_path)
+    schema = {"$id": "test", "type": "string"}
+
+    assert compiled_schema.load_validator(schema, use_cache=True)("a")
+
+    def fail(schema):
+        raise AssertionError("Should have been cached")
+
+    monkeypatch.setattr(compiled_schema, "compile_schema", fail)
+    validator = compiled_schema.load_validator(schema, use_cache=True)
+    assert validator("a")
+    assert not validator(1)
+
+    # A different schema has a different hash, so it isn't cached yet.
+    with pytest.raises(AssertionError):
+        compiled_schema.load_validator(
+            {"$id": "test", "type": "integer"}, use_cache=True
+        )
+
+
+def test_compiled_code_is_not_cached_by_default(tmp_path, monkeypatch):
+    monkeypatch.setattr(compiled_schema, "_cache_dir", lambda: tmp_path / "default")
+    assert compiled_schema.load_validator({"$id": "test", "type": "string"})("a")
+    assert not (tmp_path / "default").exists()
+
+
+def test_parser_caches_compiled_code_with_cache_config(tmp_path, monkeypatch):
+    monkeypatch.setattr(compiled_schema, "_cache_dir", lambda: tmp_path / "default")
+    filepaths = [ROOT / "data" / "core.yaml"]
+
+    parser._get_fast_validator.cache_clear()
+    all_metrics = parser.parse_objects(filepaths, {"allow_reserved": True})
+    assert not list(all_metrics)
+    assert not (tmp_path / "default").exists()
+
+    parser._get_fast_validator.cache_clear()
+    config = {"allow_reserved": True, "cache": True, "cache_dir": tmp_path / "cache"}
+    all_metrics = parser.parse_objects(filepaths, config)
+    assert not list(all_metrics)
+    assert (tmp_path / "cache" / "validators").is_dir()
+    assert not (tmp_path / "default").exists()
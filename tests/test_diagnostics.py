@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+# Any copyright is dedicated to the Public Domain.
+# http://creativecommons.org/publicdomain/zero/1.0/
+
+from pathlib import Path
+import pickle
+
+
+from glean_parser import parser
+from glean_parser import util
+from glean_parser.diagnostics import Diagnostic
+
+
+ROOT = Path(__file__).parent
+
+
+def test_lazy_formatting():
+    calls = []
+
+    def content():
+        calls.append(None)
+        return "Something is wrong."
+
+    diagnostic = Diagnostic(ROOT / "metrics.yaml", "On instance a.b", content, 3)
+    assert calls == []
+
+    expected = util.format_error(
+        ROOT / "metrics.yaml", "On instance a.b", "Something is wrong.", 3
+    )
+    assert str(diagnostic) == expected
+    assert str(diagnostic) == expected
+    assert len(calls) == 1
+
+
+def test_behaves_like_str():
+    first = Diagnostic("", "", "First")
+    second = Diagnostic("", "", "Second")
+
+    assert first == str(first)
+    assert str(first) == first
+    assert first != second
+    assert sorted([second, first]) == [str(first), str(second)]
+    assert {first, str(first)} == {first}
+    assert "First" in first
+    assert first.splitlines() == str(first).splitlines()
+    assert "> " + first == "> " + str(first)
+    assert f"{first}" == str(first)
+
+
+def test_pickle():
+    diagnostic = Diagnostic(
+        "", "", lambda: "Computed.", code="SCHEMA_VIOLATION", object_id="a.b"
+    )
+    unpickled = pickle.loads(pickle.dumps(diagnostic))
+    assert unpickled == diagnostic
+    assert unpickled.code == "SCHEMA_VIOLATION"
+    assert unpickled.object_id == "a.b"
+
+
+def test_parser_diagnostics():
+    errors = list(parser.parse_objects([ROOT / "data" / "schema-violation.yaml"]))
+    assert len(errors) > 0
+    for error in errors:
+        assert isinstance(error, Diagnostic)
+        assert error.code == "SCHEMA_VIOLATION"
+        assert error.filepath == ROOT / "data" / "schema-violation.yaml"
+
+    filepaths = [ROOT / "data" / "smaller.yaml", ROOT / "data" / "smaller.yaml"]
+    errors = list(parser.parse_objects(filepaths))
+    assert [(error.code, error.object_id) for error in errors] == [
+        ("DUPLICATE_NAME", "telemetry.client_id")
+    ]
+    assert errors[0].lineno is not None
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+# Any copyright is dedicated to the Public Domain.
+# http://creativecommons.org/publicdomain/zero/1.0/
+
+import datetime
+from pathlib import Path
+
+import pytest
+
+from glean_parser import expiry
+from glean_parser import parser
+from glean_parser import util
+
+
+ROOT = Path(__file__).parent
+
+
+def test_matches_util():
+    evaluator = expiry.ExpiryEvaluator()
+    for expires in ["never", "expired", "2000-01-01", "2100-01-01", "foo", 42]:
+        for method in ("is_expired", "validate_expires"):
+            try:
+                expected = getattr(util, method)(expires)
+            except ValueError as e:
+                with pytest.raises(ValueError) as actual:
+                    getattr(evaluator, method)(expires)
+                assert actual.value.args == e.args
+            else:
+                assert getattr(evaluator, method)(expires) == expected
+
+
+def test_expire_by_version():
+    evaluator = expiry.ExpiryEvaluator(major_version=11)
+    assert evaluator.is_expired(10)
+    assert evaluator.is_expired(11)
+    assert not evaluator.is_expired(12)
+    evaluator.validate_expires(1000)
+    with pytest.raises(ValueError):
+        evaluator.is_expired("2000-01-01")
+
+
+def test_single_clock_read(monkeypatch):
+    calls = []
+
+    def now_epoch():
+        calls.append(None)
+        return datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+
+    monkeypatch.setattr(util, "now_epoch", now_epoch)
+
+    evaluator = expiry.ExpiryEvaluator()
+    assert not evaluator.is_expired("never")
+    assert calls == []
+
+    assert evaluator.is_expired("2019-12-31")
+    assert not evaluator.is_expired("2020-01-02")
+    assert evaluator.is_expired("2019-12-31")
+    assert len(calls) == 1
+
+
+def test_source_date_epoch(monkeypatch):
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "946684800")  # 2000-01-01
+
+    evaluator = expiry.ExpiryEvaluator()
+    assert evaluator.is_expired("1999-12-31")
+    assert not evaluator.is_expired("2000-01-02")
+
+
+def test_parser_shares_evaluator():
+    result = parser.parse_objects(
+        [ROOT / "data" / "core.yaml"], {"allow_reserved": True}
+    )
+    errors = list(result)
+    assert not errors
+
+    evaluators = {
+        id(metric._expiry)
+        for category in result.value.values()
+        for metric in category.values()
+    }
+    assert len(evaluators) == 1
+
+    metric = result.value["core_ping"]["seq"]
+    assert "_expiry" not in metric.serialize()
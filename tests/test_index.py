@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+# Any copyright is dedicated to the Public Domain.
+# http://creativecommons.org/publicdomain/zero/1.0/
+
+from pathlib import Path
+
+
+from glean_parser import index
+from glean_parser import parser
+from glean_parser import translate
+
+
+ROOT = Path(__file__).parent
+
+
+def _parse(filepaths):
+    result = parser.parse_objects(filepaths, {"allow_reserved": True})
+    assert not list(result)
+    return result.value
+
+
+def test_index_maps():
+    objs = _parse(
+        [
+            ROOT / "data" / "pings.yaml",
+            ROOT / "data" / "metric-with-tags.yaml",
+            ROOT / "data" / "tags.yaml",
+        ]
+    )
+    idx = index.ObjectTreeIndex(objs)
+
+    expected = [
+        metric
+        for category_key, category_val in objs.items()
+        if category_key not in ("pings", "tags")
+        for metric in category_val.values()
+    ]
+    assert idx.metrics == expected
+    assert idx.pings == dict(objs["pings"])
+    assert idx.tags == dict(objs["tags"])
+
+    client_id = objs["telemetry"]["client_id"]
+    assert idx.by_identifier["telemetry.client_id"] is client_id
+    assert idx.by_ping["metrics"] == [client_id]
+    assert idx.by_type["uuid"] == [client_id]
+    assert idx.by_tag["banana"] == [client_id]
+    assert idx.categories["telemetry"] == list(objs["telemetry"].values())
+
+
+def test_transform_metrics_keeps_index():
+    objs = _parse([ROOT / "data" / "rate.yaml"])
+    translate.transform_metrics(objs)
+
+    idx = index.get_index(objs)
+    assert idx is index.get_index(objs)
+
+    denominator = idx.by_identifier["testing.rates.the_denominator"]
+    assert idx.by_type["denominator"] == [denominator]
+    assert sorted(metric.name for metric in idx.by_type["numerator"]) == [
+        "also_has_external_denominator",
+        "has_external_denominator",
+    ]
+    assert denominator.numerators == idx.numerators["testing.rates.the_denominator"]
+
+    # Running it again rebuilds the index, with the same result.
+    translate.transform_metrics(objs)
+    assert index.get_index(objs) is not idx
+    assert index.get_index(objs).by_type["denominator"] == [denominator]
+
+
+def test_get_index_of_plain_dict():
+    objs = dict(_parse([ROOT / "data" / "core.yaml"]))
+    index.set_index(objs, index.ObjectTreeIndex(objs))
+
+    assert index.get_index(objs) is not index.get_index(objs)
+    assert "core_ping.seq" in index.get_index(objs).by_identifier
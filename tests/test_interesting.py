@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+# Any copyright is dedicated to the Public Domain.
+# http://creativecommons.org/publicdomain/zero/1.0/
+
+from pathlib import Path
+
+
+from glean_parser import interesting
+from glean_parser import parser
+
+
+ROOT = Path(__file__).parent
+
+
+def test_identifier_list():
+    interesting_filter = interesting.InterestingFilter()
+    interesting_filter.add_identifier_list(
+        "# Comments and empty lines are ignored.\n"
+        "\n"
+        "telemetry.client_id\n"
+        "  core_ping.* \n"
+        "*.event_?\n"
+    )
+
+    assert interesting_filter.identifiers == {"telemetry.client_id"}
+    assert interesting_filter.is_interesting("telemetry", "client_id")
+    assert not interesting_filter.is_interesting("telemetry", "client")
+    assert interesting_filter.is_interesting("core_ping", "seq")
+    assert not interesting_filter.is_interesting("core_pings", "seq")
+    assert interesting_filter.is_interesting("dotted.category", "event_1")
+    assert not interesting_filter.is_interesting("dotted.category", "event_10")
+
+
+def _disabled(objs):
+    return {
+        metric.identifier(): metric.disabled
+        for category_key, category_val in objs.items()
+        if category_key not in ("pings", "tags")
+        for metric in category_val.values()
+    }
+
+
+def test_identifier_list_file(tmp_path):
+    all_metrics = ROOT / "data" / "all_metrics.yaml"
+    metrics_with_tags = ROOT / "data" / "metric-with-tags.yaml"
+
+    expected = parser.parse_objects(
+        [all_metrics, metrics_with_tags], {"interesting": [metrics_with_tags]}
+    )
+    assert list(expected) == []
+
+    interesting_list = tmp_path / "interesting.txt"
+    interesting_list.write_text("telemetry.client_id\n")
+    actual = parser.parse_objects(
+        [all_metrics, metrics_with_tags], {"interesting": [interesting_list]}
+    )
+    assert list(actual) == []
+
+    assert _disabled(actual.value) == _disabled(expected.value)
+    assert list(_disabled(actual.value).values()).count(False) == 1
+
+    interesting_list.write_text("all_metrics.*\n")
+    actual = parser.parse_objects(
+        [all_metrics, metrics_with_tags], {"interesting": [interesting_list]}
+    )
+    assert list(actual) == []
+    for identifier, disabled in _disabled(actual.value).items():
+        assert disabled is not identifier.startswith("all_metrics.")
+
+
+def test_input_files_not_loaded_again(monkeypatch):
+    metrics_with_tags = ROOT / "data" / "metric-with-tags.yaml"
+
+    loaded = []
+    load_file = parser._load_file
+
+    def _load_file(filepath, *args, **kwargs):
+        loaded.append(filepath)
+        return load_file(filepath, *args, **kwargs)
+
+    monkeypatch.setattr(parser, "_load_file", _load_file)
+
+    result = parser.parse_objects(
+        [ROOT / "data" / "all_metrics.yaml", metrics_with_tags],
+        {"interesting": [metrics_with_tags]},
+    )
+    assert list(result) == []
+    assert loaded.count(metrics_with_tags) == 1
+    assert result.value["telemetry"]["client_id"].disabled is False
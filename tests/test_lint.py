@@ -3,10 +3,12 @@
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
 
+import json
 from pathlib import Path
 
 
 from glean_parser import lint
+from glean_parser import metrics
 from glean_parser import parser
 
 
@@ -209,6 +211,37 @@ def test_misspelling_pings():
     assert set(["MISSPELLED_PING"]) == set(v.check_name for v in nits)
 
 
+def test_misspelling_pings_edit_distance():
+    """Insertions and deletions in the middle of a ping name are misspellings too."""
+    contents = [
+        {
+            "user_data": {
+                "counter": {
+                    "type": "counter",
+                    "send_in_pings": ["basline", "metrcs", "deletion-requests"],
+                },
+                "string": {"type": "string", "send_in_pings": ["metrics"]},
+            }
+        }
+    ]
+    contents = [util.add_required(x) for x in contents]
+    all_metrics = parser.parse_objects(contents)
+
+    errs = list(all_metrics)
+    assert len(errs) == 0
+
+    nits = lint.lint_metrics(all_metrics.value)
+
+    assert [(v.check_name, v.name) for v in nits] == [
+        ("MISSPELLED_PING", "user_data.counter")
+    ] * 3
+    assert set(v.msg.split(". ")[1] for v in nits) == {
+        "Did you mean 'baseline'?",
+        "Did you mean 'metrics'?",
+        "Did you mean 'deletion-request'?",
+    }
+
+
 def test_user_lifetime_expiration():
     """Test that expiring 'user' lifetime metrics generate a warning."""
     contents = [
@@ -511,6 +544,31 @@ def test_unknown_pings_lint():
     assert "does-not-exist" in nits[0].msg
 
 
+def test_unknown_pings_suggestions():
+    """Test that unknown pings similar to a known ping suggest it."""
+    contents = [
+        util.add_required(
+            {
+                "all_metrics": {
+                    "a": {"type": "counter", "send_in_pings": ["sample-thnig"]},
+                    "b": {"type": "counter", "send_in_pings": ["sample-things"]},
+                }
+            }
+        ),
+        util.add_required_ping({"sample-thing": {}}),
+    ]
+    all_objects = parser.parse_objects(contents)
+    assert len(list(all_objects)) == 0
+
+    nits = lint.lint_metrics(all_objects.value, parser_config={})
+    assert [(v.check_name, v.name) for v in nits] == [
+        ("UNKNOWN_PING_REFERENCED", "all_metrics.a"),
+        ("UNKNOWN_PING_REFERENCED", "all_metrics.b"),
+    ]
+    assert "Did you mean" not in nits[0].msg
+    assert nits[1].msg.endswith("is unknown. Did you mean 'sample-thing'?")
+
+
 def test_name_too_similar_lint():
     """Ensure the 'glinter' reports metrics whose names are too similar."""
     # Note: NAME_TOO_SIMILAR is an all-object lint meaning we need pings for it to work.
@@ -527,6 +585,47 @@ def test_name_too_similar_lint():
     assert "all_metrics.valid_metric" in nits[0].msg
 
 
+def test_name_too_similar_distance_and_permutations():
+    """Ensure NAME_TOO_SIMILAR can report typos and reordered words."""
+    contents = [
+        util.add_required(
+            {
+                "all_metrics": {
+                    "tab_count": {"type": "counter"},
+                    "tab_counts": {"type": "counter"},
+                    "count_tab": {"type": "counter"},
+                    "page_load": {"type": "counter"},
+                }
+            }
+        ),
+        ROOT / "data" / "pings.yaml",
+    ]
+    all_objects = parser.parse_objects(contents)
+    assert len(list(all_objects)) == 0
+
+    nits = lint.lint_metrics(all_objects.value, parser_config={})
+    assert nits == []
+
+    nits = lint.lint_metrics(
+        all_objects.value,
+        parser_config={"similar_name_distance": 1},
+    )
+    assert [(nit.check_name, nit.name) for nit in nits] == [
+        ("NAME_TOO_SIMILAR", "all_metrics.tab_counts")
+    ]
+    assert "all_metrics.tab_count`" in nits[0].msg
+
+    nits = lint.lint_metrics(
+        all_objects.value,
+        parser_config={"similar_name_distance": 1, "similar_name_permutations": True},
+    )
+    assert [nit.name for nit in nits] == [
+        "all_metrics.tab_count",
+        "all_metrics.tab_counts",
+    ]
+    assert "all_metrics.count_tab`" in nits[0].msg
+
+
 def test_redefined_metric():
     """Ensure we fail when folks redefine a metric with the same category+name."""
     input = [
@@ -966,3 +1065,129 @@ def test_events_on_metrics_ping(content, num_nits):
     assert len(nits) == num_nits
     if num_nits > 0:
         assert set(["EVENT_ON_NON_EVENTS_PING"]) == set(v.check_name for v in nits)
+
+
+def test_parallel_lint(monkeypatch):
+    """
+    Linting in worker processes finds the same nits, in the same order.
+    """
+    all_metrics = parser.parse_objects(
+        [
+            ROOT / "data" / "core.yaml",
+            ROOT / "data" / "all_metrics.yaml",
+            ROOT / "data" / "old_event_api.yamlx",
+            ROOT / "data" / "redefined_metric.yamlx",
+        ],
+        {"allow_reserved": True},
+    )
+    list(all_metrics)
+
+    serial = lint.lint_metrics(all_metrics.value, {"allow_reserved": True})
+    assert len(serial) > 1
+
+    monkeypatch.setattr(lint, "PARALLEL_LINT_MIN_METRICS", 0)
+    parallel = lint.lint_metrics(all_metrics.value, {"allow_reserved": True, "jobs": 3})
+    assert [nit.format() for nit in parallel] == [nit.format() for nit in serial]
+    assert lint._worker_state is None
+
+
+def test_lint_cache(tmp_path, monkeypatch):
+    """
+    Only the metrics whose definition changed are checked again.
+    """
+    content = util.add_required(
+        {
+            "telemetry": {
+                "network_latency_ms": {"type": "timespan", "time_unit": "millisecond"},
+                "width_pixels": {"type": "quantity", "unit": "pixels"},
+                "expiring": {"type": "counter", "expires": "2000-01-01"},
+            }
+        }
+    )
+    metrics_path = tmp_path / "metrics.json"
+    metrics_path.write_text(json.dumps(content))
+    config = {"cache": True, "cache_dir": tmp_path / "c"}
+
+    checked = []
+    lint_metric = lint._lint_metric
+
+    def _lint_metric(metric, parser_config):
+        checked.append(metric.name)
+        return lint_metric(metric, parser_config)
+
+    monkeypatch.setattr(lint, "_lint_metric", _lint_metric)
+
+    def _lint():
+        all_metrics = parser.parse_objects([metrics_path], config)
+        assert list(all_metrics) == []
+        return [nit.format() for nit in lint.lint_metrics(all_metrics.value, config)]
+
+    expected = _lint()
+    assert {nit.split(":")[1].strip() for nit in expected} == {
+        "UNIT_IN_NAME",
+        "EXPIRED",
+    }
+    assert len(checked) == 3
+
+    checked.clear()
+    assert _lint() == expected
+    assert checked == []
+
+    content["telemetry"]["width_pixels"]["description"] = "Changed."
+    metrics_path.write_text(json.dumps(content))
+    assert _lint() == expected
+    assert checked == ["width_pixels"]
+
+    # Metrics that expire by date are checked again on another day.
+    checked.clear()
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "0")
+    assert _lint() != expected
+    assert checked == ["expiring"]
+
+
+def test_register_metric_check(monkeypatch):
+    """Test that checks can be registered, and only run on the metrics in scope."""
+    monkeypatch.setattr(lint, "METRIC_CHECKS", dict(lint.METRIC_CHECKS))
+    monkeypatch.setattr(lint, "METRIC_CHECK_SCOPES", dict(lint.METRIC_CHECK_SCOPES))
+    monkeypatch.setattr(lint, "_metric_rules", None)
+
+    checked = []
+
+    def check_counter_description(metric, parser_config):
+        checked.append(metric.name)
+        if "counter" not in metric.description:
+            yield "Counter descriptions should say they are counters."
+
+    lint.register_metric_check(
+        "COUNTER_DESCRIPTION",
+        check_counter_description,
+        lint.CheckType.warning,
+        lint.MetricCheckScope(types=(metrics.Counter,), fields=("description",)),
+    )
+    with pytest.raises(ValueError):
+        lint.register_metric_check(
+            "COUNTER_DESCRIPTION", check_counter_description, lint.CheckType.error
+        )
+    with pytest.raises(ValueError):
+        lint.register_metric_check("NAME_TOO_SIMILAR", lint.noop, lint.CheckType.error)
+
+    content = util.add_required(
+        {
+            "cat": {
+                "counter": {"type": "counter"},
+                "labeled": {"type": "labeled_counter"},
+                "quiet": {"type": "counter", "no_lint": ["COUNTER_DESCRIPTION"]},
+                "string": {"type": "string", "no_lint": ["COUNTER_DESCRIPTION"]},
+            }
+        }
+    )
+    all_metrics = parser.parse_objects(content)
+    assert len(list(all_metrics)) == 0
+
+    nits = lint.lint_metrics(all_metrics.value)
+    assert [(nit.check_name, nit.name) for nit in nits] == [
+        ("COUNTER_DESCRIPTION", "cat.counter"),
+        ("COUNTER_DESCRIPTION", "cat.labeled"),
+        ("UNUSED_NO_LINT", "cat.string"),
+    ]
+    assert sorted(checked) == ["counter", "labeled", "quiet"]
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+# Any copyright is dedicated to the Public Domain.
+# http://creativecommons.org/publicdomain/zero/1.0/
+
+import concurrent.futures
+from pathlib import Path
+
+import pytest
+
+from glean_parser import cache
+from glean_parser import manifest
+
+
+ROOT = Path(__file__).parent
+
+
+def _write_tree(tmp_path):
+    for name in ["a/metrics.yaml", "b/metrics.yaml", "b/c/metrics.yaml", "pings.yaml"]:
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_text(name)
+
+
+def test_expand_inputs(tmp_path):
+    _write_tree(tmp_path)
+    (tmp_path / "other.txt").write_text("pings.yaml\n")
+    (tmp_path / "inputs.txt").write_text(
+        "# A comment.\n\n**/metrics.yaml\nmissing/*.yaml\n@other.txt\n"
+    )
+
+    expected = [
+        ROOT / "data" / "core.yaml",
+        tmp_path / "a" / "metrics.yaml",
+        tmp_path / "b" / "c" / "metrics.yaml",
+        tmp_path / "b" / "metrics.yaml",
+        tmp_path / "pings.yaml",
+    ]
+    inputs = [ROOT / "data" / "core.yaml", f"@{tmp_path / 'inputs.txt'}"]
+    assert manifest.expand_inputs(inputs) == expected
+    with concurrent.futures.ThreadPoolExecutor() as executor:
+        assert manifest.expand_inputs(inputs, executor) == expected
+
+
+def test_manifest_includes_itself(tmp_path):
+    (tmp_path / "inputs.txt").write_text("@inputs.txt\n")
+    with pytest.raises(ValueError):
+        manifest.expand_inputs([f"@{tmp_path / 'inputs.txt'}"])
+
+
+def test_resolve_inputs_hashes_files(tmp_path):
+    _write_tree(tmp_path)
+    (tmp_path / "inputs.txt").write_text("*/metrics.yaml\n")
+
+    parser_config = {"cache": True}
+    filepaths = manifest.resolve_inputs([f"@{tmp_path / 'inputs.txt'}"], parser_config)
+    assert filepaths == [
+        tmp_path / "a" / "metrics.yaml",
+        tmp_path / "b" / "metrics.yaml",
+    ]
+    assert parser_config["input_digests"] == {
+        filepath: (cache.file_stamp(filepath), cache.file_digest(filepath))
+        for filepath in filepaths
+    }
+
+    parser_config = {"cache": False}
+    manifest.resolve_inputs([f"@{tmp_path / 'inputs.txt'}"], parser_config)
+    assert "input_digests" not in parser_config
@@ -4,6 +4,7 @@
 # http://creativecommons.org/publicdomain/zero/1.0/
 
 import datetime
+import json
 
 import pytest
 
@@ -261,3 +262,122 @@ def test_jwe_is_rejected():
             extra_keys={"glean.internal": {"description": "foo"}},
             _config={"allow_reserved": True},
         )
+
+
+def _metric_info(**kwargs):
+    info = {
+        "type": "counter",
+        "bugs": ["http://bugzilla.mozilla.com/12345"],
+        "description": "description...",
+        "notification_emails": ["nobody@example.com"],
+        "data_reviews": ["http://example.com/reviews"],
+        "expires": "never",
+    }
+    info.update(kwargs)
+    return info
+
+
+def test_make_metrics():
+    metrics_info = [
+        ("category", "first", _metric_info()),
+        ("category", "bad_description", _metric_info(description=42)),
+        ("other", "timespan", _metric_info(type="timespan", time_unit="day")),
+        ("category", "bad_time_unit", _metric_info(type="timespan", time_unit="foo")),
+        ("glean.internal.metrics", "internal", _metric_info()),
+    ]
+
+    result = metrics.Metric.make_metrics(metrics_info)
+    errors = list(result)
+    made = result.value
+
+    assert len(made) == len(metrics_info)
+    assert [m is None for m in made] == [False, True, False, True, False]
+    assert len(errors) == 2
+    # Errors found while building the metrics come before schema errors.
+    assert "On instance category.bad_time_unit" in errors[0]
+    assert "On instance category.bad_description" in errors[1]
+
+    for (category, name, metric_info), m in zip(metrics_info, made):
+        if m is None:
+            continue
+        expected = metrics.Metric.make_metric(category, name, metric_info)
+        assert m.serialize() == expected.serialize()
+        assert m.identifier() == expected.identifier()
+
+
+def test_make_metrics_same_errors_as_make_metric():
+    metrics_info = [
+        ("category", "metric", _metric_info(bugs=[])),
+        ("Invalid-Category", "metric", _metric_info()),
+    ]
+
+    errors = list(metrics.Metric.make_metrics(metrics_info))
+
+    assert len(errors) == 2
+    for (category, name, metric_info), error in zip(metrics_info, errors):
+        with pytest.raises(ValueError) as e:
+            metrics.Metric.make_metric(category, name, metric_info)
+        # The error from `make_metric` has a header line of its own.
+        assert str(e.value).split("\n", 1)[1] in error
+
+
+def test_make_metrics_duplicates():
+    """Metrics with the same name are validated separately."""
+    metrics_info = [
+        ("category", "metric", _metric_info()),
+        ("category", "metric", _metric_info(description=42)),
+        ("category", "metric", _metric_info(type="boolean")),
+    ]
+
+    result = metrics.Metric.make_metrics(metrics_info)
+    errors = list(result)
+
+    assert len(errors) == 1
+    assert [m is None for m in result.value] == [False, True, False]
+    assert result.value[2].type == "boolean"
+
+
+def test_serialize():
+    labeled = metrics.Metric.make_metric(
+        "category",
+        "labeled",
+        _metric_info(
+            type="labeled_counter",
+            labels=["b", "a"],
+            lifetime="user",
+            data_sensitivity=["technical", "interaction"],
+        ),
+    )
+    d = labeled.serialize()
+
+    assert d["type"] == "labeled_counter"
+    assert d["labels"] == ["b", "a"]
+    assert d["lifetime"] == "user"
+    assert d["data_sensitivity"] == ["technical", "interaction"]
+    for key in ("name", "category", "unit", "ordered_labels", "_config"):
+        assert key not in d
+
+    # Attributes that aren't known are converted based on their type.
+    labeled.extra = {"c", "a"}
+    labeled.kind = metrics.Lifetime.application
+    d = labeled.serialize()
+    assert d["extra"] == ["a", "c"]
+    assert d["kind"] == "application"
+
+    d = labeled.serialize(rename_fields={"_config": "config", "bugs": "issues"})
+    assert d["config"] == {}
+    assert d["issues"] == labeled.bugs
+    assert "bugs" not in d
+    assert list(d)[-2:] == ["config", "issues"]
+
+
+def test_to_json_bytes():
+    timespan = metrics.Metric.make_metric(
+        "category", "timespan", _metric_info(type="timespan", time_unit="day")
+    )
+
+    data = timespan.to_json_bytes()
+    assert isinstance(data, bytes)
+    assert b" " not in data
+    assert json.loads(data) == timespan.serialize()
+    assert list(json.loads(data)) == sorted(timespan.serialize())
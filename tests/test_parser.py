@@ -5,15 +5,22 @@
 
 from pathlib import Path
 import datetime
+import gc
+import hashlib
 import json
 import os
 import re
+import shutil
 import textwrap
 
+import jsonschema
+import yaml
 import pytest
 
+from glean_parser import compact
 from glean_parser import metrics
 from glean_parser import parser
+from glean_parser.util import get_null_resolver, json_load, load_yaml_or_json, yaml_load
 
 import util
 
@@ -386,6 +393,102 @@ def test_invalid_schema():
     assert any("key must be one of" in str(e) for e in errors)
 
 
+@pytest.mark.parametrize("schema_id", sorted(parser._schema_paths()))
+def test_bundled_schemas_are_valid(schema_id):
+    """The meta-schema check is not done at runtime, so do it here."""
+    schema_path = parser._schema_paths()[schema_id]
+    schema = parser._read_schema(schema_path)
+    assert schema["$id"] == schema_id
+    jsonschema.validators.validator_for(schema).check_schema(schema)
+
+
+def test_schemas_are_loaded_lazily():
+    parser._load_schema_document.cache_clear()
+    parser._get_fast_validator.cache_clear()
+    all_metrics = parser.parse_objects(
+        [ROOT / "data" / "core.yaml"], config={"allow_reserved": True}
+    )
+    assert not list(all_metrics)
+    assert parser._load_schema_document.cache_info().currsize == 1
+
+
+def test_read_schema_prefers_up_to_date_json(tmp_path):
+    yaml_path = tmp_path / "metrics.2-0-0.schema.yaml"
+    json_path = tmp_path / "metrics.2-0-0.schema.json"
+    yaml_path.write_text("$id: from-yaml\n")
+    digest = hashlib.sha256(yaml_path.read_bytes()).hexdigest()
+    json_path.write_text(
+        json.dumps({"yaml_sha256": digest, "schema": {"$id": "from-json"}})
+    )
+    # Modification times don't matter, only the content does.
+    os.utime(yaml_path, (100, 100))
+    os.utime(json_path, (0, 0))
+    assert parser._read_schema(yaml_path)["$id"] == "from-json"
+
+    # A stale JSON copy is ignored.
+    yaml_path.write_text("$id: from-yaml\ndescription: changed\n")
+    os.utime(yaml_path, (0, 0))
+    os.utime(json_path, (100, 100))
+    assert parser._read_schema(yaml_path)["$id"] == "from-yaml"
+
+    # So is one without a digest.
+    json_path.write_text(json.dumps({"$id": "from-json"}))
+    assert parser._read_schema(yaml_path)["$id"] == "from-yaml"
+
+    json_path.unlink()
+    assert parser._read_schema(yaml_path)["$id"] == "from-yaml"
+
+
+@pytest.mark.parametrize("schema_id", sorted(parser._schema_paths()))
+def test_bundled_json_schemas_match_yaml(schema_id):
+    """An up to date JSON copy of a schema has the same content as the YAML."""
+    schema_path = parser._schema_paths()[schema_id]
+    json_path = schema_path.with_suffix(".json")
+    if not json_path.exists():
+        pytest.skip("No JSON copy, it is only generated when building")
+    copy = json.loads(json_path.read_text(encoding="utf-8"))
+    digest = hashlib.sha256(schema_path.read_bytes()).hexdigest()
+    if copy.get("yaml_sha256") != digest:
+        pytest.skip("The JSON copy is out of date and won't be used")
+    schema = yaml.safe_load(schema_path.read_text(encoding="utf-8"))
+    # Compare the serializations, so the key order is checked too.
+    assert json.dumps(copy["schema"]) == json.dumps(schema)
+
+
+def test_json_schema_copy_reports_errors_in_yaml_order(tmp_path, monkeypatch):
+    """
+    Errors are reported in schema key order, so they must come out the same
+    whether the schema is read from the YAML source or its JSON copy.
+    """
+    source_path = parser._schema_paths()[parser.METRICS_ID]
+    yaml_path = tmp_path / source_path.name
+    shutil.copy(source_path, yaml_path)
+    # Write the copy the same way `hatch_build.py` does.
+    schema = yaml.safe_load(yaml_path.read_text(encoding="utf-8"))
+    copy = {
+        "yaml_sha256": hashlib.sha256(yaml_path.read_bytes()).hexdigest(),
+        "schema": schema,
+    }
+    yaml_path.with_suffix(".json").write_text(
+        json.dumps(copy, separators=(",", ":")), encoding="utf-8"
+    )
+
+    content = load_yaml_or_json(ROOT / "data" / "schema-violation.yaml")
+
+    def errors(schema):
+        validator_class = jsonschema.validators.validator_for(schema)
+        validator = validator_class(schema, resolver=get_null_resolver(schema))
+        return [(list(e.path), e.message) for e in validator.iter_errors(content)]
+
+    from_yaml = load_yaml_or_json(yaml_path)
+    with monkeypatch.context() as m:
+        # Make sure the JSON copy is used.
+        m.setattr(parser.util, "load_yaml_or_json", None)
+        from_json = parser._read_schema(yaml_path)
+    assert len(errors(from_yaml)) > 1
+    assert errors(from_json) == errors(from_yaml)
+
+
 def test_merge_metrics():
     """Merge multiple metrics.yaml files"""
     contents = [
@@ -1593,3 +1696,336 @@ def test_overriden_expire_epoch_must_be_valid(invalid_epoch):
         list(all_metrics)
 
     del os.environ["SOURCE_DATE_EPOCH"]
+
+
+@pytest.mark.parametrize("jobs", [2, -1])
+def test_parallel_loading_is_deterministic(jobs):
+    inputs = [
+        ROOT / "data" / "core.yaml",
+        ROOT / "data" / "schema-violation.yaml",
+        ROOT / "data" / "pings.yaml",
+        ROOT / "data" / "invalid.yamlx",
+        ROOT / "data" / "core.yaml",
+    ]
+
+    sequential = parser.parse_objects(inputs, {"allow_reserved": True})
+    sequential_errors = list(sequential)
+    assert len(sequential_errors) > 0
+
+    parallel = parser.parse_objects(inputs, {"allow_reserved": True, "jobs": jobs})
+    assert list(parallel) == sequential_errors
+
+    assert list(parallel.value.keys()) == list(sequential.value.keys())
+    for category_key, category_val in parallel.value.items():
+        expected = sequential.value[category_key]
+        assert list(category_val.keys()) == list(expected.keys())
+        for name, obj in category_val.items():
+            assert obj.serialize() == expected[name].serialize()
+
+
+def test_parallel_loading_missing_file():
+    inputs = [ROOT / "data" / "core.yaml", ROOT / "data" / "does-not-exist.yaml"]
+
+    with pytest.raises(FileNotFoundError):
+        list(parser.parse_objects(inputs, {"allow_reserved": True, "jobs": 2}))
+
+    all_metrics = parser.parse_objects(
+        inputs, {"allow_reserved": True, "allow_missing_files": True, "jobs": 2}
+    )
+    assert list(all_metrics) == []
+    assert "glean.internal.metrics" in all_metrics.value
+
+
+def _assert_same_tree(actual, expected):
+    assert sorted(actual.keys()) == sorted(expected.keys())
+    for category_key, category_val in actual.items():
+        assert sorted(category_val.keys()) == sorted(expected[category_key].keys())
+        for name, obj in category_val.items():
+            assert obj.serialize() == expected[category_key][name].serialize()
+
+
+def test_parse_session(tmp_path):
+    metrics_path = tmp_path / "metrics.yaml"
+    pings_path = tmp_path / "pings.yaml"
+    shutil.copy(ROOT / "data" / "core.yaml", metrics_path)
+    shutil.copy(ROOT / "data" / "pings.yaml", pings_path)
+    config = {"allow_reserved": True}
+
+    session = parser.ParseSession([metrics_path, pings_path], config)
+    assert list(session.refresh()) == []
+    assert session.changed == [metrics_path, pings_path]
+
+    expected = parser.parse_objects([metrics_path, pings_path], config)
+    assert list(expected) == []
+    _assert_same_tree(session.objects, expected.value)
+
+    ping = session.objects["pings"]["custom-ping"]
+    result = session.refresh()
+    assert list(result) == []
+    assert session.changed == []
+    assert result.value is session.objects
+    assert session.objects["pings"]["custom-ping"] is ping
+
+    with metrics_path.open("a") as fd:
+        fd.write(
+            textwrap.dedent(
+                """
+                session.test:
+                  added_metric:
+                    type: counter
+                    description: Added while the session was alive.
+                    bugs:
+                      - https://bugzilla.mozilla.org/1
+                    data_reviews:
+                      - https://example.com/review/
+                    notification_emails:
+                      - nobody@example.com
+                    expires: never
+                """
+            )
+        )
+
+    assert list(session.refresh()) == []
+    assert session.changed == [metrics_path]
+    assert "added_metric" in session.objects["session.test"]
+    assert session.objects["pings"]["custom-ping"] is ping
+    assert session.sources[("session.test", "added_metric")] == metrics_path
+
+    expected = parser.parse_objects([metrics_path, pings_path], config)
+    assert list(expected) == []
+    _assert_same_tree(session.objects, expected.value)
+
+
+def test_parse_session_duplicates(tmp_path):
+    first = tmp_path / "first.yaml"
+    second = tmp_path / "second.yaml"
+    shutil.copy(ROOT / "data" / "smaller.yaml", first)
+    shutil.copy(ROOT / "data" / "smaller.yaml", second)
+
+    session = parser.ParseSession([first, second])
+    errors = list(session.refresh())
+    expected = list(parser.parse_objects([first, second]))
+    assert len(expected) > 0
+    assert sorted(errors) == sorted(expected)
+
+    second.write_text(first.read_text().replace("telemetry:", "other.telemetry:"))
+    assert list(session.refresh()) == []
+    assert session.changed == [second]
+
+
+def test_parse_session_interesting_changes(tmp_path):
+    metrics_path = tmp_path / "metrics.yaml"
+    metrics_path.write_text(
+        yaml.dump(
+            util.add_required({"cat": {"a": {}, "b": {}, "c": {"disabled": True}}})
+        )
+    )
+    interesting = tmp_path / "interesting.txt"
+    interesting.write_text("cat.a\n")
+    config = {"interesting": [interesting]}
+
+    def _disabled(objs):
+        return {name: metric.disabled for name, metric in objs["cat"].items()}
+
+    session = parser.ParseSession([metrics_path], config)
+    assert list(session.refresh()) == []
+    assert _disabled(session.objects) == {"a": False, "b": True, "c": True}
+
+    # The metrics of the unchanged file are enabled again.
+    interesting.write_text("cat.*\n")
+    assert list(session.refresh()) == []
+    assert session.changed == []
+    expected = parser.parse_objects([metrics_path], config)
+    assert list(expected) == []
+    assert _disabled(session.objects) == _disabled(expected.value)
+    assert _disabled(session.objects) == {"a": False, "b": False, "c": True}
+
+
+def test_parse_session_compact(tmp_path):
+    config = {"allow_reserved": True, "compact": True}
+    filepaths = [ROOT / "data" / "core.yaml", ROOT / "data" / "pings.yaml"]
+
+    session = parser.ParseSession(filepaths, config)
+    assert list(session.refresh()) == []
+    expected = parser.parse_objects(filepaths, config)
+    assert list(expected) == []
+
+    assert compact.is_compact(session.objects["core_ping"]["seq"])
+    assert compact.is_compact(session.objects["pings"]["custom-ping"])
+    _assert_same_tree(session.objects, expected.value)
+
+    assert list(session.refresh()) == []
+    assert compact.is_compact(session.objects["core_ping"]["seq"])
+
+
+def test_iter_objects():
+    filepaths = [
+        ROOT / "data" / "core.yaml",
+        ROOT / "data" / "pings.yaml",
+        ROOT / "data" / "tags.yaml",
+    ]
+    config = {"allow_reserved": True}
+
+    events = list(parser.iter_objects(filepaths, config))
+    expected = parser.parse_objects(filepaths, config)
+    assert list(expected) == []
+
+    assert [kind for kind, _ in events if kind == "error"] == []
+    # Pings come last, once all of the files are parsed.
+    kinds = [kind for kind, _ in events]
+    assert kinds.index("ping") > max(
+        index for index, kind in enumerate(kinds) if kind != "ping"
+    )
+
+    actual = {
+        (kind, obj.identifier() if kind == "metric" else obj.name): obj.serialize()
+        for kind, obj in events
+    }
+    assert actual == {
+        (
+            "metric" if isinstance(obj, metrics.Metric) else category_key[:-1],
+            obj.identifier() if isinstance(obj, metrics.Metric) else obj.name,
+        ): obj.serialize()
+        for category_key, category_val in expected.value.items()
+        for obj in category_val.values()
+    }
+
+
+def test_iter_objects_streams():
+    events = parser.iter_objects(
+        [ROOT / "data" / "core.yaml", ROOT / "data" / "does-not-exist.yaml"],
+        {"allow_reserved": True},
+    )
+    kind, obj = next(events)
+    assert kind == "metric"
+    assert obj.defined_in["filepath"] == str(ROOT / "data" / "core.yaml")
+
+    # The second file is only read once the objects of the first one have
+    # been consumed.
+    with pytest.raises(FileNotFoundError):
+        list(events)
+
+
+def test_iter_objects_errors():
+    filepaths = [ROOT / "data" / "smaller.yaml", ROOT / "data" / "smaller.yaml"]
+    events = list(parser.iter_objects(filepaths))
+    errors = [value for kind, value in events if kind == "error"]
+    assert errors == list(parser.parse_objects(filepaths))
+    assert len(errors) > 0
+    assert len([kind for kind, _ in events if kind == "metric"]) == 1
+
+
+def test_json_input(tmp_path):
+    content = load_yaml_or_json(ROOT / "data" / "core.yaml")
+    json_path = tmp_path / "metrics.json"
+    json_path.write_text(json.dumps(content, indent=2))
+
+    from_json = parser.parse_objects([json_path], {"allow_reserved": True})
+    assert list(from_json) == []
+    from_yaml = parser.parse_objects(
+        [ROOT / "data" / "core.yaml"], {"allow_reserved": True}
+    )
+    assert list(from_yaml) == []
+
+    for category_key, category_val in from_yaml.value.items():
+        for metric_key, metric in category_val.items():
+            expected = metric.serialize()
+            actual = from_json.value[category_key][metric_key].serialize()
+            expected.pop("defined_in")
+            actual.pop("defined_in")
+            assert actual == expected
+
+    # Objects know the line of their opening brace.
+    lines = json_path.read_text().splitlines()
+    seq = from_json.value["core_ping"]["seq"]
+    assert lines[seq.defined_in["line"] - 1].strip() == '"seq": {'
+
+
+def test_json_input_line_numbers(tmp_path):
+    json_path = tmp_path / "metrics.json"
+    json_path.write_text(
+        textwrap.dedent(
+            """\
+            {
+              "$schema": "moz://mozilla.org/schemas/glean/metrics/2-0-0",
+              "category": {
+                "metric": {
+                  "type": "counter",
+                  "description": "Braces in strings { are } skipped {",
+                  "bugs": ["https://bugzilla.mozilla.org/1"],
+                  "data_reviews": ["http://example.com/"],
+                  "notification_emails": ["CHANGE-ME@example.com"],
+                  "expires": "never",
+                  "send_in_pings": ["all-pings"]
+                }
+              }
+            }
+            """
+        )
+    )
+
+    errors = list(parser.parse_objects([json_path]))
+    assert len(errors) == 1
+    assert f"{json_path.resolve()}:4:" in errors[0]
+    assert "all-pings" in errors[0]
+
+
+def test_json_input_duplicates():
+    content = json_load(
+        """{
+          "category": {"metric": {"type": "counter"}, "metric": {"type": "event"}},
+          "other": {}
+        }"""
+    )
+    assert content["category"].duplicate == "metric"
+    assert content["category"]["metric"]["type"] == "event"
+    assert content["category"].defined_in == {"line": 2}
+    assert not hasattr(content, "duplicate")
+    assert content["other"].defined_in == {"line": 3}
+
+
+def test_yaml_load_line_tracking():
+    content = yaml_load(
+        textwrap.dedent(
+            """\
+            category:
+              metric: &metric
+                type: counter
+                extra_keys:
+                  key: {type: string}
+              other: *metric
+              merged:
+                <<: *metric
+                type: event
+              metric: {}
+            """
+        )
+    )
+
+    assert content.defined_in == {"line": 0}
+    assert content["category"].defined_in == {"line": 1}
+    assert content["category"].duplicate == "metric"
+    # Aliases are loaded like the mapping of their anchor.
+    assert content["category"]["other"]["type"] == "counter"
+    assert content["category"]["other"].defined_in == {"line": 1}
+    assert content["category"]["merged"]["type"] == "event"
+    assert content["category"]["merged"]["extra_keys"] == {"key": {"type": "string"}}
+
+    # Nothing deeper than metrics is reported on.
+    extra_keys = content["category"]["other"]["extra_keys"]
+    assert type(extra_keys) is dict
+    assert not hasattr(extra_keys["key"], "defined_in")
+
+
+def test_yaml_load_recursive_anchor():
+    with pytest.raises(yaml.constructor.ConstructorError):
+        yaml_load("a: &a\n  b: *a\n")
+
+
+def test_yaml_load_leaves_garbage_collector_alone(monkeypatch):
+    def fail():
+        raise AssertionError("The garbage collector settings are process-wide")
+
+    for name in ("disable", "enable", "freeze", "set_threshold"):
+        monkeypatch.setattr(gc, name, fail)
+    assert yaml_load("a:\n  b: [1, 2]\n") == {"a": {"b": [1, 2]}}
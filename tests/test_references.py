@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+# Any copyright is dedicated to the Public Domain.
+# http://creativecommons.org/publicdomain/zero/1.0/
+
+from pathlib import Path
+
+import pytest
+
+from glean_parser import index
+from glean_parser import parser
+from glean_parser import references
+from glean_parser import translate
+
+import util
+
+
+ROOT = Path(__file__).parent
+
+
+def _parse(content):
+    result = parser.parse_objects([util.add_required(content)])
+    assert not list(result)
+    return result.value
+
+
+def test_all_dangling_denominators_reported():
+    objs = _parse(
+        {
+            "category": {
+                "rate_a": {"type": "rate", "denominator_metric": "category.missing"},
+                "rate_b": {"type": "rate", "denominator_metric": "category.missing"},
+                "rate_c": {"type": "rate", "denominator_metric": "category.string"},
+                "string": {"type": "string"},
+            }
+        }
+    )
+
+    with pytest.raises(ValueError) as e:
+        translate.transform_metrics(objs)
+
+    assert str(e.value).splitlines() == [
+        "No `counter` named category.missing found to be used as "
+        "denominator_metric for category.rate_a, category.rate_b",
+        "No `counter` named category.string found to be used as "
+        "denominator_metric for category.rate_c",
+    ]
+
+
+def test_references_kept_on_tree():
+    objs = _parse(
+        {
+            "category": {
+                "rate": {"type": "rate", "denominator_metric": "category.counter"},
+                "counter": {"type": "counter", "send_in_pings": ["custom", "metrics"]},
+            }
+        }
+    )
+    translate.transform_metrics(objs)
+
+    refs = references.get_references(objs)
+    assert refs is index.get_index(objs).references
+    assert refs is references.get_references(objs)
+
+    counter = objs["category"]["counter"]
+    assert refs.resolved["denominator_metric"] == {"category.counter": counter}
+    assert refs.referrers["denominator_metric"] == {
+        "category.counter": [objs["category"]["rate"]]
+    }
+    assert refs.dangling("send_in_pings") == {"custom": [counter]}
+    assert refs.errors() == []
+
+
+def test_ping_schedule_references():
+    result = parser.parse_objects([ROOT / "data" / "pings.yaml"])
+    assert not list(result)
+    objs = result.value
+
+    refs = references.resolve_references(index.ObjectTreeIndex(objs))
+    scheduler = objs["pings"]["custom-with-ping-schedule"]
+    assert refs.referrers["ping_schedule"] == {
+        "custom-ping-no-info": [scheduler],
+        "custom-ping-might-be-empty": [scheduler],
+    }
+    assert refs.dangling("ping_schedule") == {}
+
+
+def test_custom_reference_kind():
+    objs = _parse({"category": {"a": {"type": "string"}, "b": {"type": "string"}}})
+    kind = references.ReferenceKind(
+        "sibling",
+        "metric",
+        lambda metric: ["category.a", "category.c"] if metric.name == "b" else [],
+        lambda idx, name: idx.by_identifier.get(name),
+        required=True,
+        expected="metric",
+    )
+
+    refs = references.resolve_references(index.ObjectTreeIndex(objs), {kind.name: kind})
+    assert refs.resolved["sibling"] == {"category.a": objs["category"]["a"]}
+    assert refs.errors() == [
+        "No metric named category.c found to be used as sibling for category.b"
+    ]
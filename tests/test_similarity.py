@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+# Any copyright is dedicated to the Public Domain.
+# http://creativecommons.org/publicdomain/zero/1.0/
+
+import itertools
+
+import pytest
+
+from glean_parser.similarity import PingNameIndex, SimilarityIndex, edit_distance
+
+
+def _levenshtein(a, b):
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(
+                min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            )
+        previous = current
+    return previous[-1]
+
+
+def test_edit_distance():
+    assert edit_distance("color", "colour", 1) == 1
+    assert edit_distance("color", "color", 1) == 0
+    assert edit_distance("kitten", "sitting", 3) == 3
+    assert edit_distance("kitten", "sitting", 2) == 3
+    assert edit_distance("", "abc", 5) == 3
+    assert edit_distance("abcdef", "abc", 1) == 2
+
+    strings = ["", "a", "ab", "ba", "abc", "acb", "bca", "aabb", "abab", "cabba"]
+    for a, b in itertools.product(strings, repeat=2):
+        for max_distance in range(4):
+            expected = min(_levenshtein(a, b), max_distance + 1)
+            assert edit_distance(a, b, max_distance) == expected
+
+
+def test_punctuation_only_by_default():
+    index = SimilarityIndex()
+    index.add("formautofill.credit_cards", 1)
+    index.add("formautofill.credit_card", 2)
+
+    assert index.find("formautofill.creditcards") == [("formautofill.credit_cards", 1)]
+    assert index.find("formautofill.creditcard") == [("formautofill.credit_card", 2)]
+    assert index.find("formautofill.card_credit") == []
+
+
+def test_edit_distance_matches():
+    index = SimilarityIndex(max_distance=1)
+    for identifier in ["a.color", "a.colors", "a.flavor", "a.c"]:
+        index.add(identifier)
+
+    assert [x for x, _ in index.find("a.colour")] == ["a.color"]
+    assert [x for x, _ in index.find("a.color_")] == ["a.color", "a.colors"]
+    assert [x for x, _ in index.find("a.d")] == ["a.c"]
+    assert index.find("a.flavour_text") == []
+
+
+def test_matches_pairwise_comparison():
+    identifiers = [
+        "".join(chars)
+        for length in range(5)
+        for chars in itertools.product("ab_", repeat=length)
+    ]
+    for max_distance in range(3):
+        index = SimilarityIndex(max_distance)
+        for i, identifier in enumerate(identifiers):
+            stripped = identifier.replace("_", "")
+            expected = [
+                other
+                for other in identifiers[:i]
+                if _levenshtein(stripped, other.replace("_", "")) <= max_distance
+            ]
+            assert [x for x, _ in index.find(identifier)] == expected
+            index.add(identifier)
+
+
+def test_token_permutations():
+    index = SimilarityIndex(token_permutations=True)
+    index.add("tab.count_open")
+    index.add("tab.open_count")
+    index.add("tab.count")
+
+    assert [x for x, _ in index.find("count.open_tab")] == [
+        "tab.count_open",
+        "tab.open_count",
+    ]
+    assert [x for x, _ in index.find("count.tab")] == ["tab.count"]
+    assert index.find("tab.count_closed") == []
+
+
+def test_negative_distance():
+    with pytest.raises(ValueError):
+        SimilarityIndex(max_distance=-1)
+
+
+def test_ping_name_index():
+    index = PingNameIndex(["metrics", "events", "event", "metrics", "custom-ping"])
+
+    assert list(index) == ["metrics", "events", "event", "custom-ping"]
+    assert "event" in index
+    assert "custom_ping" not in index
+
+    assert index.similar("metrics") == []
+    assert index.similar("evens") == ["events", "event"]
+    assert index.similar("custom_ping") == ["custom-ping"]
+    assert index.similar("custom-pnig") == []
+    assert index.similar("custom-pnig", max_distance=2) == ["custom-ping"]
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+
+# Any copyright is dedicated to the Public Domain.
+# http://creativecommons.org/publicdomain/zero/1.0/
+
+import io
+from pathlib import Path
+import pickle
+import zlib
+
+from click.testing import CliRunner
+import pytest
+
+from glean_parser import __main__
+from glean_parser import parser
+from glean_parser import snapshot
+
+
+ROOT = Path(__file__).parent
+
+
+INPUTS = [ROOT / "data" / "core.yaml", ROOT / "data" / "pings.yaml"]
+
+
+def _serialize(objs):
+    return {
+        category_key: {key: obj.serialize() for key, obj in category_val.items()}
+        for category_key, category_val in objs.items()
+    }
+
+
+def test_round_trip(tmp_path):
+    output = tmp_path / "registry.glean"
+    assert (
+        snapshot.compile_snapshot(
+            INPUTS, output, {"allow_reserved": True}, file=io.StringIO()
+        )
+        == 0
+    )
+
+    header, _ = snapshot.read_snapshot(output)
+    assert [source["path"] for source in header["sources"]] == [
+        str(path) for path in INPUTS
+    ]
+    assert header["config"]["allow_reserved"]
+
+    expected = parser.parse_objects(INPUTS, {"allow_reserved": True})
+    assert not list(expected)
+    loaded = parser.parse_objects([output], {"allow_reserved": True})
+    assert not list(loaded)
+    assert _serialize(loaded.value) == _serialize(expected.value)
+
+    metric = loaded.value["core_ping"]["seq"]
+    assert metric.defined_in["filepath"] == str(INPUTS[0])
+
+
+def test_snapshot_must_be_sole_input(tmp_path):
+    output = tmp_path / "registry.glean"
+    snapshot.compile_snapshot(
+        INPUTS, output, {"allow_reserved": True}, file=io.StringIO()
+    )
+
+    errors = list(parser.parse_objects([output, INPUTS[0]]))
+    assert len(errors) == 1
+    assert "can't be combined" in errors[0]
+
+    stream = io.StringIO()
+    assert snapshot.compile_snapshot([output], tmp_path / "again.glean", file=stream)
+    assert "can't be compiled again" in stream.getvalue()
+
+
+def test_invalid_snapshots(tmp_path):
+    bogus = tmp_path / "bogus.glean"
+    bogus.write_bytes(b"not a snapshot")
+    errors = list(parser.parse_objects([bogus]))
+    assert len(errors) == 1
+    assert "is not a glean_parser snapshot" in errors[0]
+
+    output = tmp_path / "registry.glean"
+    snapshot.compile_snapshot(
+        INPUTS, output, {"allow_reserved": True}, file=io.StringIO()
+    )
+    data = output.read_bytes().replace(b'"format": 1', b'"format": 0')
+    output.write_bytes(data)
+    errors = list(parser.parse_objects([output]))
+    assert len(errors) == 1
+    assert "Compile it again" in errors[0]
+
+
+def test_unpickler_rejects_other_classes():
+    data = pickle.dumps({"x": io.StringIO})
+    with pytest.raises(pickle.UnpicklingError):
+        snapshot._Unpickler(io.BytesIO(data)).load()
+
+
+def test_unpickler_rejects_dotted_names(tmp_path):
+    # A protocol 4 lookup of `os.system` through a module that imports `os`.
+    payload = (
+        pickle.PROTO
+        + bytes([4])
+        + pickle.SHORT_BINUNICODE
+        + bytes([len("glean_parser.util")])
+        + b"glean_parser.util"
+        + pickle.SHORT_BINUNICODE
+        + bytes([len("os.system")])
+        + b"os.system"
+        + pickle.STACK_GLOBAL
+        + pickle.SHORT_BINUNICODE
+        + bytes([len("echo PWNED")])
+        + b"echo PWNED"
+        + pickle.TUPLE1
+        + pickle.REDUCE
+        + pickle.STOP
+    )
+    with pytest.raises(pickle.UnpicklingError):
+        snapshot._Unpickler(io.BytesIO(payload)).load()
+
+    output = tmp_path / "registry.glean"
+    snapshot.compile_snapshot(
+        INPUTS, output, {"allow_reserved": True}, file=io.StringIO()
+    )
+    data = output.read_bytes()
+    start = len(snapshot._MAGIC) + snapshot._HEADER_LENGTH.size
+    (header_length,) = snapshot._HEADER_LENGTH.unpack_from(data, len(snapshot._MAGIC))
+    output.write_bytes(data[: start + header_length] + zlib.compress(payload))
+
+    errors = list(parser.parse_objects([output], {"allow_reserved": True}))
+    assert len(errors) == 1
+    assert "Unexpected class glean_parser.util.os.system" in errors[0]
+
+
+def test_config_mismatch(tmp_path):
+    inputs = [tmp_path / "metrics.yaml"]
+    inputs[0].write_text((ROOT / "data" / "core.yaml").read_text())
+    inputs.append(INPUTS[1])
+    interesting = tmp_path / "interesting.txt"
+    interesting.write_text("core_ping.seq\n")
+
+    output = tmp_path / "registry.glean"
+    config = {"allow_reserved": True, "interesting": [interesting]}
+    snapshot.compile_snapshot(inputs, output, config, file=io.StringIO())
+
+    def _disabled(config):
+        loaded = parser.parse_objects([output], config)
+        assert not list(loaded)
+        return sorted(
+            metric.identifier()
+            for metric in loaded.value["core_ping"].values()
+            if not metric.disabled
+        )
+
+    assert _disabled(config) == ["core_ping.seq"]
+
+    # The sources are parsed again with the other config.
+    config = {"allow_reserved": True}
+    expected = parser.parse_objects(inputs, config)
+    assert not list(expected)
+    assert _disabled(config) == sorted(
+        metric.identifier()
+        for metric in expected.value["core_ping"].values()
+        if not metric.disabled
+    )
+    assert len(_disabled(config)) > 1
+
+    interesting.write_text("core_ping.*\n")
+    assert len(_disabled({**config, "interesting": [interesting]})) > 1
+
+    # Unless they changed since.
+    inputs[0].write_text(inputs[0].read_text() + "\n")
+    errors = list(parser.parse_objects([output], config))
+    assert len(errors) == 1
+    assert "compiled with different interesting options" in errors[0]
+
+
+def test_commands_accept_snapshots(tmp_path):
+    runner = CliRunner()
+    output = tmp_path / "registry.glean"
+    result = runner.invoke(
+        __main__.main,
+        [
+            "compile",
+            *[str(path) for path in INPUTS],
+            "--allow-reserved",
+            "-o",
+            str(output),
+        ],
+    )
+    assert result.exit_code == 0
+    assert output.exists()
+
+    result = runner.invoke(
+        __main__.main,
+        [
+            "translate",
+            str(output),
+            "-f",
+            "kotlin",
+            "-o",
+            str(tmp_path / "kotlin"),
+            "--allow-reserved",
+        ],
+    )
+    assert result.exit_code == 0
+    assert (tmp_path / "kotlin" / "CorePing.kt").exists()
+
+    result = runner.invoke(__main__.main, ["dump", str(output), "--allow-reserved"])
+    assert result.exit_code == 0
+    assert "core_ping.seq" in result.output
+
+
+def test_compile_manifest(tmp_path):
+    """`compile` takes the same inputs as the commands reading its snapshot."""
+    manifest = tmp_path / "inputs.txt"
+    manifest.write_text(f"{INPUTS[0]}\n")
+    other_manifest = tmp_path / "other_inputs.txt"
+    other_manifest.write_text(f"# Globbed.\n{INPUTS[1].with_suffix('.y*ml')}\n")
+
+    runner = CliRunner()
+    output = tmp_path / "registry.glean"
+    result = runner.invoke(
+        __main__.main,
+        [
+            "compile",
+            f"@{manifest}",
+            "--manifest",
+            str(other_manifest),
+            "--allow-reserved",
+            "-o",
+            str(output),
+        ],
+    )
+    assert result.exit_code == 0
+
+    header, _ = snapshot.read_snapshot(output)
+    assert [source["path"] for source in header["sources"]] == [
+        str(path) for path in INPUTS
+    ]
+
+
+def test_compile_output_suffix(tmp_path):
+    runner = CliRunner()
+    result = runner.invoke(
+        __main__.main,
+        ["compile", str(INPUTS[0]), "-o", str(tmp_path / "registry.yaml")],
+    )
+    assert result.exit_code != 0
+    assert "must end in" in result.output
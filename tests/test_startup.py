@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+# Any copyright is dedicated to the Public Domain.
+# http://creativecommons.org/publicdomain/zero/1.0/
+
+import subprocess
+import sys
+
+from glean_parser import kotlin
+from glean_parser import translate
+
+
+# Modules that are expensive to import, and only needed by some commands.
+HEAVY_MODULES = [
+    "diskcache",
+    "jinja2",
+    "jsonschema",
+    "platformdirs",
+    "urllib.request",
+    "glean_parser.go_server",
+    "glean_parser.javascript",
+    "glean_parser.kotlin",
+    "glean_parser.markdown",
+    "glean_parser.rust",
+    "glean_parser.swift",
+    "glean_parser.watch",
+]
+
+
+# The most modules importing the command line interface may import, on top of
+# those imported when the interpreter starts, with a little headroom over the
+# about 200 it imports now.  Counting modules rather than timing them keeps the
+# check independent of the machine running the tests.
+IMPORTED_MODULES_BUDGET = 220
+
+
+def _imported_modules(statement):
+    """
+    Run `statement` in a fresh interpreter, and return the set of modules
+    imported, as reported by `-X importtime`.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    modules = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        modules.add(line.split("|")[-1].strip())
+    return modules
+
+
+def test_cli_import_is_lazy():
+    modules = _imported_modules("import glean_parser.__main__")
+
+    assert "glean_parser.__main__" in modules
+    for module in HEAVY_MODULES:
+        assert module not in modules, f"{module} is imported on startup"
+
+
+def test_cli_import_budget():
+    modules = _imported_modules("import glean_parser.__main__")
+    startup = _imported_modules("pass")
+
+    assert len(modules - startup) <= IMPORTED_MODULES_BUDGET
+
+
+def test_outputters_are_resolved_on_use():
+    assert translate.OUTPUTTERS["kotlin"].output_func is kotlin.output_kotlin
+    assert translate.OUTPUTTERS["kotlin"].clear_patterns == ["*.kt"]
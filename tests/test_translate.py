@@ -258,3 +258,29 @@ def test_with_tags(tmp_path):
 
     # A single metric category in a single file
     assert len(list(output.iterdir())) == 1
+
+
+def test_translate_with_session_is_repeatable(tmp_path):
+    input_path = tmp_path / "rate.yaml"
+    shutil.copy(ROOT / "data" / "rate.yaml", input_path)
+    parser_config = {"allow_reserved": True}
+    session = parser.ParseSession([input_path], parser_config)
+
+    def external_translator(all_objects, output_dir, options):
+        category = all_objects["testing.rates"]
+        assert category["the_denominator"].type == "denominator"
+        assert len(category["the_denominator"].numerators) == 2
+        assert category["has_external_denominator"].type == "numerator"
+
+    for _ in range(2):
+        assert (
+            translate.translate_metrics(
+                [input_path],
+                tmp_path / "out",
+                external_translator,
+                [],
+                parser_config=parser_config,
+                session=session,
+            )
+            == 0
+        )
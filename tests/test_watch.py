@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+# Any copyright is dedicated to the Public Domain.
+# http://creativecommons.org/publicdomain/zero/1.0/
+
+import io
+from pathlib import Path
+import shutil
+import sys
+import threading
+
+import pytest
+
+from glean_parser import lint
+from glean_parser import watch
+
+
+ROOT = Path(__file__).parent
+
+
+def _touch_later(path, delay=0.2):
+    def touch():
+        with path.open("a") as fd:
+            fd.write("\n")
+
+    timer = threading.Timer(delay, touch)
+    timer.start()
+    return timer
+
+
+@pytest.mark.parametrize("use_inotify", [False, True])
+def test_file_watcher_notices_changes(tmp_path, use_inotify):
+    watched = tmp_path / "metrics.yaml"
+    other = tmp_path / "other.yaml"
+    watched.write_text("")
+    other.write_text("")
+
+    with watch.FileWatcher(
+        [watched], poll_interval=0.05, use_inotify=use_inotify
+    ) as watcher:
+        if use_inotify and not watcher.uses_inotify:
+            pytest.skip("inotify is not available")
+
+        _touch_later(other, delay=0.05).join()
+        assert watcher.wait(timeout=0.3) == []
+
+        timer = _touch_later(watched)
+        assert watcher.wait(timeout=5) == [watched.absolute()]
+        timer.join()
+
+
+def test_file_watcher_polling_fallback_for_missing_directories(tmp_path):
+    missing = tmp_path / "missing" / "metrics.yaml"
+
+    with watch.FileWatcher([missing], poll_interval=0.05) as watcher:
+        assert not watcher.uses_inotify
+
+        missing.parent.mkdir()
+        missing.write_text("")
+        assert watcher.wait(timeout=5) == [missing.absolute()]
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="Linux only")
+def test_file_watcher_uses_inotify_on_linux(tmp_path):
+    with watch.FileWatcher([tmp_path / "metrics.yaml"]) as watcher:
+        assert watcher.uses_inotify
+
+
+def test_watch_reparses_changed_files(tmp_path):
+    metrics_path = tmp_path / "metrics.yaml"
+    pings_path = tmp_path / "pings.yaml"
+    shutil.copy(ROOT / "data" / "core.yaml", metrics_path)
+    shutil.copy(ROOT / "data" / "pings.yaml", pings_path)
+    parser_config = {"allow_reserved": True}
+
+    changed = []
+
+    def run(session):
+        result = lint.glinter(
+            [metrics_path, pings_path], parser_config, io.StringIO(), session=session
+        )
+        changed.append(list(session.changed))
+        if len(changed) == 1:
+            _touch_later(metrics_path)
+        return result
+
+    output = io.StringIO()
+    result = watch.watch(
+        [metrics_path, pings_path], run, parser_config, file=output, max_runs=2
+    )
+
+    assert result == 0
+    assert changed == [[metrics_path, pings_path], [metrics_path]]
+    assert "Watching for changes" in output.getvalue()
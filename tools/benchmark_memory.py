@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Usage:
+   python benchmark_memory.py [number_of_metrics]
+
+Measure the memory used by the parsed object tree for a synthetic registry of
+metrics (50,000 by default), both with the regular object model and with the
+compact one (the `compact` parser config).
+"""
+
+import gc
+from pathlib import Path
+import sys
+import tempfile
+import tracemalloc
+
+import yaml
+
+from glean_parser import parser
+
+
+METRICS_PER_CATEGORY = 100
+
+
+def make_registry(num_metrics):
+    content = {"$schema": parser.METRICS_ID}
+    for i in range(num_metrics):
+        category = content.setdefault(f"category_{i // METRICS_PER_CATEGORY}", {})
+        category[f"metric_{i}"] = {
+            "type": ["counter", "string", "boolean", "quantity"][i % 4],
+            "description": f"Synthetic metric number {i}.",
+            "lifetime": "ping",
+            "bugs": [f"https://bugzilla.mozilla.org/show_bug.cgi?id={i % 1000}"],
+            "data_reviews": ["https://example.com/review"],
+            "notification_emails": ["nobody@example.com"],
+            "expires": "never",
+            "send_in_pings": ["metrics"],
+            **({"unit": "things"} if i % 4 == 3 else {}),
+        }
+    return content
+
+
+def measure(filepath, config):
+    gc.collect()
+    tracemalloc.start()
+    result = parser.parse_objects([filepath], config)
+    errors = list(result)
+    assert not errors, errors
+    objects = result.value
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return size
+
+
+def main(num_metrics):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filepath = Path(tmpdir) / "metrics.yaml"
+        with filepath.open("w", encoding="utf-8") as fd:
+            yaml.safe_dump(make_registry(num_metrics), fd, sort_keys=False)
+
+        # Warm up the schema loading, so it isn't counted.
+        measure(filepath, {})
+
+        regular = measure(filepath, {})
+        compact = measure(filepath, {"compact": True})
+
+    print(f"{num_metrics} metrics")
+    print(f"regular: {regular / 2**20:8.1f} MiB")
+    print(f"compact: {compact / 2**20:8.1f} MiB ({compact / regular:.0%})")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
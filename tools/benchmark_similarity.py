@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Usage:
+   python benchmark_similarity.py [number_of_identifiers]
+
+Measure how long it takes to find the similar names among a synthetic set of
+metric identifiers (50,000 by default), with the original punctuation-only
+`NAME_TOO_SIMILAR` check, with `similarity.SimilarityIndex` at a few settings,
+and with naive pairwise comparisons, which are timed on a sample and
+extrapolated.
+"""
+
+import random
+import sys
+import time
+
+from glean_parser.similarity import SimilarityIndex, edit_distance
+
+
+WORDS = (
+    "tab window page load time count total bytes network cache disk memory "
+    "startup shutdown error crash click search bookmark history download "
+    "upload sync login account profile update install session duration"
+).split()
+
+
+PAIRWISE_SAMPLE = 2000
+
+
+def make_identifiers(num_identifiers):
+    rng = random.Random(0)
+    identifiers = set()
+    while len(identifiers) < num_identifiers:
+        category = "_".join(rng.sample(WORDS, 2))
+        name = "_".join(rng.sample(WORDS, rng.randint(2, 4)))
+        identifiers.add(f"{category}.{name}")
+    return sorted(identifiers)
+
+
+def punctuation_only(identifiers):
+    # The original check.
+    seen = {}
+    found = 0
+    for identifier in identifiers:
+        no_punc = identifier.replace("_", "").replace(".", "")
+        if no_punc in seen:
+            found += 1
+        seen[no_punc] = identifier
+    return found
+
+
+def with_index(identifiers, max_distance, token_permutations):
+    index = SimilarityIndex(max_distance, token_permutations)
+    found = 0
+    for identifier in identifiers:
+        if index.find(identifier):
+            found += 1
+        index.add(identifier)
+    return found
+
+
+def pairwise(identifiers, max_distance):
+    stripped = [x.replace("_", "").replace(".", "") for x in identifiers]
+    found = 0
+    for i, identifier in enumerate(stripped):
+        if any(
+            edit_distance(identifier, other, max_distance) <= max_distance
+            for other in stripped[:i]
+        ):
+            found += 1
+    return found
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    found = func(*args)
+    return time.perf_counter() - start, found
+
+
+def main(num_identifiers):
+    identifiers = make_identifiers(num_identifiers)
+    print(f"{num_identifiers} identifiers")
+
+    for name, func, args in [
+        ("punctuation only", punctuation_only, ()),
+        ("index, distance 0", with_index, (0, False)),
+        ("index, distance 1", with_index, (1, False)),
+        ("index, distance 1 + words", with_index, (1, True)),
+        ("index, distance 2", with_index, (2, False)),
+    ]:
+        elapsed, found = timed(func, identifiers, *args)
+        print(f"{name:>26}: {elapsed:7.2f}s, {found} similar")
+
+    sample = identifiers[:PAIRWISE_SAMPLE]
+    elapsed, found = timed(pairwise, sample, 1)
+    # Comparing every pair is quadratic.
+    estimate = elapsed * (num_identifiers / len(sample)) ** 2
+    print(f"{'pairwise, distance 1':>26}: {estimate:7.2f}s (estimated)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+
+# -*- coding: utf-8 -*-
+
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Usage:
+   python benchmark_yaml.py [number_of_metrics]
+
+Measure the throughput, in MB/s of YAML, of loading a synthetic registry of
+metrics (20,000 by default) with `util.yaml_load`, and of loading it as JSON
+with `util.json_load`.  The same content is also loaded with PyYAML's safe
+loader for comparison, and with `util.yaml_load` again with the garbage
+collector thresholds of the command line.
+"""
+
+import gc
+import json
+import sys
+import time
+
+import yaml
+
+from glean_parser import parser
+from glean_parser.__main__ import GC_THRESHOLDS
+from glean_parser import util
+
+
+METRICS_PER_CATEGORY = 100
+
+
+REPEATS = 3
+
+
+def make_registry(num_metrics):
+    content = {"$schema": parser.METRICS_ID}
+    for i in range(num_metrics):
+        category = content.setdefault(f"category_{i // METRICS_PER_CATEGORY}", {})
+        category[f"metric_{i}"] = {
+            "type": "event",
+            "description": f"Synthetic metric number {i}.\nIt has two lines.\n",
+            "lifetime": "ping",
+            "bugs": [f"https://bugzilla.mozilla.org/show_bug.cgi?id={i % 1000}"],
+            "data_reviews": ["https://example.com/review"],
+            "notification_emails": ["nobody@example.com"],
+            "expires": "never",
+            "send_in_pings": ["events"],
+            "extra_keys": {
+                f"key_{j}": {"description": f"Extra key {j}.", "type": "string"}
+                for j in range(3)
+            },
+            "metadata": {"tags": ["Synthetic"]},
+        }
+    return content
+
+
+def throughput(load, data):
+    # The best of a few runs, to smooth out noise.
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        load(data)
+        best = min(best, time.perf_counter() - start)
+    return len(data.encode("utf-8")) / best / 1e6
+
+
+def main(num_metrics):
+    content = make_registry(num_metrics)
+    yaml_data = yaml.safe_dump(content, sort_keys=False)
+    json_data = json.dumps(content, indent=2)
+
+    print(f"{num_metrics} metrics, {len(yaml_data) / 1e6:.1f} MB of YAML")
+    for name, load, data in [
+        ("util.yaml_load", util.yaml_load, yaml_data),
+        ("yaml.CSafeLoader", lambda d: yaml.load(d, yaml.CSafeLoader), yaml_data),
+        ("util.json_load", util.json_load, json_data),
+    ]:
+        print(f"{name:>16}: {throughput(load, data):6.2f} MB/s")
+
+    # The command line raises the garbage collector thresholds.
+    gc.set_threshold(*GC_THRESHOLDS)
+    print(f"{'with CLI gc':>16}: {throughput(util.yaml_load, yaml_data):6.2f} MB/s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)